@@ -0,0 +1,11 @@
+from django.apps import AppConfig
+
+
+class BaseAppConfig(AppConfig):
+    name = "bakerydemo.base"
+    label = "base"
+
+    def ready(self):
+        from bakerydemo.base.signal_handlers import register_signal_handlers
+
+        register_signal_handlers()
@@ -0,0 +1,20 @@
+import time
+
+from django.core.cache import cache
+
+CONTENT_GENERATION_KEY = "content-generation"
+
+
+def get_content_generation():
+    """
+    Returns a value that changes whenever any page is published, unpublished
+    or deleted. Including it in a cache key makes everything cached under the
+    previous generation unreachable, without having to track the keys.
+    """
+    # A timestamp rather than a counter, so the generation can't go back to an
+    # old value if the key is evicted
+    return cache.get_or_set(CONTENT_GENERATION_KEY, time.time_ns, None)
+
+
+def bump_content_generation():
+    cache.set(CONTENT_GENERATION_KEY, time.time_ns(), None)
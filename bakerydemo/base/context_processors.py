@@ -0,0 +1,5 @@
+from bakerydemo.base.request_context import get_site_context
+
+
+def site_context(request):
+    return {"site_context": get_site_context(request)}
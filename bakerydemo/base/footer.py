@@ -0,0 +1,48 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.safestring import mark_safe
+from wagtail.templatetags.wagtailcore_tags import richtext
+
+from bakerydemo.base.models import FooterText
+from bakerydemo.base.navigation import get_active_language
+
+CACHE_KEY_PREFIX = "footer-text"
+# The footer's links to pages are expanded to their URLs when it's rendered.
+# Slug changes and moves drop it too, but only from the cache of the process
+# they happen in if the cache isn't shared between processes
+CACHE_TIMEOUT = 10 * 60
+
+
+def get_cache_key(language_code):
+    return f"{CACHE_KEY_PREFIX}:{language_code}"
+
+
+def render_footer_text(language_code):
+    # Prefer the footer text translated into the active language, falling
+    # back to any live footer text
+    footer_texts = FooterText.objects.filter(live=True)
+    instance = (
+        footer_texts.filter(locale__language_code=language_code).first()
+        or footer_texts.first()
+    )
+    return richtext(instance.body if instance else "")
+
+
+def get_footer_html():
+    """
+    Returns the rendered rich text of the live FooterText for the active
+    language, so pages don't have to query and expand it on every render.
+    """
+    language_code = get_active_language()
+    key = get_cache_key(language_code)
+    html = cache.get(key)
+    if html is None:
+        html = render_footer_text(language_code)
+        cache.set(key, html, CACHE_TIMEOUT)
+    return mark_safe(html)
+
+
+def invalidate_footer_html():
+    cache.delete_many(
+        [get_cache_key(code) for code, _ in settings.WAGTAIL_CONTENT_LANGUAGES]
+    )
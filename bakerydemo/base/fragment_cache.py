@@ -0,0 +1,92 @@
+import hashlib
+import threading
+import time
+from collections import defaultdict
+
+from django.core.cache import cache
+from django.db import models
+
+from bakerydemo.base.navigation import get_active_language
+
+CACHE_KEY_PREFIX = "fragment"
+VERSION_KEY_PREFIX = "fragment-version"
+CACHE_TIMEOUT = 60 * 60 * 24
+
+_stats_lock = threading.Lock()
+_stats = defaultdict(lambda: {"hits": 0, "misses": 0})
+
+
+def get_version_key(name):
+    return f"{VERSION_KEY_PREFIX}:{name}"
+
+
+def bump_fragment_version(*names):
+    """
+    Invalidates every cached copy of the named fragments, whatever they vary
+    on. Used when something a fragment shows changes without changing the
+    objects it varies on, e.g. the menu or the site settings.
+    """
+    now = time.time_ns()
+    cache.set_many({get_version_key(name): now for name in names}, None)
+
+
+def get_vary_part(value):
+    # Objects with revisions change version whenever a new revision goes
+    # live, so fragments varying on them never show stale content
+    if isinstance(value, models.Model):
+        revision_id = getattr(value, "live_revision_id", None) or getattr(
+            value, "latest_revision_id", None
+        )
+        return f"{value._meta.label_lower}:{value.pk}:{revision_id}"
+    return str(value)
+
+
+def get_cache_key(name, vary_on):
+    vary = ":".join(get_vary_part(value) for value in vary_on)
+    vary_hash = hashlib.md5(vary.encode(), usedforsecurity=False).hexdigest()
+    return f"{CACHE_KEY_PREFIX}:{name}:{get_active_language()}:{vary_hash}"
+
+
+def record(name, hit):
+    with _stats_lock:
+        _stats[name]["hits" if hit else "misses"] += 1
+
+
+def get_fragment_stats():
+    """
+    Returns the hits and misses of each fragment name in this process, e.g.
+    {"header": {"hits": 10, "misses": 1}}.
+    """
+    with _stats_lock:
+        return {name: dict(counts) for name, counts in _stats.items()}
+
+
+def reset_fragment_stats():
+    with _stats_lock:
+        _stats.clear()
+
+
+def get_fragment(name, vary_on, render):
+    """
+    Returns the HTML of the fragment `name` for the `vary_on` values, calling
+    `render` to produce it if there isn't a current copy in the cache.
+
+    A copy is current if the fragment's version hasn't been bumped since it
+    was stored. The version is stored alongside the HTML, so the lookup is a
+    single cache round trip.
+    """
+    key = get_cache_key(name, vary_on)
+    version_key = get_version_key(name)
+    cached = cache.get_many([key, version_key])
+    version = cached.get(version_key)
+    entry = cached.get(key)
+    if version is not None and entry is not None and entry[0] == version:
+        record(name, hit=True)
+        return entry[1]
+
+    record(name, hit=False)
+    if version is None:
+        version = cache.get_or_set(version_key, time.time_ns, None)
+    html = render()
+    cache.set(key, (version, html), CACHE_TIMEOUT)
+    return html
@@ -0,0 +1,71 @@
+from django.template.loader import render_to_string
+from django.utils.http import urlencode
+from wagtail.images import get_image_model
+from wagtail.images.models import Filter
+
+from bakerydemo.base.fragment_cache import bump_fragment_version, get_fragment
+from bakerydemo.base.images import RenditionPlan
+from bakerydemo.base.pagination import KeysetPaginator
+
+# How many images a gallery shows at a time
+GALLERY_CHUNK_SIZE = 24
+# The renditions of each image tags/gallery.html shows
+GALLERY_RENDITIONS = Filter.expand_spec(
+    "format-{avif,webp,jpeg} fill-{300x200-c75,645x480-c75}"
+)
+
+
+def get_fragment_name(collection_id):
+    return f"gallery:{collection_id}"
+
+
+def invalidate_gallery(collection_id):
+    """
+    Purges the cached chunks of the gallery of the collection, when one of
+    its images is added, changed or removed.
+    """
+    bump_fragment_version(get_fragment_name(collection_id))
+
+
+def get_gallery_paginator(collection_id):
+    return KeysetPaginator(
+        get_image_model().objects.filter(collection_id=collection_id),
+        GALLERY_CHUNK_SIZE,
+        ordering=("id",),
+    )
+
+
+def render_gallery_chunk(page, collection_id, after=None, request=None):
+    """
+    Returns the HTML of the chunk of the collection's images after the
+    `after` cursor, ending with a link that loads the next chunk from `page`.
+    Raises InvalidCursor if the cursor can't be decoded.
+
+    The chunk's images and renditions are loaded in two queries, and its HTML
+    is cached until an image in the collection next changes, see
+    `invalidate_gallery`.
+    """
+
+    def render():
+        images = get_gallery_paginator(collection_id).page(after)
+        plan = RenditionPlan()
+        for image in images:
+            plan.add(image, GALLERY_RENDITIONS)
+        plan.resolve()
+
+        next_query = None
+        if images.has_next():
+            next_query = urlencode({"after": images.next_cursor})
+        return render_to_string(
+            "tags/gallery.html",
+            {
+                "images": images,
+                "next_query": next_query,
+                "chunk_url": page.get_url(request)
+                + page.reverse_subpage("gallery_chunk"),
+            },
+        )
+
+    if getattr(request, "is_preview", False):
+        return render()
+    return get_fragment(get_fragment_name(collection_id), [page, after or ""], render)
@@ -0,0 +1,101 @@
+from django.core.cache import cache
+from django.db.models import prefetch_related_objects
+from wagtail.images.models import Filter
+from wagtail.models import Page
+
+from bakerydemo.base.cache import get_content_generation
+from bakerydemo.base.images import RenditionPlan, prefetch_images
+
+CACHE_KEY_PREFIX = "home-featured-sections"
+CACHE_TIMEOUT = 60 * 60 * 24
+
+# The featured section fields of HomePage, with how many children home_page.html
+# shows for each, the renditions of the card it shows them with and the
+# related objects the card displays
+FEATURED_SECTIONS = [
+    (
+        "featured_section_1",
+        3,
+        Filter.expand_spec("format-{avif,webp,jpeg} fill-180x180-c100"),
+        ["origin", "bread_type"],
+    ),
+    (
+        "featured_section_2",
+        3,
+        Filter.expand_spec("format-{avif,webp,jpeg} fill-{300x320-c100,430x320-c100}"),
+        [],
+    ),
+    (
+        "featured_section_3",
+        6,
+        Filter.expand_spec("format-{avif,webp,jpeg} fill-{250x320-c100,433x487-c100}"),
+        [],
+    ),
+]
+
+
+# The renditions of the hero and promo images home_page.html shows
+HERO_RENDITIONS = Filter.expand_spec("format-{avif,webp,jpeg} fill-{800x650,1920x900}")
+PROMO_RENDITIONS = Filter.expand_spec("format-{avif,webp,jpeg} fill-590x413-c100")
+
+
+def get_cache_key(home_page):
+    return f"{CACHE_KEY_PREFIX}:{home_page.pk}:{get_content_generation()}"
+
+
+def build_featured_children(home_page):
+    """
+    Returns the live children shown for each of `home_page`'s featured
+    sections, keyed by the section's field name, as specific pages with their
+    images, card renditions and displayed related objects loaded in bulk.
+    """
+    section_ids = {
+        field_name: getattr(home_page, f"{field_name}_id")
+        for field_name, *_ in FEATURED_SECTIONS
+    }
+    sections = Page.objects.only("path", "depth").in_bulk(
+        [pk for pk in section_ids.values() if pk is not None]
+    )
+
+    featured_children = {}
+    for field_name, limit, filter_specs, related_fields in FEATURED_SECTIONS:
+        section = sections.get(section_ids[field_name])
+        if section is None:
+            continue
+        # LIMIT the children before resolving them to their specific types,
+        # so only the pages shown are fetched from each type's table
+        children = list(section.get_children().live()[:limit].specific())
+        prefetch_images(children, filter_specs=filter_specs)
+        for field in related_fields:
+            prefetch_related_objects(
+                [child for child in children if hasattr(type(child), field)], field
+            )
+        featured_children[field_name] = children
+    return featured_children
+
+
+def get_featured_children(home_page):
+    """
+    Cached `build_featured_children`, until a page is next published,
+    unpublished or deleted.
+    """
+    key = get_cache_key(home_page)
+    featured_children = cache.get(key)
+    if featured_children is None:
+        featured_children = build_featured_children(home_page)
+        cache.set(key, featured_children, CACHE_TIMEOUT)
+    return featured_children
+
+
+def resolve_home_page_renditions(home_page, featured_children):
+    """
+    Resolves every rendition home_page.html shows at once: the hero and promo
+    images and the featured section cards, whose renditions are usually
+    already loaded with them.
+    """
+    plan = RenditionPlan()
+    plan.add(home_page.image, HERO_RENDITIONS)
+    plan.add(home_page.promo_image, PROMO_RENDITIONS)
+    for field_name, _, filter_specs, _ in FEATURED_SECTIONS:
+        plan.add_objects(featured_children.get(field_name, ()), filter_specs)
+    plan.resolve()
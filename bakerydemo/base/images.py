@@ -0,0 +1,303 @@
+import concurrent.futures
+import logging
+import os
+import re
+from collections import defaultdict
+from io import BytesIO
+
+from django.conf import settings
+from django.template.base import smart_split
+from wagtail.images import get_image_model
+from wagtail.images.models import Filter, SourceImageIOError
+
+from bakerydemo.base.template_warmup import find_template_names
+
+logger = logging.getLogger(__name__)
+
+# How many renditions RenditionPlan generates at once
+RENDITION_WORKERS = 4
+
+IMAGE_TAG_RE = re.compile(r"{%\s*(?:picture|image|srcset_image)\s+(.*?)\s*%}")
+
+
+class RenditionPlan:
+    """
+    The renditions a response is going to render, collected before it's
+    rendered so they can be resolved together rather than image by image.
+
+    `resolve` finds the existing renditions of every planned image with one
+    query, leaving out images whose prefetched renditions already include
+    them. It then generates any missing renditions in a thread pool and saves
+    them with a single bulk insert, except for images waiting in the
+    rendition queue, which show their original image in the meantime. The
+    renditions are attached to the images as prefetched renditions, so
+    `{% picture %}` and `{% image %}` tags for the planned filter specs make
+    no queries.
+
+    Only plan the filter specs the templates use: images are taken to have
+    no other renditions once the plan is resolved.
+    """
+
+    def __init__(self):
+        # Every instance of each image, as the same image can be loaded more
+        # than once, e.g. by two pages
+        self.images = defaultdict(list)
+        self.filters = defaultdict(dict)
+
+    def __len__(self):
+        return sum(len(filters) for filters in self.filters.values())
+
+    def add(self, image, filter_specs):
+        if image is None:
+            return
+        if not any(instance is image for instance in self.images[image.pk]):
+            self.images[image.pk].append(image)
+        for spec in filter_specs:
+            self.filters[image.pk].setdefault(spec, Filter(spec))
+
+    def add_objects(self, objects, filter_specs, field_name="image"):
+        for obj in objects:
+            self.add(getattr(obj, field_name, None), filter_specs)
+
+    def attach(self, image_id, renditions):
+        for image in self.images[image_id]:
+            if image._get_prefetched_renditions() is None:
+                image.prefetched_renditions = []
+            existing = {
+                (rendition.filter_spec, rendition.focal_point_key)
+                for rendition in image._get_prefetched_renditions()
+            }
+            for rendition in renditions:
+                if (rendition.filter_spec, rendition.focal_point_key) not in existing:
+                    image._add_to_prefetched_renditions(rendition)
+
+    def get_missing(self):
+        # The planned filters of each image not in its prefetched renditions,
+        # keyed by (filter spec, focal point key) as renditions are
+        missing = {}
+        for image_id, filters in self.filters.items():
+            image = self.images[image_id][0]
+            wanted = {
+                (spec, filter.get_cache_key(image)): filter
+                for spec, filter in filters.items()
+            }
+            prefetched = image._get_prefetched_renditions() or ()
+            for rendition in prefetched:
+                wanted.pop((rendition.filter_spec, rendition.focal_point_key), None)
+            if wanted:
+                missing[image_id] = wanted
+        return missing
+
+    def find_existing(self, missing):
+        Rendition = get_image_model().get_rendition_model()
+        specs = {spec for wanted in missing.values() for spec, _ in wanted}
+        found = defaultdict(list)
+        for rendition in Rendition.objects.filter(
+            image_id__in=list(missing), filter_spec__in=specs
+        ):
+            key = (rendition.filter_spec, rendition.focal_point_key)
+            if missing[rendition.image_id].pop(key, None) is not None:
+                # Saves a query for the image when rendering the rendition
+                rendition.image = self.images[rendition.image_id][0]
+                found[rendition.image_id].append(rendition)
+        return found
+
+    def generate(self, missing):
+        def generate_image_renditions(image_id, filters):
+            # Renditions that can't be generated are left for the template
+            # tags, so they fail the same way they would without the plan
+            return generate_rendition_instances(self.images[image_id][0], filters)[0]
+
+        with concurrent.futures.ThreadPoolExecutor(RENDITION_WORKERS) as executor:
+            futures = [
+                executor.submit(generate_image_renditions, image_id, wanted.values())
+                for image_id, wanted in missing.items()
+                if wanted
+            ]
+            return [
+                rendition
+                for future in concurrent.futures.as_completed(futures)
+                for rendition in future.result()
+            ]
+
+    def attach_placeholders(self, missing):
+        # Images just uploaded have their renditions generated by the
+        # rendition queue. Show their originals until then, rather than make
+        # this request wait for them
+        from bakerydemo.base.rendition_queue import get_pending_image_ids
+
+        for image_id in get_pending_image_ids(list(missing)):
+            image = self.images[image_id][0]
+            self.attach(
+                image_id,
+                [
+                    get_placeholder_rendition(image, filter)
+                    for filter in missing.pop(image_id).values()
+                ],
+            )
+
+    def resolve(self):
+        missing = self.get_missing()
+        if not missing:
+            return
+        for image_id, renditions in self.find_existing(missing).items():
+            self.attach(image_id, renditions)
+        missing = {image_id: wanted for image_id, wanted in missing.items() if wanted}
+        if not missing:
+            return
+        self.attach_placeholders(missing)
+
+        to_create = self.generate(missing)
+        if not to_create:
+            return
+        Rendition = get_image_model().get_rendition_model()
+        # Renditions created by another request in the meantime are skipped
+        created = defaultdict(list)
+        for rendition in Rendition.objects.bulk_create(
+            to_create, ignore_conflicts=True
+        ):
+            created[rendition.image_id].append(rendition)
+        for image_id, renditions in created.items():
+            self.attach(image_id, renditions)
+
+
+def get_placeholder_rendition(image, filter):
+    """
+    Returns an unsaved rendition of `image` for `filter` that shows the
+    original image, to stand in for a rendition that hasn't been generated
+    yet. Browsers sniff the format of images, so it displays even in a
+    `<source>` for another format.
+    """
+    Rendition = image.get_rendition_model()
+    placeholder = Rendition(
+        image=image,
+        filter_spec=filter.spec,
+        focal_point_key=filter.get_cache_key(image),
+        file=image.file.name,
+        width=image.width,
+        height=image.height,
+    )
+    # Renditions can be kept in a different storage to the originals
+    placeholder.file.storage = image.file.storage
+    return placeholder
+
+
+def prefetch_images(objects, field_name="image", filter_specs=()):
+    """
+    Loads the images referenced by `field_name` on each of `objects` in a
+    single query, with their renditions, and attaches them to the objects.
+    Rendering `{% picture %}` / `{% image %}` tags for the objects then finds
+    existing renditions without a query per image.
+
+    `objects` may mix models; objects without the field are skipped.
+    `filter_specs` limits the renditions to those specs (e.g.
+    "fill-180x180-c100|format-webp"), creating any that are missing, as with
+    RenditionPlan. Otherwise all existing renditions are loaded.
+    """
+    attname = f"{field_name}_id"
+    image_ids = {getattr(obj, attname, None) for obj in objects}
+    image_ids.discard(None)
+    if not image_ids:
+        return
+
+    images = get_image_model().objects.filter(pk__in=image_ids)
+    if not filter_specs:
+        images = images.prefetch_renditions()
+    images = {image.pk: image for image in images}
+    for obj in objects:
+        image = images.get(getattr(obj, attname, None))
+        if image is not None:
+            setattr(obj, field_name, image)
+
+    if filter_specs:
+        plan = RenditionPlan()
+        plan.add_objects(objects, filter_specs, field_name=field_name)
+        plan.resolve()
+
+
+def resolve_renditions(objects, filter_specs, field_name="image"):
+    """
+    Resolves the `filter_specs` renditions of the images of `objects`, which
+    must already be loaded, with a RenditionPlan.
+    """
+    plan = RenditionPlan()
+    plan.add_objects(objects, filter_specs, field_name=field_name)
+    plan.resolve()
+    return objects
+
+
+def get_tag_filter_specs(arguments):
+    # The filter specs of an image tag are the arguments after the image and
+    # before any attributes or `as`, e.g.
+    # "page.image format-{avif,webp,jpeg} fill-180x180-c100 loading="lazy""
+    operations = []
+    for bit in list(smart_split(arguments))[1:]:
+        if bit == "as" or "=" in bit:
+            break
+        operations.append(bit)
+    if not operations:
+        return []
+    return Filter.expand_spec(" ".join(operations))
+
+
+def find_template_filter_specs(directory=None):
+    """
+    Returns every filter spec used by the `{% picture %}`, `{% image %}` and
+    `{% srcset_image %}` tags in the templates in `directory`, by default the
+    project's, with the formats and sizes they fan out to expanded, e.g.
+    "fill-180x180-c100|format-avif".
+    """
+    directory = directory or os.path.join(settings.PROJECT_DIR, "templates")
+    specs = set()
+    for name in find_template_names(directory):
+        with open(os.path.join(directory, name), encoding="utf-8") as f:
+            for arguments in IMAGE_TAG_RE.findall(f.read()):
+                specs.update(get_tag_filter_specs(arguments))
+    return sorted(specs)
+
+
+def generate_rendition_instances(image, filters):
+    """
+    Generates unsaved renditions of `image` for `filters`, reading the
+    original image once. A rendition that can't be generated, e.g. in a
+    format the image library can't encode, or because the original is
+    missing, doesn't stop the others.
+
+    Returns the renditions and the filters that failed.
+    """
+    try:
+        with image.open_file() as file:
+            source = file.read()
+    except SourceImageIOError:
+        logger.warning("Image %s has no original file", image.pk)
+        return [], list(filters)
+
+    renditions = []
+    failed = []
+    for filter in filters:
+        try:
+            renditions.append(
+                image.generate_rendition_instance(filter, BytesIO(source))
+            )
+        except Exception:  # noqa: BLE001
+            logger.warning(
+                "Couldn't generate %s of image %s", filter.spec, image.pk, exc_info=True
+            )
+            failed.append(filter)
+    return renditions, failed
+
+
+def generate_missing_renditions(image, filter_specs):
+    """
+    Generates and saves the renditions of `image` for `filter_specs`, which
+    are expected not to exist yet.
+
+    Returns how many renditions were created and the specs that failed.
+    """
+    renditions, failed = generate_rendition_instances(
+        image, [Filter(spec) for spec in filter_specs]
+    )
+    Rendition = image.get_rendition_model()
+    # Renditions created elsewhere in the meantime are skipped
+    Rendition.objects.bulk_create(renditions, ignore_conflicts=True)
+    return len(renditions), [filter.spec for filter in failed]
@@ -0,0 +1,150 @@
+import multiprocessing
+import time
+from collections import Counter
+
+import django
+from django.core.management.base import BaseCommand
+from django.db import connections
+from wagtail.images import get_image_model
+from wagtail.images.models import Filter
+
+from bakerydemo.base.images import (
+    find_template_filter_specs,
+    generate_missing_renditions,
+)
+
+
+def init_worker():
+    # Forked workers mustn't share the parent's database connections, and
+    # spawned ones need Django set up
+    django.setup()
+    connections.close_all()
+
+
+def generate_image_renditions(task):
+    image_id, filter_specs = task
+    try:
+        image = get_image_model().objects.get(pk=image_id)
+    except get_image_model().DoesNotExist:
+        # Deleted since it was checked
+        return 0, []
+    return generate_missing_renditions(image, filter_specs)
+
+
+class Command(BaseCommand):
+    help = (
+        "Generates every missing rendition the templates use, so visitors "
+        "never wait for them. Safe to interrupt: running it again carries on "
+        "from the renditions already saved."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--processes",
+            type=int,
+            default=multiprocessing.cpu_count(),
+            help="How many processes to generate renditions with",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=100,
+            help="How many images to check for missing renditions at a time",
+        )
+        parser.add_argument(
+            "--spec",
+            action="append",
+            dest="specs",
+            help=(
+                "A filter spec to generate, e.g. 'format-{avif,webp,jpeg} "
+                "fill-180x180-c100'. Defaults to those found in the templates"
+            ),
+        )
+
+    def get_filter_specs(self, specs):
+        if not specs:
+            return find_template_filter_specs()
+        return sorted(
+            {expanded for spec in specs for expanded in Filter.expand_spec(spec)}
+        )
+
+    def get_tasks(self, images, filters):
+        Rendition = get_image_model().get_rendition_model()
+        existing = set(
+            Rendition.objects.filter(
+                image__in=images, filter_spec__in=[f.spec for f in filters]
+            ).values_list("image_id", "filter_spec", "focal_point_key")
+        )
+        tasks = []
+        for image in images:
+            missing = [
+                f.spec
+                for f in filters
+                if (image.pk, f.spec, f.get_cache_key(image)) not in existing
+            ]
+            if missing:
+                tasks.append((image.pk, missing))
+        return tasks
+
+    def get_image_chunks(self, chunk_size):
+        # Keyset pagination, as images can be added while this runs
+        images = get_image_model().objects.order_by("pk")
+        last_pk = 0
+        while True:
+            chunk = list(images.filter(pk__gt=last_pk)[:chunk_size])
+            if not chunk:
+                return
+            yield chunk
+            last_pk = chunk[-1].pk
+
+    def handle(self, **options):
+        filters = [Filter(spec) for spec in self.get_filter_specs(options["specs"])]
+        self.stdout.write(f"Generating {len(filters)} filter specs")
+
+        processes = max(1, options["processes"])
+        pool = None
+        if processes > 1:
+            connections.close_all()
+            pool = multiprocessing.Pool(processes, initializer=init_worker)
+        run = pool.imap_unordered if pool else map
+
+        start = time.perf_counter()
+        checked = processed = created = 0
+        failed = Counter()
+        try:
+            for images in self.get_image_chunks(options["chunk_size"]):
+                tasks = self.get_tasks(images, filters)
+                for image_created, image_failed in run(
+                    generate_image_renditions, tasks
+                ):
+                    processed += 1
+                    created += image_created
+                    failed.update(image_failed)
+                checked += len(images)
+                elapsed = time.perf_counter() - start
+                self.stdout.write(
+                    f"{checked} images checked, {processed} needed renditions, "
+                    f"{created} renditions created ({processed / elapsed:.1f} "
+                    f"images/s, {created / elapsed:.1f} renditions/s)"
+                )
+        except KeyboardInterrupt:
+            if pool:
+                pool.terminate()
+            self.stderr.write(
+                "Interrupted. Run the command again to carry on where it stopped."
+            )
+            return
+        finally:
+            if pool:
+                pool.close()
+                pool.join()
+
+        elapsed = time.perf_counter() - start
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Created {created} renditions for {processed} of {checked} images "
+                f"in {elapsed:.1f}s ({processed / elapsed:.1f} images/s)"
+            )
+        )
+        for spec, count in sorted(failed.items()):
+            self.stderr.write(f"Couldn't generate {spec} for {count} images")
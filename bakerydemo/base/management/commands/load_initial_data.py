@@ -1,4 +1,7 @@
+import concurrent.futures
+import hashlib
 import os
+import time
 
 from django.conf import settings
 from django.core.files.storage import FileSystemStorage, default_storage
@@ -6,29 +9,103 @@ from django.core.management import call_command
 from django.core.management.base import BaseCommand
 from wagtail.models import Page, Site
 
+# How many files are copied to the storage at once. Mostly waiting on uploads
+# to cloud storage, so more than there are CPUs
+COPY_WORKERS = 8
+
+
+def list_files(storage, path=""):
+    """
+    Yields the name of every file under `path` in `storage`, recursively.
+    """
+    directories, file_names = storage.listdir(path)
+    for directory in directories:
+        yield from list_files(storage, path + directory + "/")
+    for file_name in file_names:
+        yield path + file_name
+
+
+def get_checksum(storage, name):
+    checksum = hashlib.md5(usedforsecurity=False)
+    with storage.open(name) as file_:
+        for chunk in file_.chunks():
+            checksum.update(chunk)
+    return checksum.hexdigest()
+
+
+def copy_file(source, destination, name):
+    """
+    Copies the file `name` from the `source` storage to the same name in the
+    `destination` storage, unless it's already there with the same size and
+    checksum. Returns whether it was copied, and its size.
+    """
+    size = source.size(name)
+    if destination.exists(name):
+        # Only download the copy to compare checksums if the sizes match
+        if destination.size(name) == size and get_checksum(
+            destination, name
+        ) == get_checksum(source, name):
+            return False, size
+        # Saving over a file stores it under another name, but the initial
+        # data refers to this one
+        destination.delete(name)
+    with source.open(name) as file_:
+        destination.save(name, file_)
+    return True, size
+
 
 class Command(BaseCommand):
-    def _copy_files(self, local_storage, path):
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--copy-workers",
+            type=int,
+            default=COPY_WORKERS,
+            help="How many media files to copy to the storage at once",
+        )
+
+    def copy_files(self, source, destination, workers=COPY_WORKERS):
         """
-        Recursively copy files from local_storage to default_storage. Used
-        to automatically bootstrap the media directory (both locally and on
-        cloud providers) with the images linked from the initial data (and
-        included in MEDIA_ROOT).
+        Copies every file in the `source` storage to the `destination`
+        storage, `workers` at a time. Used to automatically bootstrap the
+        media directory (both locally and on cloud providers) with the images
+        linked from the initial data (and included in MEDIA_ROOT). Files
+        already copied by an earlier run are skipped, so running it again,
+        e.g. in reset_demo, only copies what's missing or changed.
+
+        Returns how many files were copied and skipped.
         """
-        directories, file_names = local_storage.listdir(path)
-        for directory in directories:
-            self._copy_files(local_storage, path + directory + "/")
-        for file_name in file_names:
-            with local_storage.open(path + file_name) as file_:
-                default_storage.save(path + file_name, file_)
+        names = list(list_files(source))
+        copied = skipped = copied_bytes = 0
+        start = time.perf_counter()
+        with concurrent.futures.ThreadPoolExecutor(max(1, workers)) as executor:
+            futures = [
+                executor.submit(copy_file, source, destination, name) for name in names
+            ]
+            for done, future in enumerate(
+                concurrent.futures.as_completed(futures), start=1
+            ):
+                was_copied, size = future.result()
+                if was_copied:
+                    copied += 1
+                    copied_bytes += size
+                else:
+                    skipped += 1
+                if done % 10 == 0 or done == len(names):
+                    elapsed = time.perf_counter() - start
+                    self.stdout.write(
+                        f"{done}/{len(names)} files, {copied} copied and "
+                        f"{skipped} already there "
+                        f"({copied_bytes / 1e6 / elapsed:.1f} MB/s)"
+                    )
+        return copied, skipped
 
     def handle(self, **options):
         fixtures_dir = os.path.join(settings.PROJECT_DIR, "base", "fixtures")
         fixture_file = os.path.join(fixtures_dir, "bakerydemo.json")
 
-        print("Copying media files to configured storage...")  # noqa: T201
+        self.stdout.write("Copying media files to configured storage...")
         local_storage = FileSystemStorage(os.path.join(fixtures_dir, "media"))
-        self._copy_files(local_storage, "")  # file storage paths are relative
+        self.copy_files(local_storage, default_storage, options["copy_workers"])
 
         # Wagtail creates default Site and Page instances during install, but we already have
         # them in the data load. Remove the auto-generated ones.
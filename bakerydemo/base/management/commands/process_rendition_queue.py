@@ -0,0 +1,52 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from bakerydemo.base.rendition_queue import process_batch
+
+
+class Command(BaseCommand):
+    help = (
+        "Generates the renditions of images waiting in the rendition queue. "
+        "For deployments that run it as its own process, with "
+        "RENDITION_QUEUE_INTERVAL set to 0 in the web processes."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Stop once the queue is empty, rather than wait for more jobs",
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=settings.RENDITION_QUEUE_INTERVAL or 5,
+            help="How many seconds to wait before checking an empty queue again",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=settings.RENDITION_QUEUE_WORKERS,
+            help="How many images to generate renditions for at once",
+        )
+
+    def handle(self, **options):
+        processed = 0
+        try:
+            while True:
+                claimed = process_batch(workers=max(1, options["workers"]))
+                processed += claimed
+                if claimed:
+                    self.stdout.write(f"{processed} images processed")
+                elif options["once"]:
+                    break
+                else:
+                    time.sleep(options["interval"])
+        except KeyboardInterrupt:
+            self.stderr.write("Interrupted.")
+            return
+        self.stdout.write(
+            self.style.SUCCESS(f"Processed {processed} images, the queue is empty")
+        )
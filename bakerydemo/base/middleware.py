@@ -0,0 +1,14 @@
+from bakerydemo.base.request_context import SiteContext
+
+
+class SiteContextMiddleware:
+    """
+    Attaches a SiteContext to every request. See base/request_context.py
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request.site_context = SiteContext(request)
+        return self.get_response(request)
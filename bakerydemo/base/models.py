@@ -3,6 +3,7 @@ from __future__ import unicode_literals
 from django.conf import settings
 from django.contrib.contenttypes.fields import GenericRelation
 from django.db import models
+from django.http import Http404, HttpResponseBadRequest, JsonResponse
 from django.utils.translation import gettext as _
 from modelcluster.fields import ParentalKey
 from modelcluster.models import ClusterableModel
@@ -14,6 +15,7 @@ from wagtail.admin.panels import (
     PublishingPanel,
 )
 from wagtail.contrib.forms.models import AbstractEmailForm, AbstractFormField
+from wagtail.contrib.routable_page.models import RoutablePageMixin, route
 from wagtail.contrib.settings.models import (
     BaseGenericSetting,
     BaseSiteSetting,
@@ -35,6 +37,9 @@ from wagtail.models import (
 from wagtail.search import index
 
 from .blocks import BaseStreamBlock
+from .gallery import render_gallery_chunk
+from .home import get_featured_children, resolve_home_page_renditions
+from .pagination import InvalidCursor
 
 
 class Person(
@@ -393,11 +398,20 @@ class HomePage(Page):
         ),
     ]
 
+    # Adds the children shown for each featured section to the context, keyed
+    # by section field name. They're loaded with LIMITed queries and cached
+    # until a page is next published, rather than queried on every request.
+    def get_context(self, request):
+        context = super().get_context(request)
+        context["featured_children"] = get_featured_children(self)
+        resolve_home_page_renditions(self, context["featured_children"])
+        return context
+
     def __str__(self):
         return self.title
 
 
-class GalleryPage(Page):
+class GalleryPage(RoutablePageMixin, Page):
     """
     This is a page to list locations from the selected Collection. We use a Q
     object to list any Collection created (/admin/collections/) even if they
@@ -437,6 +451,20 @@ class GalleryPage(Page):
     # array no subpage can be added
     subpage_types = []
 
+    # The "Load more" link of the gallery fetches the next chunk of images
+    # from here, e.g. chunk/?after=<cursor>, as {"html": ...}
+    @route(r"^chunk/$", name="gallery_chunk")
+    def gallery_chunk(self, request):
+        if self.collection_id is None:
+            raise Http404
+        try:
+            html = render_gallery_chunk(
+                self, self.collection_id, request.GET.get("after"), request
+            )
+        except InvalidCursor:
+            return HttpResponseBadRequest("Invalid cursor")
+        return JsonResponse({"html": html})
+
 
 class FormField(AbstractFormField):
     """
@@ -573,3 +601,36 @@ class UserApprovalTask(Task):
     @classmethod
     def get_description(cls):
         return _("Only a specific user can approve this task")
+
+
+class RenditionJob(models.Model):
+    """
+    An image whose standard renditions are waiting to be generated by the
+    rendition queue, see base/rendition_queue.py
+    """
+
+    image = models.OneToOneField(
+        "wagtailimages.Image",
+        on_delete=models.CASCADE,
+        related_name="+",
+    )
+    enqueued_at = models.DateTimeField(db_index=True)
+    claimed_at = models.DateTimeField(null=True, blank=True)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+
+    def __str__(self):
+        return f"Renditions of image {self.image_id}"
+
+
+class SearchHitFlushRequest(models.Model):
+    """
+    When the flush_search_hits command last asked the web processes to write
+    their buffered search query hits, see search/hits.py. There is only ever
+    one row.
+    """
+
+    requested_at = models.DateTimeField()
+
+    def __str__(self):
+        return f"Search hits flush requested at {self.requested_at}"
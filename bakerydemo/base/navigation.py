@@ -0,0 +1,208 @@
+import time
+from typing import NamedTuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import translation
+from wagtail.coreutils import get_supported_content_language_variant
+from wagtail.models import Page, Site
+
+# The main menu shows the site root's children and their children, so only
+# pages up to two levels below the root ever need to be loaded (treebeard
+# depth 4 for a site rooted at depth 2).
+MENU_DEPTH = 2
+
+CACHE_KEY_PREFIX = "navigation-tree"
+BREADCRUMB_CACHE_KEY_PREFIX = "breadcrumb"
+BREADCRUMB_VERSION_KEY = "breadcrumb-version"
+# Publishing drops the cached menus and breadcrumbs, but only from the cache
+# of the process that published if the cache isn't shared between processes,
+# like the local memory cache production falls back to without Redis. So they
+# also expire.
+CACHE_TIMEOUT = 10 * 60
+
+
+class MenuItem(NamedTuple):
+    """
+    A single in-menu page, reduced to what the menu templates render. Items
+    are shared between requests through the cache, so they must never be
+    mutated with per-request state such as the active flag.
+    """
+
+    id: int
+    title: str
+    url_path: str
+    url: str
+    children: tuple
+
+    @property
+    def has_children(self):
+        return bool(self.children)
+
+
+class Breadcrumb(NamedTuple):
+    title: str
+    url: str
+
+
+class NavigationTree:
+    """
+    The live, in-menu pages below a site root, built from a single
+    path-ordered query.
+    """
+
+    def __init__(self, root_ids, items):
+        self.root_ids = frozenset(root_ids)
+        self.items = items
+        self.index = {}
+        stack = list(items)
+        while stack:
+            item = stack.pop()
+            self.index[item.id] = item
+            stack.extend(item.children)
+
+    def children_of(self, page_id):
+        if page_id in self.root_ids:
+            return self.items
+        item = self.index.get(page_id)
+        return item.children if item else ()
+
+    def active_item(self, items, calling_page):
+        # We don't directly check if calling_page is None since the template
+        # engine can pass an empty string to calling_page
+        # if the variable passed as calling_page does not exist.
+        if not calling_page:
+            return None
+        for item in items:
+            if calling_page.url_path.startswith(item.url_path):
+                return item
+        return None
+
+
+def get_active_language():
+    try:
+        return get_supported_content_language_variant(translation.get_language())
+    except LookupError:
+        return get_supported_content_language_variant(settings.LANGUAGE_CODE)
+
+
+def get_cache_key(site_id, language_code):
+    return f"{CACHE_KEY_PREFIX}:{site_id}:{language_code}"
+
+
+def build_navigation_tree(site):
+    site_root = site.root_page
+    root = site_root.localized
+
+    pages = (
+        Page.objects.live()
+        .in_menu()
+        .descendant_of(root)
+        .filter(depth__lte=root.depth + MENU_DEPTH)
+        .order_by("path")
+    )
+
+    # Pages come back in path order, so a parent is always seen before its
+    # children. Anything whose parent was filtered out (not live or hidden
+    # from menus) is unreachable from the menu and is dropped.
+    children = {root.path: []}
+    for page in pages:
+        parent_path = page.path[: -Page.steplen]
+        if parent_path in children:
+            children[parent_path].append(page)
+            children[page.path] = []
+
+    def build(path):
+        return tuple(
+            MenuItem(
+                id=page.id,
+                title=page.title,
+                url_path=page.url_path,
+                url=page.get_url(current_site=site),
+                children=build(page.path),
+            )
+            for page in children[path]
+        )
+
+    return NavigationTree({site_root.id, root.id}, build(root.path))
+
+
+def get_navigation_tree(site):
+    key = get_cache_key(site.pk, get_active_language())
+    tree = cache.get(key)
+    if tree is None:
+        tree = build_navigation_tree(site)
+        cache.set(key, tree, CACHE_TIMEOUT)
+    return tree
+
+
+def invalidate_navigation_trees():
+    language_codes = [code for code, _ in settings.WAGTAIL_CONTENT_LANGUAGES]
+    cache.delete_many(
+        [
+            get_cache_key(site_id, language_code)
+            for site_id in Site.objects.values_list("pk", flat=True)
+            for language_code in language_codes
+        ]
+    )
+
+
+def get_breadcrumb_version():
+    # Moves can shift the treebeard paths of whole subtrees, so rather than
+    # working out which cached paths are affected the version is replaced,
+    # orphaning every breadcrumb cached so far.
+    return cache.get_or_set(BREADCRUMB_VERSION_KEY, time.time_ns, None)
+
+
+def get_breadcrumb_cache_key(site_id, path):
+    return f"{BREADCRUMB_CACHE_KEY_PREFIX}:{site_id}:{path}"
+
+
+def get_breadcrumbs(page, site):
+    """
+    Returns a Breadcrumb for each ancestor of the page below the tree root,
+    followed by the page itself. The treebeard path already encodes every
+    ancestor's path, so ancestors are looked up in the cache by path and only
+    the missing ones are loaded, all in one query.
+    """
+    version = get_breadcrumb_version()
+    keys = {
+        get_breadcrumb_cache_key(site.pk, page.path[: depth * Page.steplen]): depth
+        for depth in range(2, page.depth)
+    }
+    breadcrumbs = cache.get_many(keys, version=version)
+
+    missing_paths = [
+        page.path[: depth * Page.steplen]
+        for key, depth in keys.items()
+        if key not in breadcrumbs
+    ]
+    if missing_paths:
+        fetched = {
+            get_breadcrumb_cache_key(site.pk, ancestor.path): Breadcrumb(
+                ancestor.title, ancestor.get_url(current_site=site)
+            )
+            for ancestor in Page.objects.filter(path__in=missing_paths)
+        }
+        cache.set_many(fetched, CACHE_TIMEOUT, version=version)
+        breadcrumbs.update(fetched)
+
+    return [breadcrumbs[key] for key in keys if key in breadcrumbs] + [
+        Breadcrumb(page.title, None)
+    ]
+
+
+def invalidate_breadcrumbs(paths):
+    site_ids = list(Site.objects.values_list("pk", flat=True))
+    cache.delete_many(
+        [
+            get_breadcrumb_cache_key(site_id, path)
+            for site_id in site_ids
+            for path in paths
+        ],
+        version=get_breadcrumb_version(),
+    )
+
+
+def invalidate_all_breadcrumbs():
+    cache.set(BREADCRUMB_VERSION_KEY, time.time_ns(), None)
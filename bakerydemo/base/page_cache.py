@@ -0,0 +1,191 @@
+import functools
+import hashlib
+import time
+
+from django.conf import settings
+from django.contrib import messages
+from django.core.cache import cache
+from django.db.models import Q
+from django.utils.cache import cc_delim_re, get_max_age
+from django.utils.http import urlencode
+from wagtail.models import Page
+
+from bakerydemo.base.models import HomePage
+from bakerydemo.base.navigation import get_active_language
+
+CACHE_KEY_PREFIX = "page-cache"
+GENERATION_KEY = "page-cache-generation"
+PAGE_VERSION_KEY_PREFIX = "page-cache-version"
+
+
+def get_generation():
+    # A timestamp, as with the content generation in base/cache.py, so it
+    # can't go back to an old value if the key is evicted
+    return cache.get_or_set(GENERATION_KEY, time.time_ns, None)
+
+
+def get_page_version_key(page_id):
+    return f"{PAGE_VERSION_KEY_PREFIX}:{page_id}"
+
+
+def get_page_version(page_id):
+    return cache.get_or_set(get_page_version_key(page_id), time.time_ns, None)
+
+
+def get_cache_key(request):
+    """
+    Returns the key the response to `request` is cached under, made from the
+    host (and so the site), the path, the active language and the query
+    parameters in PAGE_CACHE_QUERY_PARAMS. Returns None if the request has any
+    other query parameters, as they may change the response.
+    """
+    params = sorted(request.GET.lists())
+    if any(name not in settings.PAGE_CACHE_QUERY_PARAMS for name, _ in params):
+        return None
+    url = f"{request.get_host()}{request.path}?{urlencode(params, doseq=True)}"
+    url_hash = hashlib.md5(url.encode(), usedforsecurity=False).hexdigest()
+    return f"{CACHE_KEY_PREFIX}:{get_active_language()}:{url_hash}"
+
+
+def is_cacheable_request(request):
+    return (
+        request.method in ("GET", "HEAD")
+        and not request.user.is_authenticated
+        and not getattr(request, "is_preview", False)
+        # Pages show messages left for the visitor, which mustn't be cached
+        # for everyone else
+        and not len(messages.get_messages(request))
+    )
+
+
+def is_cacheable_response(request, response):
+    return (
+        response.status_code == 200
+        and not response.streaming
+        and not response.cookies
+        # The page renders a CSRF token, e.g. a form page
+        and not request.META.get("CSRF_COOKIE_NEEDS_UPDATE")
+    )
+
+
+def get_cache_timeout(response):
+    """
+    Returns how many seconds `response` can be cached for: PAGE_CACHE_TIMEOUT,
+    or the max-age of its Cache-Control header if that's shorter, e.g. for the
+    locations pages, which show whether each location is open. Returns 0 if
+    the header doesn't allow shared caching.
+    """
+    if not response.has_header("Cache-Control"):
+        return settings.PAGE_CACHE_TIMEOUT
+    directives = {
+        directive.split("=")[0].strip().lower()
+        for directive in cc_delim_re.split(response["Cache-Control"])
+    }
+    if directives & {"private", "no-cache", "no-store"}:
+        return 0
+    max_age = get_max_age(response)
+    if max_age is None:
+        return 0
+    return min(settings.PAGE_CACHE_TIMEOUT, max_age)
+
+
+def get_cached_response(key):
+    entry = cache.get(key)
+    if entry is None:
+        return None
+    generation, page_id, version, response = entry
+    current = cache.get_many([GENERATION_KEY, get_page_version_key(page_id)])
+    if current.get(GENERATION_KEY) != generation:
+        return None
+    if current.get(get_page_version_key(page_id)) != version:
+        return None
+    return response
+
+
+def cache_page_response(view):
+    """
+    Wraps Wagtail's `serve` view to cache whole responses for anonymous
+    visitors for PAGE_CACHE_TIMEOUT seconds, if that setting is not 0, or for
+    the max-age of responses that set a shorter one.
+
+    Cached responses are tied to the page that served them, so publishing a
+    page only purges the responses of the pages it affects (see
+    `purge_page`), along with any of that page's sub-routes such as the blog
+    tag archives. Changes shown on every page, like the menu and footer, purge
+    everything (`purge_all`). Purging works by changing a version stored in
+    the cache rather than deleting keys, so it works the same with every
+    cache backend.
+    """
+
+    @functools.wraps(view)
+    def wrapper(request, path, *args, **kwargs):
+        if not settings.PAGE_CACHE_TIMEOUT or not is_cacheable_request(request):
+            return view(request, path, *args, **kwargs)
+        key = get_cache_key(request)
+        if key is None:
+            return view(request, path, *args, **kwargs)
+
+        response = get_cached_response(key)
+        if response is not None:
+            return response
+
+        # The route is memoised on the request, so the view doesn't route again
+        route = Page.route_for_request(request, path)
+        if route is None:
+            return view(request, path, *args, **kwargs)
+        page = route[0]
+        # Take the versions before rendering, so that a purge while rendering
+        # isn't lost
+        generation = get_generation()
+        version = get_page_version(page.pk)
+
+        def store(response):
+            timeout = get_cache_timeout(response)
+            if not timeout or not is_cacheable_response(request, response):
+                return
+            # Restricted pages could be served from the cache to visitors that
+            # haven't passed the restriction, so never cache them
+            if page.get_view_restrictions().exists():
+                return
+            entry = (generation, page.pk, version, response)
+            cache.set(key, entry, timeout)
+
+        response = view(request, path, *args, **kwargs)
+        if hasattr(response, "add_post_render_callback"):
+            response.add_post_render_callback(store)
+        else:
+            store(response)
+        return response
+
+    return wrapper
+
+
+def purge_pages(page_ids):
+    now = time.time_ns()
+    cache.set_many({get_page_version_key(page_id): now for page_id in page_ids}, None)
+
+
+def purge_all():
+    cache.set(GENERATION_KEY, time.time_ns(), None)
+
+
+def purge_page(page):
+    """
+    Purges the cached responses showing `page`: the page itself, its
+    ancestors, which list it, its descendants, whose breadcrumbs show it, and
+    the home pages featuring any of its ancestors. If the page is in the
+    menus, every page shows it, so everything is purged.
+    """
+    if page.show_in_menus:
+        purge_all()
+        return
+
+    page_ids = [page.pk]
+    page_ids += Page.objects.ancestor_of(page).values_list("pk", flat=True)
+    page_ids += Page.objects.descendant_of(page).values_list("pk", flat=True)
+    page_ids += HomePage.objects.filter(
+        Q(featured_section_1__in=page_ids)
+        | Q(featured_section_2__in=page_ids)
+        | Q(featured_section_3__in=page_ids)
+    ).values_list("pk", flat=True)
+    purge_pages(page_ids)
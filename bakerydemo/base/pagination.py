@@ -0,0 +1,220 @@
+import base64
+import binascii
+import json
+import time
+from collections.abc import Sequence
+
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.paginator import Paginator
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import F, Q
+from django.utils.functional import cached_property
+
+# How long the row count and page bookmarks of a CachedKeysetPaginator are
+# reused for, unless its index is invalidated first
+INDEX_CACHE_TIMEOUT = 600
+INDEX_VERSION_KEY_PREFIX = "keyset-index-version"
+
+
+class InvalidCursor(Exception):
+    pass
+
+
+class KeysetPage(Sequence):
+    """
+    One page of a `KeysetPaginator`. Behaves like a list of the page's objects
+    and knows the cursor of the page after it, if there is one.
+    """
+
+    def __init__(self, object_list, paginator, after, has_next):
+        self.object_list = object_list
+        self.paginator = paginator
+        self.after = after
+        self._has_next = has_next
+
+    def __repr__(self):
+        return f"<KeysetPage after {self.after!r}>"
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self.after is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+    @property
+    def next_cursor(self):
+        if not self._has_next:
+            return None
+        return self.paginator.get_cursor(self.object_list[-1])
+
+
+class KeysetPaginator:
+    """
+    Paginates a queryset by seeking past the last row of the previous page
+    rather than with an OFFSET, so a page costs the same however deep it is.
+
+    `ordering` lists the fields to order by, "-" prefixed for descending, and
+    must end in a unique field so every row has a distinct position. NULLs
+    sort last in either direction. Pages are requested with the opaque cursor
+    of the page before them (`KeysetPage.next_cursor`); no cursor is the first
+    page. Cursors stay valid as rows are added or removed.
+    """
+
+    def __init__(self, queryset, per_page, ordering):
+        self.per_page = per_page
+        self.fields = [(name.lstrip("-"), name.startswith("-")) for name in ordering]
+        self.queryset = queryset.order_by(
+            *[
+                F(name).desc(nulls_last=True)
+                if descending
+                else F(name).asc(nulls_last=True)
+                for name, descending in self.fields
+            ]
+        )
+
+    def get_cursor(self, obj):
+        values = [getattr(obj, name) for name, _ in self.fields]
+        data = json.dumps(values, cls=DjangoJSONEncoder, separators=(",", ":"))
+        return base64.urlsafe_b64encode(data.encode()).decode().rstrip("=")
+
+    def decode_cursor(self, cursor):
+        try:
+            padded = cursor + "=" * (-len(cursor) % 4)
+            values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        except (binascii.Error, UnicodeError, ValueError):
+            raise InvalidCursor(cursor)
+        if not isinstance(values, list) or len(values) != len(self.fields):
+            raise InvalidCursor(cursor)
+        model = self.queryset.model
+        try:
+            return [
+                None if value is None else model._meta.get_field(name).to_python(value)
+                for (name, _), value in zip(self.fields, values)
+            ]
+        except (TypeError, ValidationError):
+            raise InvalidCursor(cursor)
+
+    def get_seek_filter(self, values):
+        # Rows after the cursor are those equal to it on the first k - 1
+        # fields and after it on the k-th, for any k
+        seek = Q(pk__in=[])
+        equal = Q()
+        for (name, descending), value in zip(self.fields, values):
+            if value is None:
+                # NULLs sort last, so only other NULLs can follow a NULL
+                equal &= Q(**{f"{name}__isnull": True})
+                continue
+            lookup = "lt" if descending else "gt"
+            after = Q(**{f"{name}__{lookup}": value}) | Q(**{f"{name}__isnull": True})
+            seek |= equal & after
+            equal &= Q(**{name: value})
+        return seek
+
+    def page(self, after=None):
+        """
+        Returns the page following the `after` cursor. Raises InvalidCursor if
+        the cursor can't be decoded.
+        """
+        queryset = self.queryset
+        if after is not None:
+            queryset = queryset.filter(self.get_seek_filter(self.decode_cursor(after)))
+        # One extra row tells us whether there's a next page
+        object_list = list(queryset[: self.per_page + 1])
+        has_next = len(object_list) > self.per_page
+        return KeysetPage(object_list[: self.per_page], self, after, has_next)
+
+
+def get_index_version(name):
+    return cache.get_or_set(f"{INDEX_VERSION_KEY_PREFIX}:{name}", time.time_ns, None)
+
+
+def invalidate_index(name):
+    """
+    Makes the CachedKeysetPaginators with the `version_name` recount their
+    rows and forget their bookmarks, e.g. when one of the rows is published.
+    """
+    cache.set(f"{INDEX_VERSION_KEY_PREFIX}:{name}", time.time_ns(), None)
+
+
+class CachedKeysetPaginator(Paginator):
+    """
+    A drop-in replacement for Django's Paginator, numbered pages and all, that
+    avoids both the COUNT and the OFFSET on each request.
+
+    The total and the last row of each page (its "bookmark") are cached under
+    `cache_key` until `invalidate_index(version_name)` is next called, or for
+    INDEX_CACHE_TIMEOUT seconds. Bookmarks are recorded as pages are asked
+    for, by scanning the ordering columns from the last known bookmark, so
+    each row is read once per cache lifetime at most. Any page is then fetched
+    by seeking past the bookmark of the page before it, which costs the same
+    on page 1000 as on page 1. The total can be briefly out of date, but pages
+    always show the current rows.
+    """
+
+    def __init__(self, queryset, per_page, ordering, cache_key, version_name):
+        self.keyset = KeysetPaginator(queryset, per_page, ordering)
+        self.cache_key = cache_key
+        self.version_name = version_name
+        super().__init__(self.keyset.queryset, per_page)
+
+    @cached_property
+    def index_cache_key(self):
+        version = get_index_version(self.version_name)
+        return f"{self.cache_key}:{version}:{self.per_page}"
+
+    @cached_property
+    def count(self):
+        key = f"{self.index_cache_key}:count"
+        count = cache.get(key)
+        if count is None:
+            count = self.keyset.queryset.prefetch_related(None).count()
+            cache.set(key, count, INDEX_CACHE_TIMEOUT)
+        return count
+
+    def get_bookmarks(self, number):
+        """
+        Returns at least the first `number` bookmarks, or every bookmark there
+        is if there are fewer, extending the cached ones if need be.
+        """
+        key = f"{self.index_cache_key}:bookmarks"
+        bookmarks = cache.get(key, [])
+        if len(bookmarks) >= number:
+            return bookmarks
+
+        queryset = self.keyset.queryset.prefetch_related(None)
+        if bookmarks:
+            queryset = queryset.filter(self.keyset.get_seek_filter(bookmarks[-1]))
+        # Only the ordering columns are needed, not any related data
+        names = [name for name, _ in self.keyset.fields]
+        missing = number - len(bookmarks)
+        rows = queryset.values_list(*names)[: missing * self.per_page]
+        for position, row in enumerate(rows.iterator(), start=1):
+            if position % self.per_page == 0:
+                bookmarks.append(list(row))
+        cache.set(key, bookmarks, INDEX_CACHE_TIMEOUT)
+        return bookmarks
+
+    def page(self, number):
+        number = self.validate_number(number)
+        bookmarks = self.get_bookmarks(number - 1)[: number - 1] if number > 1 else []
+        while True:
+            queryset = self.keyset.queryset
+            if bookmarks:
+                seek = self.keyset.get_seek_filter(bookmarks[-1])
+                queryset = queryset.filter(seek)
+            object_list = list(queryset[: self.per_page])
+            # Rows removed since the count can leave fewer pages than it says,
+            # the last page there is is shown instead
+            if object_list or not bookmarks:
+                return self._get_page(object_list, number, self)
+            bookmarks.pop()
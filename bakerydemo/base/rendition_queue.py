@@ -0,0 +1,226 @@
+import concurrent.futures
+import functools
+import logging
+import os
+import threading
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F, Q
+from django.dispatch import Signal
+from django.utils import timezone
+from wagtail.images import get_image_model
+from wagtail.images.models import Filter
+
+from bakerydemo.base.images import (
+    find_template_filter_specs,
+    generate_missing_renditions,
+)
+from bakerydemo.base.models import RenditionJob
+
+logger = logging.getLogger(__name__)
+
+# How many jobs a worker claims at a time
+BATCH_SIZE = 10
+# A job claimed this long ago is taken to belong to a worker that died, and
+# can be claimed again
+CLAIM_TIMEOUT = timedelta(minutes=10)
+# Jobs that failed this many times are left in the queue, for inspection
+MAX_ATTEMPTS = 3
+# Requests stop showing originals for a job enqueued this long ago and
+# generate the renditions themselves, e.g. if no worker is running
+PENDING_TIMEOUT = timedelta(minutes=15)
+
+# Sent when the renditions of an image have been generated, so cached HTML
+# showing its original in their place can be purged
+renditions_generated = Signal()
+
+
+@functools.cache
+def get_standard_filter_specs():
+    # The renditions the templates show, which don't change while the
+    # process runs
+    return tuple(find_template_filter_specs())
+
+
+def enqueue_renditions(image):
+    """
+    Queues the generation of the standard renditions of `image`, replacing any
+    job already queued for it, and wakes this process's worker once the
+    current transaction commits.
+    """
+    RenditionJob.objects.update_or_create(
+        image_id=image.pk,
+        defaults={
+            "enqueued_at": timezone.now(),
+            "claimed_at": None,
+            "attempts": 0,
+            "last_error": "",
+        },
+    )
+    transaction.on_commit(get_rendition_worker().wake)
+
+
+def get_pending_image_ids(image_ids):
+    """
+    Returns which of `image_ids` have renditions waiting in the queue. Jobs
+    that have failed for good, or were enqueued more than PENDING_TIMEOUT
+    ago, aren't waited for.
+    """
+    return set(
+        RenditionJob.objects.filter(
+            Q(attempts__lt=MAX_ATTEMPTS) | Q(claimed_at__isnull=False),
+            image_id__in=image_ids,
+            enqueued_at__gt=timezone.now() - PENDING_TIMEOUT,
+        ).values_list("image_id", flat=True)
+    )
+
+
+def claim_jobs(limit=BATCH_SIZE):
+    """
+    Claims up to `limit` of the oldest jobs no other worker is running and
+    returns them as (job id, image id, enqueued at) tuples.
+    """
+    now = timezone.now()
+    candidates = (
+        RenditionJob.objects.filter(
+            Q(claimed_at__isnull=True) | Q(claimed_at__lt=now - CLAIM_TIMEOUT),
+            attempts__lt=MAX_ATTEMPTS,
+        )
+        .order_by("enqueued_at")
+        .values_list("pk", "image_id", "enqueued_at", "claimed_at")[:limit]
+    )
+    jobs = []
+    for pk, image_id, enqueued_at, claimed_at in candidates:
+        # Matches nothing if another worker claimed the job or the image was
+        # saved again since the job was read
+        claimed = RenditionJob.objects.filter(
+            pk=pk, enqueued_at=enqueued_at, claimed_at=claimed_at
+        ).update(claimed_at=now, attempts=F("attempts") + 1)
+        if claimed:
+            jobs.append((pk, image_id, enqueued_at))
+    return jobs
+
+
+def get_missing_filter_specs(image, filter_specs):
+    existing = set(
+        image.renditions.filter(filter_spec__in=filter_specs).values_list(
+            "filter_spec", "focal_point_key"
+        )
+    )
+    return [
+        spec
+        for spec in filter_specs
+        if (spec, Filter(spec).get_cache_key(image)) not in existing
+    ]
+
+
+def process_job(job_id, image_id, enqueued_at):
+    """
+    Generates the missing standard renditions of the job's image. The job is
+    removed once done, unless the image was saved again in the meantime, and
+    released to be retried if it fails.
+    """
+    job = RenditionJob.objects.filter(pk=job_id, enqueued_at=enqueued_at)
+    try:
+        image = get_image_model().objects.get(pk=image_id)
+        filter_specs = get_missing_filter_specs(image, get_standard_filter_specs())
+        created, failed = generate_missing_renditions(image, filter_specs)
+    except Exception:
+        logger.exception("Couldn't generate the renditions of image %s", image_id)
+        job.update(claimed_at=None, last_error=traceback.format_exc())
+        return
+
+    job.delete()
+    if failed:
+        logger.warning("Couldn't generate %s of image %s", ", ".join(failed), image_id)
+    if created:
+        renditions_generated.send(sender=RenditionJob, image=image)
+
+
+def process_job_in_thread(job):
+    try:
+        process_job(*job)
+    finally:
+        # Each thread has its own database connection, don't leave it open
+        connection.close()
+
+
+def process_batch(limit=BATCH_SIZE, workers=1):
+    """
+    Claims and processes up to `limit` jobs, `workers` at a time, and
+    returns how many were claimed.
+    """
+    jobs = claim_jobs(limit)
+    if workers > 1 and len(jobs) > 1:
+        with concurrent.futures.ThreadPoolExecutor(workers) as executor:
+            list(executor.map(process_job_in_thread, jobs))
+    else:
+        for job in jobs:
+            process_job(*job)
+    return len(jobs)
+
+
+class RenditionWorker:
+    """
+    Processes the rendition queue in a background thread, which checks it
+    every `interval` seconds and whenever this process enqueues a job. Every
+    web process can run one: jobs are claimed in the database, so each is only
+    processed once.
+    """
+
+    def __init__(self, interval, workers):
+        self.interval = interval
+        self.workers = workers
+        self._wake = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._thread_pid = None
+
+    def start(self):
+        if not self.interval:
+            return
+        # A thread started before a fork doesn't survive in the child process
+        if self._thread is not None and self._thread_pid == os.getpid():
+            return
+        with self._lock:
+            if self._thread is None or self._thread_pid != os.getpid():
+                self._thread_pid = os.getpid()
+                self._thread = threading.Thread(
+                    target=self._run, name="rendition-queue", daemon=True
+                )
+                self._thread.start()
+
+    def wake(self):
+        self.start()
+        self._wake.set()
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            try:
+                while process_batch(workers=self.workers):
+                    pass
+            except Exception:
+                logger.exception("Couldn't process the rendition queue")
+            finally:
+                connection.close()
+
+
+_worker = None
+_worker_lock = threading.Lock()
+
+
+def get_rendition_worker():
+    global _worker
+    if _worker is None:
+        with _worker_lock:
+            if _worker is None:
+                _worker = RenditionWorker(
+                    interval=settings.RENDITION_QUEUE_INTERVAL,
+                    workers=settings.RENDITION_QUEUE_WORKERS,
+                )
+    return _worker
@@ -0,0 +1,65 @@
+from wagtail.models import Locale, Site
+
+from bakerydemo.base.models import GenericSettings, SiteSettings
+
+
+class SiteContext:
+    """
+    Resolves the Site, its root page, the active locale and the site-wide
+    settings once per request, so template tags, base.html and the footer
+    all share the same lookups.
+
+    `hits` counts the lookups served from the memo and `misses` the ones
+    that had to be resolved, which makes the queries saved per request
+    easy to measure.
+    """
+
+    def __init__(self, request):
+        self.request = request
+        self.hits = 0
+        self.misses = 0
+        self._memo = {}
+
+    def _memoize(self, name, resolve):
+        if name in self._memo:
+            self.hits += 1
+        else:
+            self.misses += 1
+            self._memo[name] = resolve()
+        return self._memo[name]
+
+    @property
+    def site(self):
+        return self._memoize("site", lambda: Site.find_for_request(self.request))
+
+    @property
+    def root_page(self):
+        # This returns a core.Page. The main menu needs to have the
+        # site.root_page defined else will return an object attribute error
+        return self._memoize("root_page", lambda: self.site.root_page)
+
+    @property
+    def locale(self):
+        return self._memoize("locale", Locale.get_active)
+
+    @property
+    def site_settings(self):
+        return self._memoize(
+            "site_settings", lambda: SiteSettings.for_request(self.request)
+        )
+
+    @property
+    def generic_settings(self):
+        return self._memoize(
+            "generic_settings", lambda: GenericSettings.load(self.request)
+        )
+
+
+def get_site_context(request):
+    """
+    Returns the SiteContext attached by SiteContextMiddleware, creating one
+    for requests that didn't go through the middleware (e.g. in tests).
+    """
+    if not hasattr(request, "site_context"):
+        request.site_context = SiteContext(request)
+    return request.site_context
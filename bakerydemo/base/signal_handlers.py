@@ -0,0 +1,172 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from wagtail.images import get_image_model
+from wagtail.models import Page
+from wagtail.signals import (
+    page_published,
+    page_slug_changed,
+    page_unpublished,
+    post_page_move,
+    published,
+    unpublished,
+)
+
+from bakerydemo.base.cache import bump_content_generation
+from bakerydemo.base.footer import invalidate_footer_html
+from bakerydemo.base.fragment_cache import bump_fragment_version
+from bakerydemo.base.gallery import invalidate_gallery
+from bakerydemo.base.models import FooterText, GenericSettings, Person, SiteSettings
+from bakerydemo.base.navigation import (
+    invalidate_all_breadcrumbs,
+    invalidate_breadcrumbs,
+    invalidate_navigation_trees,
+)
+from bakerydemo.base.page_cache import purge_all, purge_page
+from bakerydemo.base.pagination import invalidate_index
+from bakerydemo.base.rendition_queue import enqueue_renditions, renditions_generated
+from bakerydemo.breads.models import BreadPage
+
+
+def invalidate_navigation(**kwargs):
+    invalidate_navigation_trees()
+    bump_fragment_version("header")
+
+
+def invalidate_page_breadcrumb(instance, **kwargs):
+    # A new title only goes live on publish
+    invalidate_breadcrumbs([instance.path])
+
+
+def invalidate_tree_breadcrumbs(**kwargs):
+    # Slug changes alter the URL of every descendant and moves can shift the
+    # paths of whole subtrees
+    invalidate_all_breadcrumbs()
+
+
+def invalidate_content(**kwargs):
+    bump_content_generation()
+
+
+def invalidate_breads_index(**kwargs):
+    invalidate_index("breads")
+
+
+def invalidate_footer(**kwargs):
+    invalidate_footer_html()
+    bump_fragment_version("footer")
+
+
+def invalidate_footer_fragment(**kwargs):
+    bump_fragment_version("footer")
+
+
+def invalidate_card_fragments(**kwargs):
+    # Cards vary on the page they show, but also show its image, its authors,
+    # the names of its bread type and origin, and its URL, which slug changes
+    # and moves of its ancestors alter
+    bump_fragment_version("listing-card", "blog-listing-card")
+
+
+def purge_page_responses(instance, **kwargs):
+    purge_page(instance)
+
+
+def purge_all_responses(**kwargs):
+    purge_all()
+
+
+def purge_snippet_responses(instance, **kwargs):
+    # Pages are purged by purge_page_responses. Other published objects, like
+    # people and footer text, can be shown on any page
+    if not isinstance(instance, Page):
+        purge_all()
+
+
+def invalidate_image_gallery(instance, **kwargs):
+    invalidate_gallery(instance.collection_id)
+
+
+def invalidate_previous_image_gallery(instance, raw=False, **kwargs):
+    # An image moved to another collection leaves its previous gallery
+    if raw or instance.pk is None:
+        return
+    previous = (
+        type(instance)
+        .objects.filter(pk=instance.pk)
+        .values_list("collection_id", flat=True)
+        .first()
+    )
+    if previous is not None and previous != instance.collection_id:
+        invalidate_gallery(previous)
+
+
+def invalidate_rendered_image_gallery(image, **kwargs):
+    invalidate_gallery(image.collection_id)
+
+
+def enqueue_image_renditions(instance, raw=False, **kwargs):
+    # Images loaded from fixtures have their renditions generated by the
+    # generate_renditions command
+    if not raw:
+        enqueue_renditions(instance)
+
+
+def register_signal_handlers():
+    page_published.connect(invalidate_navigation)
+    page_unpublished.connect(invalidate_navigation)
+    post_page_move.connect(invalidate_navigation)
+    post_delete.connect(invalidate_navigation, sender=Page)
+
+    page_published.connect(invalidate_page_breadcrumb)
+    page_slug_changed.connect(invalidate_tree_breadcrumbs)
+    post_page_move.connect(invalidate_tree_breadcrumbs)
+    post_delete.connect(invalidate_page_breadcrumb, sender=Page)
+
+    page_published.connect(invalidate_content)
+    page_unpublished.connect(invalidate_content)
+    post_delete.connect(invalidate_content, sender=Page)
+
+    page_published.connect(invalidate_breads_index, sender=BreadPage)
+    page_unpublished.connect(invalidate_breads_index, sender=BreadPage)
+    post_page_move.connect(invalidate_breads_index, sender=BreadPage)
+    post_delete.connect(invalidate_breads_index, sender=BreadPage)
+
+    published.connect(invalidate_footer, sender=FooterText)
+    unpublished.connect(invalidate_footer, sender=FooterText)
+    # Also catch footer text created or removed outside the publishing
+    # workflow, e.g. by fixtures and create_random_data
+    post_save.connect(invalidate_footer, sender=FooterText)
+    post_delete.connect(invalidate_footer, sender=FooterText)
+    # The footer's links to pages are expanded to the pages' URLs
+    page_slug_changed.connect(invalidate_footer)
+    post_page_move.connect(invalidate_footer)
+
+    page_published.connect(purge_page_responses)
+    page_unpublished.connect(purge_page_responses)
+    post_delete.connect(purge_page_responses, sender=Page)
+    page_slug_changed.connect(purge_all_responses)
+    post_page_move.connect(purge_all_responses)
+    published.connect(purge_snippet_responses)
+    unpublished.connect(purge_snippet_responses)
+    post_save.connect(purge_all_responses, sender=FooterText)
+    post_save.connect(purge_all_responses, sender=GenericSettings)
+    post_save.connect(purge_all_responses, sender=SiteSettings)
+
+    post_save.connect(invalidate_footer_fragment, sender=GenericSettings)
+    published.connect(invalidate_card_fragments, sender=Person)
+    unpublished.connect(invalidate_card_fragments, sender=Person)
+    page_slug_changed.connect(invalidate_card_fragments)
+    post_page_move.connect(invalidate_card_fragments)
+    for sender in [get_image_model(), "breads.Country", "breads.BreadType"]:
+        post_save.connect(invalidate_card_fragments, sender=sender)
+        post_delete.connect(invalidate_card_fragments, sender=sender)
+
+    post_save.connect(enqueue_image_renditions, sender=get_image_model())
+    # Pages showed the original of the image until now
+    renditions_generated.connect(invalidate_card_fragments)
+    renditions_generated.connect(invalidate_content)
+    renditions_generated.connect(purge_all_responses)
+
+    pre_save.connect(invalidate_previous_image_gallery, sender=get_image_model())
+    post_save.connect(invalidate_image_gallery, sender=get_image_model())
+    post_delete.connect(invalidate_image_gallery, sender=get_image_model())
+    renditions_generated.connect(invalidate_rendered_image_gallery)
@@ -0,0 +1,43 @@
+from django import template
+
+from bakerydemo.base.fragment_cache import get_fragment
+
+register = template.Library()
+
+
+class FragmentCacheNode(template.Node):
+    def __init__(self, nodelist, name, vary_on):
+        self.nodelist = nodelist
+        self.name = name
+        self.vary_on = vary_on
+
+    def render(self, context):
+        request = context.get("request")
+        if getattr(request, "is_preview", False):
+            # Previews show unpublished content, which mustn't be cached
+            return self.nodelist.render(context)
+        name = self.name.resolve(context)
+        vary_on = [value.resolve(context) for value in self.vary_on]
+        return get_fragment(name, vary_on, lambda: self.nodelist.render(context))
+
+
+# Caches the enclosed template fragment under a name, varying on the values
+# given after it. Model instances vary on their latest live revision, so a
+# card for a page is re-rendered once the page is published again. See
+# base/fragment_cache.py
+#
+#   {% fragment_cache "listing-card" page %}...{% endfragment_cache %}
+@register.tag
+def fragment_cache(parser, token):
+    bits = token.split_contents()
+    if len(bits) < 2:
+        raise template.TemplateSyntaxError(
+            f"'{bits[0]}' tag requires at least one argument, the fragment name"
+        )
+    nodelist = parser.parse(("endfragment_cache",))
+    parser.delete_first_token()
+    return FragmentCacheNode(
+        nodelist,
+        parser.compile_filter(bits[1]),
+        [parser.compile_filter(bit) for bit in bits[2:]],
+    )
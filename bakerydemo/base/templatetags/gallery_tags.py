@@ -1,15 +1,22 @@
 from django import template
-from wagtail.images.models import Image
+from django.utils.safestring import mark_safe
+
+from bakerydemo.base.gallery import render_gallery_chunk
+from bakerydemo.base.pagination import InvalidCursor
 
 register = template.Library()
 
 
-# Retrieves a single gallery item and returns a gallery of images
-@register.inclusion_tag("tags/gallery.html", takes_context=True)
+# Renders the first chunk of a gallery's images, or the chunk after the
+# `?after=` cursor, followed by a link to load the next. See base/gallery.py
+@register.simple_tag(takes_context=True)
 def gallery(context, gallery):
-    images = Image.objects.filter(collection=gallery)
-
-    return {
-        "images": images,
-        "request": context["request"],
-    }
+    if gallery is None:
+        return ""
+    request = context["request"]
+    page = context["page"]
+    try:
+        html = render_gallery_chunk(page, gallery.pk, request.GET.get("after"), request)
+    except InvalidCursor:
+        html = render_gallery_chunk(page, gallery.pk, request=request)
+    return mark_safe(html)
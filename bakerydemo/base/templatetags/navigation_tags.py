@@ -1,7 +1,9 @@
 from django import template
-from wagtail.models import Page, Site
+from wagtail.templatetags.wagtailcore_tags import richtext
 
-from bakerydemo.base.models import FooterText
+from bakerydemo.base.footer import get_footer_html
+from bakerydemo.base.navigation import get_breadcrumbs, get_navigation_tree
+from bakerydemo.base.request_context import get_site_context
 
 register = template.Library()
 # https://docs.djangoproject.com/en/3.2/howto/custom-template-tags/
@@ -12,85 +14,66 @@ def get_site_root(context):
     # This returns a core.Page. The main menu needs to have the site.root_page
     # defined else will return an object attribute error ('str' object has no
     # attribute 'get_children')
-    return Site.find_for_request(context["request"]).root_page
+    return get_site_context(context["request"]).root_page
 
 
-def has_menu_children(page):
-    # This is used by the top_menu property
-    # get_children is a Treebeard API thing
-    # https://tabo.pe/projects/django-treebeard/docs/4.0.1/api.html
-    return page.get_children().live().in_menu().exists()
-
-
-def has_children(page):
-    # Generically allow index pages to list their children
-    return page.get_children().live().exists()
-
-
-def is_active(page, current_page):
-    # To give us active state on main navigation
-    return current_page.url_path.startswith(page.url_path) if current_page else False
-
-
-# Retrieves the top menu items - the immediate children of the parent page
-# The has_menu_children method is necessary because the Foundation menu requires
-# a dropdown class to be applied to a parent
+# Retrieves the top menu items - the immediate children of the parent page.
+# Menu items come from the cached navigation tree (see base/navigation.py), so
+# rendering the menu doesn't query the page tree once the cache is warm. The
+# template gives items with children (MenuItem.has_children) a submenu.
 @register.inclusion_tag("tags/top_menu.html", takes_context=True)
 def top_menu(context, parent, calling_page=None):
-    menuitems = parent.get_children().live().in_menu()
-    for menuitem in menuitems:
-        menuitem.show_dropdown = has_menu_children(menuitem)
-        # We don't directly check if calling_page is None since the template
-        # engine can pass an empty string to calling_page
-        # if the variable passed as calling_page does not exist.
-        menuitem.active = (
-            calling_page.url_path.startswith(menuitem.url_path)
-            if calling_page
-            else False
-        )
+    request = context["request"]
+    tree = get_navigation_tree(get_site_context(request).site)
+    menuitems = tree.children_of(parent.id)
+    active_item = tree.active_item(menuitems, calling_page)
     return {
         "calling_page": calling_page,
         "menuitems": menuitems,
-        # required by the pageurl tag that we want to use within this template
-        "request": context["request"],
+        "active_id": active_item.id if active_item else None,
+        "request": request,
     }
 
 
+# Returns the id of the top menu item the calling page is in. This is all the
+# header's menu depends on besides the menu itself, so base.html caches the
+# header per active item.
+@register.simple_tag(takes_context=True)
+def get_active_menu_id(context, calling_page=None):
+    site_context = get_site_context(context["request"])
+    tree = get_navigation_tree(site_context.site)
+    menuitems = tree.children_of(site_context.root_page.id)
+    active_item = tree.active_item(menuitems, calling_page)
+    return active_item.id if active_item else None
+
+
 # Retrieves the children of the top menu items for the drop downs
 @register.inclusion_tag("tags/top_menu_children.html", takes_context=True)
 def top_menu_children(context, parent, calling_page=None):
-    menuitems_children = parent.get_children()
-    menuitems_children = menuitems_children.live().in_menu()
-    for menuitem in menuitems_children:
-        menuitem.has_dropdown = has_menu_children(menuitem)
-        # We don't directly check if calling_page is None since the template
-        # engine can pass an empty string to calling_page
-        # if the variable passed as calling_page does not exist.
-        menuitem.active = (
-            calling_page.url_path.startswith(menuitem.url_path)
-            if calling_page
-            else False
-        )
-        menuitem.children = menuitem.get_children().live().in_menu()
+    request = context["request"]
+    tree = get_navigation_tree(get_site_context(request).site)
+    menuitems_children = tree.children_of(parent.id)
+    active_item = tree.active_item(menuitems_children, calling_page)
     return {
         "parent": parent,
         "menuitems_children": menuitems_children,
-        # required by the pageurl tag that we want to use within this template
-        "request": context["request"],
+        "active_id": active_item.id if active_item else None,
+        "request": request,
     }
 
 
 @register.inclusion_tag("tags/breadcrumbs.html", takes_context=True)
 def breadcrumbs(context):
     self = context.get("self")
+    request = context["request"]
     if self is None or self.depth <= 2:
         # When on the home page, displaying breadcrumbs is irrelevant.
         ancestors = ()
     else:
-        ancestors = Page.objects.ancestor_of(self, inclusive=True).filter(depth__gt=1)
+        ancestors = get_breadcrumbs(self, get_site_context(request).site)
     return {
         "ancestors": ancestors,
-        "request": context["request"],
+        "request": request,
     }
 
 
@@ -101,11 +84,13 @@ def get_footer_text(context):
     # or page types that need a custom footer
     footer_text = context.get("footer_text", "")
 
-    # If the context doesn't have footer_text defined, get one that's live
-    if not footer_text:
-        instance = FooterText.objects.filter(live=True).first()
-        footer_text = instance.body if instance else ""
+    # If the context doesn't have footer_text defined, use the cached
+    # rendering of the live one
+    if footer_text:
+        footer_html = richtext(footer_text)
+    else:
+        footer_html = get_footer_html()
 
     return {
-        "footer_text": footer_text,
+        "footer_html": footer_html,
     }
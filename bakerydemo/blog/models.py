@@ -2,6 +2,7 @@ from __future__ import unicode_literals
 
 from django.contrib import messages
 from django.db import models
+from django.db.models import Prefetch
 from django.shortcuts import redirect, render
 from modelcluster.contrib.taggit import ClusterTaggableManager
 from modelcluster.fields import ParentalKey
@@ -9,10 +10,16 @@ from taggit.models import Tag, TaggedItemBase
 from wagtail.admin.panels import FieldPanel, MultipleChooserPanel
 from wagtail.contrib.routable_page.models import RoutablePageMixin, route
 from wagtail.fields import StreamField
-from wagtail.models import Orderable, Page
+from wagtail.images import get_image_model
+from wagtail.images.models import Filter
+from wagtail.models import Orderable, Page, PageManager
+from wagtail.query import PageQuerySet
 from wagtail.search import index
 
 from bakerydemo.base.blocks import BaseStreamBlock
+from bakerydemo.base.images import resolve_renditions
+from bakerydemo.base.pagination import InvalidCursor, KeysetPaginator
+from bakerydemo.blog.tag_cloud import get_tag_cloud
 
 
 class BlogPersonRelationship(Orderable, models.Model):
@@ -45,6 +52,32 @@ class BlogPageTag(TaggedItemBase):
     )
 
 
+# The renditions blog-listing-card.html renders for each post's image
+BLOG_CARD_RENDITIONS = Filter.expand_spec("format-{avif,webp,jpeg} fill-322x247-c100")
+
+
+class BlogPageQuerySet(PageQuerySet):
+    def for_listing(self):
+        """
+        Prefetches everything a blog listing card shows - authors, tags and
+        the image with its card renditions - so a listing renders in a fixed
+        number of queries however many posts it has.
+        """
+        return self.prefetch_related(
+            Prefetch(
+                "blog_person_relationship",
+                queryset=BlogPersonRelationship.objects.select_related("person"),
+            ),
+            "tags",
+            Prefetch(
+                "image",
+                queryset=get_image_model().objects.prefetch_renditions(
+                    *BLOG_CARD_RENDITIONS
+                ),
+            ),
+        )
+
+
 class BlogPage(Page):
     """
     A Blog Page
@@ -70,6 +103,8 @@ class BlogPage(Page):
     tags = ClusterTaggableManager(through=BlogPageTag, blank=True)
     date_published = models.DateField("Date article published", blank=True, null=True)
 
+    objects = PageManager.from_queryset(BlogPageQuerySet)()
+
     content_panels = Page.content_panels + [
         FieldPanel("subtitle"),
         FieldPanel("introduction"),
@@ -100,6 +135,11 @@ class BlogPage(Page):
         relationship directly we'd print `blog.BlogPersonRelationship.None`
         """
         # Only return authors that are not in draft
+        if "blog_person_relationship" in getattr(self, "_prefetched_objects_cache", {}):
+            # Filter the prefetched relationships rather than querying again
+            return [
+                n.person for n in self.blog_person_relationship.all() if n.person.live
+            ]
         return [
             n.person
             for n in self.blog_person_relationship.filter(
@@ -166,11 +206,24 @@ class BlogIndexPage(RoutablePageMixin, Page):
     # https://docs.wagtail.org/en/stable/getting_started/tutorial.html#overriding-context
     def get_context(self, request):
         context = super(BlogIndexPage, self).get_context(request)
-        context["posts"] = (
-            BlogPage.objects.descendant_of(self).live().order_by("-date_published")
+        context["posts"] = self.paginate(
+            request, BlogPage.objects.descendant_of(self).live().for_listing()
         )
         return context
 
+    # Keyset pagination, newest first. Each page links to the next with an
+    # `?after=` cursor naming the last post shown, so deep pages are as cheap
+    # as the first and links stay stable as posts are published.
+    def paginate(self, request, posts):
+        paginator = KeysetPaginator(posts, 12, ordering=("-date_published", "id"))
+        after = request.GET.get("after") if request is not None else None
+        try:
+            posts = paginator.page(after)
+        except InvalidCursor:
+            posts = paginator.page()
+        # Creates any card renditions the listing doesn't have yet together
+        return resolve_renditions(posts, BLOG_CARD_RENDITIONS)
+
     # This defines a Custom view that utilizes Tags. This view will return all
     # related BlogPages for a given Tag or redirect back to the BlogIndexPage.
     # More information on RoutablePages is at
@@ -187,7 +240,7 @@ class BlogIndexPage(RoutablePageMixin, Page):
                 messages.add_message(request, messages.INFO, msg)
             return redirect(self.url)
 
-        posts = self.get_posts(tag=tag)
+        posts = self.paginate(request, self.get_posts(tag=tag).for_listing())
         context = {"self": self, "tag": tag, "posts": posts}
         return render(request, "blog/blog_index_page.html", context)
 
@@ -203,11 +256,8 @@ class BlogIndexPage(RoutablePageMixin, Page):
             posts = posts.filter(tags=tag)
         return posts
 
-    # Returns the list of Tags for all child posts of this BlogPage.
+    # Returns the list of Tags for all child posts of this BlogPage, each with
+    # the number of posts using it as `post_count`. The list is cached until a
+    # post below this index is published, unpublished, moved or deleted.
     def get_child_tags(self):
-        tags = []
-        for post in self.get_posts():
-            # Not tags.append() because we don't want a list of lists
-            tags += post.get_tags
-        tags = sorted(set(tags))
-        return tags
+        return get_tag_cloud(self)
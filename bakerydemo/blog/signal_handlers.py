@@ -0,0 +1,34 @@
+from django.db.models.signals import post_delete, post_save
+from taggit.models import Tag
+from wagtail.signals import page_published, page_unpublished, post_page_move
+
+from bakerydemo.blog.models import BlogPage
+from bakerydemo.blog.tag_cloud import (
+    invalidate_all_tag_clouds,
+    invalidate_post_tag_cloud,
+    invalidate_tag_clouds,
+)
+
+
+def invalidate_post_tags(instance, **kwargs):
+    # Tags only change on the live site when a post is published
+    invalidate_post_tag_cloud(instance)
+
+
+def invalidate_moved_post_tags(parent_page_before, parent_page_after, **kwargs):
+    invalidate_tag_clouds({parent_page_before.pk, parent_page_after.pk})
+
+
+def invalidate_tags(**kwargs):
+    # Renaming or removing a tag affects every index using it
+    invalidate_all_tag_clouds()
+
+
+def register_signal_handlers():
+    page_published.connect(invalidate_post_tags, sender=BlogPage)
+    page_unpublished.connect(invalidate_post_tags, sender=BlogPage)
+    post_delete.connect(invalidate_post_tags, sender=BlogPage)
+    post_page_move.connect(invalidate_moved_post_tags, sender=BlogPage)
+
+    post_save.connect(invalidate_tags, sender=Tag)
+    post_delete.connect(invalidate_tags, sender=Tag)
@@ -0,0 +1,65 @@
+from django.core.cache import cache
+from django.db.models import Count
+from taggit.models import Tag
+from wagtail.models import Page
+
+CACHE_KEY_PREFIX = "blog-tag-cloud"
+# Publishing drops the cached tag clouds, but only from the cache of the
+# process that published if the cache isn't shared between processes
+CACHE_TIMEOUT = 10 * 60
+
+
+def get_cache_key(index_page_id):
+    return f"{CACHE_KEY_PREFIX}:{index_page_id}"
+
+
+def build_tag_cloud(index_page):
+    """
+    Returns the tags used by the live posts below `index_page`, sorted by
+    name, each annotated with the number of posts using it as `post_count`.
+    This is a single aggregate query, however many posts there are.
+    """
+    return list(
+        Tag.objects.filter(
+            blog_blogpagetag_items__content_object__in=index_page.get_posts()
+        )
+        .annotate(post_count=Count("blog_blogpagetag_items", distinct=True))
+        .order_by("name")
+    )
+
+
+def get_tag_cloud(index_page):
+    """
+    Cached `build_tag_cloud`, with the URL of each tag's archive as `url`.
+    The URLs aren't cached, as the index page's URL can change without any
+    of its posts changing.
+    """
+    key = get_cache_key(index_page.pk)
+    tags = cache.get(key)
+    if tags is None:
+        tags = build_tag_cloud(index_page)
+        cache.set(key, tags, CACHE_TIMEOUT)
+    base_url = index_page.url
+    for tag in tags:
+        tag.url = f"{base_url}tags/{tag.slug}/"
+    return tags
+
+
+def invalidate_tag_clouds(index_page_ids):
+    cache.delete_many([get_cache_key(page_id) for page_id in index_page_ids])
+
+
+def invalidate_post_tag_cloud(post):
+    # Look the parent up by path so this also works while the post's subtree
+    # is being deleted
+    parent_path = post.path[: -post.steplen]
+    invalidate_tag_clouds(
+        Page.objects.filter(path=parent_path).values_list("pk", flat=True)
+    )
+
+
+def invalidate_all_tag_clouds():
+    # Imported here as the blog models use this module
+    from bakerydemo.blog.models import BlogIndexPage
+
+    invalidate_tag_clouds(BlogIndexPage.objects.values_list("pk", flat=True))
@@ -1,14 +1,20 @@
 from django import forms
 from django.contrib.contenttypes.fields import GenericRelation
-from django.core.paginator import EmptyPage, PageNotAnInteger, Paginator
+from django.core.paginator import EmptyPage, PageNotAnInteger
 from django.db import models
+from django.db.models import Prefetch, prefetch_related_objects
 from modelcluster.fields import ParentalManyToManyField
 from wagtail.admin.panels import FieldPanel, MultiFieldPanel
 from wagtail.fields import StreamField
-from wagtail.models import DraftStateMixin, Page, RevisionMixin
+from wagtail.images import get_image_model
+from wagtail.images.models import Filter
+from wagtail.models import DraftStateMixin, Page, PageManager, RevisionMixin
+from wagtail.query import PageQuerySet
 from wagtail.search import index
 
 from bakerydemo.base.blocks import BaseStreamBlock
+from bakerydemo.base.images import resolve_renditions
+from bakerydemo.base.pagination import CachedKeysetPaginator
 
 
 class Country(models.Model):
@@ -97,6 +103,37 @@ class BreadType(RevisionMixin, models.Model):
         verbose_name_plural = "bread types"
 
 
+# The renditions listing-card.html renders for each bread's image
+BREAD_CARD_RENDITIONS = Filter.expand_spec("format-{avif,webp,jpeg} fill-180x180-c100")
+
+
+def get_card_image_prefetch():
+    return Prefetch(
+        "image",
+        queryset=get_image_model().objects.prefetch_renditions(*BREAD_CARD_RENDITIONS),
+    )
+
+
+def prefetch_for_listing(breads):
+    """
+    Like BreadPageQuerySet.for_listing, for breads that are already loaded,
+    e.g. among the specific children of a page.
+    """
+    prefetch_related_objects(breads, "origin", "bread_type", get_card_image_prefetch())
+
+
+class BreadPageQuerySet(PageQuerySet):
+    def for_listing(self):
+        """
+        Loads everything a bread listing card shows - the origin, the bread
+        type and the image with its card renditions - in bulk, rather than
+        with several queries per card.
+        """
+        return self.select_related("origin", "bread_type").prefetch_related(
+            get_card_image_prefetch()
+        )
+
+
 class BreadPage(Page):
     """
     Detail view for a specific bread
@@ -135,6 +172,8 @@ class BreadPage(Page):
     )
     ingredients = ParentalManyToManyField("BreadIngredient", blank=True)
 
+    objects = PageManager.from_queryset(BreadPageQuerySet)()
+
     content_panels = Page.content_panels + [
         FieldPanel("introduction"),
         FieldPanel("image"),
@@ -191,21 +230,37 @@ class BreadsIndexPage(Page):
     # descendants of this index page with most recent first
     def get_breads(self):
         return (
-            BreadPage.objects.live().descendant_of(self).order_by("-first_published_at")
+            BreadPage.objects.live()
+            .descendant_of(self)
+            .order_by("-first_published_at")
+            .for_listing()
         )
 
     # Allows child objects (e.g. BreadPage objects) to be accessible via the
     # template. We use this on the HomePage to display child items of featured
-    # content
+    # content. What the listing cards of the breads among them show is loaded
+    # in bulk
     def children(self):
-        return self.get_children().specific().live()
+        children = list(self.get_children().specific().live())
+        prefetch_for_listing(
+            [child for child in children if isinstance(child, BreadPage)]
+        )
+        return children
 
-    # Pagination for the index page. We use the `django.core.paginator` as any
-    # standard Django app would, but the difference here being we have it as a
-    # method on the model rather than within a view function
+    # Pagination for the index page. CachedKeysetPaginator works like the
+    # standard `django.core.paginator.Paginator`, but caches the total and
+    # seeks to each page instead of counting and skipping rows on every
+    # request. We have it as a method on the model rather than within a view
+    # function
     def paginate(self, request, *args):
         page = request.GET.get("page")
-        paginator = Paginator(self.get_breads(), 12)
+        paginator = CachedKeysetPaginator(
+            self.get_breads(),
+            12,
+            ordering=("-first_published_at", "id"),
+            cache_key=f"breads-index:{self.pk}",
+            version_name="breads",
+        )
         try:
             pages = paginator.page(page)
         except PageNotAnInteger:
@@ -221,6 +276,8 @@ class BreadsIndexPage(Page):
 
         # BreadPage objects (get_breads) are passed through pagination
         breads = self.paginate(request, self.get_breads())
+        # Creates any card renditions the page doesn't have yet together
+        resolve_renditions(breads, BREAD_CARD_RENDITIONS)
 
         context["breads"] = breads
 
@@ -0,0 +1,11 @@
+from django.apps import AppConfig
+
+
+class LocationsAppConfig(AppConfig):
+    name = "bakerydemo.locations"
+    label = "locations"
+
+    def ready(self):
+        from bakerydemo.locations.signal_handlers import register_signal_handlers
+
+        register_signal_handlers()
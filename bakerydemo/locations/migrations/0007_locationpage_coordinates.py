@@ -0,0 +1,42 @@
+# Generated by Django 4.2.30 on 2026-10-18 17:30
+
+from django.db import migrations, models
+
+from bakerydemo.locations.spatial import parse_lat_long
+
+
+def forwards_func(apps, schema_editor):
+    LocationPage = apps.get_model("locations", "locationpage")
+    db_alias = schema_editor.connection.alias
+    locations = list(LocationPage.objects.using(db_alias).only("lat_long"))
+    for location in locations:
+        # Parsed like LocationPage.save does, so out of range values aren't
+        # indexed either
+        try:
+            location.latitude, location.longitude = parse_lat_long(location.lat_long)
+        except ValueError:
+            location.latitude = location.longitude = None
+    LocationPage.objects.using(db_alias).bulk_update(
+        locations, ["latitude", "longitude"]
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("locations", "0006_alter_locationoperatinghours_day"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="locationpage",
+            name="latitude",
+            field=models.FloatField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name="locationpage",
+            name="longitude",
+            field=models.FloatField(blank=True, editable=False, null=True),
+        ),
+        migrations.RunPython(forwards_func, migrations.RunPython.noop),
+    ]
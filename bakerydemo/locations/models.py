@@ -1,16 +1,42 @@
-from datetime import datetime
-
 from django.conf import settings
 from django.core.validators import RegexValidator
 from django.db import models
+from django.http import HttpResponseBadRequest, JsonResponse
+from django.template.response import TemplateResponse
+from django.utils import timezone
+from django.utils.cache import patch_cache_control
+from django.utils.functional import cached_property
 from modelcluster.fields import ParentalKey
 from wagtail.admin.panels import FieldPanel, InlinePanel
+from wagtail.contrib.routable_page.models import RoutablePageMixin, route
 from wagtail.fields import StreamField
+from wagtail.images.models import Filter
 from wagtail.models import Orderable, Page
 from wagtail.search import index
 
 from bakerydemo.base.blocks import BaseStreamBlock
+from bakerydemo.base.images import prefetch_images
 from bakerydemo.locations.choices import DAY_CHOICES
+from bakerydemo.locations.schedule import (
+    ScheduleTable,
+    get_schedule_table,
+    get_schedules,
+    mark_open_now,
+)
+from bakerydemo.locations.spatial import get_nearest_locations, parse_lat_long
+
+# How many locations the nearest locations view lists, unless asked for
+# another number up to the maximum
+NEAREST_LOCATIONS_DEFAULT = 5
+NEAREST_LOCATIONS_MAX = 50
+
+# The renditions of the picture cards the locations are listed with
+LOCATION_CARD_RENDITIONS = Filter.expand_spec(
+    "format-{avif,webp,jpeg} fill-{300x200-c75,645x480-c75}"
+)
+
+# How long responses showing whether locations are open can be cached for
+OPEN_NOW_MAX_AGE = 60
 
 
 class OperatingHours(models.Model):
@@ -62,9 +88,11 @@ class LocationOperatingHours(Orderable, OperatingHours):
     )
 
 
-class LocationsIndexPage(Page):
+class LocationsIndexPage(RoutablePageMixin, Page):
     """
     A Page model that creates an index page (a listview)
+
+    RoutablePageMixin is used to add the nearest locations view, at near/
     """
 
     introduction = models.TextField(help_text="Text to describe the page", blank=True)
@@ -89,13 +117,68 @@ class LocationsIndexPage(Page):
     # Overrides the context to list all child
     # items, that are live, by the title alphabetical order.
     # https://docs.wagtail.org/en/stable/getting_started/tutorial.html#overriding-context
+    # With ?open_now=1, only the locations open now are listed. Whether each
+    # is open comes from one lookup in the schedule table of every location,
+    # see locations/schedule.py
     def get_context(self, request):
         context = super(LocationsIndexPage, self).get_context(request)
-        context["locations"] = (
-            LocationPage.objects.descendant_of(self).live().order_by("title")
-        )
+        now = timezone.now()
+        table = get_schedule_table(self)
+        locations = LocationPage.objects.descendant_of(self).live().order_by("title")
+        open_now = request is not None and request.GET.get("open_now") == "1"
+        if open_now:
+            locations = locations.filter(pk__in=table.get_open_keys(now))
+        context["locations"] = mark_open_now(list(locations), table, now)
+        prefetch_images(context["locations"], filter_specs=LOCATION_CARD_RENDITIONS)
+        context["open_now"] = open_now
         return context
 
+    # Whether locations are open changes by the minute, so responses mustn't
+    # be cached for longer than that
+    def serve(self, request, *args, **kwargs):
+        response = super().serve(request, *args, **kwargs)
+        patch_cache_control(response, max_age=OPEN_NOW_MAX_AGE)
+        return response
+
+    # Lists the locations nearest to a point, e.g.
+    # near/?lat=64.14&lng=-21.94&k=5, or as JSON with &format=json
+    @route(r"^near/$", name="nearest_locations")
+    def nearest_locations(self, request):
+        try:
+            lat, lng = parse_lat_long(
+                f"{request.GET.get('lat', '')},{request.GET.get('lng', '')}"
+            )
+            k = int(request.GET.get("k", NEAREST_LOCATIONS_DEFAULT))
+        except ValueError:
+            return HttpResponseBadRequest("lat and lng must be coordinates, k a number")
+        k = max(1, min(k, NEAREST_LOCATIONS_MAX))
+        locations = get_nearest_locations(lat, lng, k)
+        prefetch_images(locations, filter_specs=LOCATION_CARD_RENDITIONS)
+        mark_open_now(locations, ScheduleTable(get_schedules(locations)))
+
+        if request.GET.get("format") == "json":
+            return JsonResponse(
+                {
+                    "results": [
+                        {
+                            "id": location.pk,
+                            "title": location.title,
+                            "url": location.get_url(request),
+                            "lat": location.latitude,
+                            "lng": location.longitude,
+                            "distance_km": round(location.distance, 3),
+                            "open_now": location.open_now,
+                        }
+                        for location in locations
+                    ]
+                }
+            )
+        # The page's own context, without the listing of every location that
+        # get_context builds
+        context = super().get_context(request)
+        context.update(locations=locations, near=True)
+        return TemplateResponse(request, self.get_template(request), context)
+
     content_panels = Page.content_panels + [
         FieldPanel("introduction"),
         FieldPanel("image"),
@@ -132,6 +215,10 @@ class LocationPage(Page):
             ),
         ],
     )
+    # lat_long parsed on save, for the nearest locations index. See
+    # locations/spatial.py
+    latitude = models.FloatField(null=True, blank=True, editable=False)
+    longitude = models.FloatField(null=True, blank=True, editable=False)
 
     # Search index configuration
     search_fields = Page.search_fields + [
@@ -153,34 +240,47 @@ class LocationPage(Page):
     def __str__(self):
         return self.title
 
-    @property
+    def save(self, *args, **kwargs):
+        try:
+            self.latitude, self.longitude = parse_lat_long(self.lat_long)
+        except ValueError:
+            self.latitude = self.longitude = None
+        return super().save(*args, **kwargs)
+
+    @cached_property
     def operating_hours(self):
-        hours = self.hours_of_operation.all()
-        return hours
+        return list(self.hours_of_operation.all())
+
+    # The weekly opening hours, cached until the page is next published. See
+    # locations/schedule.py
+    @cached_property
+    def schedule(self):
+        return get_schedules([self])[self.pk]
 
-    # Determines if the location is currently open. It is timezone naive
+    # Determines if the location is currently open, in the site's time zone
     def is_open(self):
-        now = datetime.now()
-        current_time = now.time()
-        current_day = now.strftime("%a").upper()
-        try:
-            self.operating_hours.get(
-                day=current_day,
-                opening_time__lte=current_time,
-                closing_time__gte=current_time,
-            )
-            return True
-        except LocationOperatingHours.DoesNotExist:
-            return False
+        return self.schedule.is_open_at(timezone.now())
+
+    # When the location next opens, if it's currently closed
+    def opens_next(self):
+        if self.is_open():
+            return None
+        return self.schedule.next_opening(timezone.now())
 
     # Makes additional context available to the template so that we can access
     # the latitude, longitude and map API key to render the map
     def get_context(self, request):
         context = super(LocationPage, self).get_context(request)
-        context["lat"] = self.lat_long.split(",")[0]
-        context["long"] = self.lat_long.split(",")[1]
+        context["lat"] = self.latitude
+        context["long"] = self.longitude
         context["google_map_api_key"] = settings.GOOGLE_MAP_API_KEY
         return context
 
+    # Shows whether the location is open now, see LocationsIndexPage.serve
+    def serve(self, request, *args, **kwargs):
+        response = super().serve(request, *args, **kwargs)
+        patch_cache_control(response, max_age=OPEN_NOW_MAX_AGE)
+        return response
+
     # Can only be placed under a LocationsIndexPage object
     parent_page_types = ["LocationsIndexPage"]
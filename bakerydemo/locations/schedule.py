@@ -0,0 +1,254 @@
+import bisect
+import itertools
+import operator
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+
+from django.core.cache import cache
+from django.utils import timezone
+
+from bakerydemo.base.cache import get_content_generation
+from bakerydemo.base.fragment_cache import get_vary_part
+from bakerydemo.locations.choices import DAY_CHOICES
+
+CACHE_KEY_PREFIX = "location-schedule"
+CACHE_TIMEOUT = 60 * 60 * 24
+
+DAYS = [day for day, _ in DAY_CHOICES]
+MINUTES_PER_DAY = 24 * 60
+MINUTES_PER_WEEK = 7 * MINUTES_PER_DAY
+TABLE_CACHE_KEY_PREFIX = "location-schedule-table"
+
+
+def to_minutes(value):
+    return value.hour * 60 + value.minute
+
+
+def localize(when):
+    # Opening hours are in the site's time zone
+    return timezone.localtime(when, timezone.get_default_timezone())
+
+
+class WeeklySchedule:
+    """
+    The opening hours of a location as, for each day of the week from Monday,
+    a sorted list of non-overlapping (open, close) intervals in minutes since
+    midnight. Hours that run past midnight are split across the two days.
+
+    Hours are in the site's time zone (settings.TIME_ZONE), so the datetimes
+    given are converted to it before being looked up.
+    """
+
+    __slots__ = ("days",)
+
+    def __init__(self, days):
+        self.days = days
+
+    def __repr__(self):
+        return f"<WeeklySchedule {self.days!r}>"
+
+    def __eq__(self, other):
+        return isinstance(other, WeeklySchedule) and self.days == other.days
+
+    @classmethod
+    def from_hours(cls, hours):
+        """
+        Builds the schedule from OperatingHours objects. Days marked closed
+        and hours missing an opening or closing time are left out.
+        """
+        buckets = [[] for _ in DAYS]
+        for slot in hours:
+            if slot.closed or slot.opening_time is None or slot.closing_time is None:
+                continue
+            day = DAYS.index(slot.day)
+            opening = to_minutes(slot.opening_time)
+            closing = to_minutes(slot.closing_time)
+            if closing > opening:
+                buckets[day].append((opening, closing))
+            elif closing < opening:
+                # Closes after midnight, e.g. 18:00 - 02:00, or at midnight
+                buckets[day].append((opening, MINUTES_PER_DAY))
+                if closing:
+                    buckets[(day + 1) % 7].append((0, closing))
+        return cls(tuple(cls.merge(bucket) for bucket in buckets))
+
+    @staticmethod
+    def merge(intervals):
+        merged = []
+        for opening, closing in sorted(intervals):
+            if merged and opening <= merged[-1][1]:
+                merged[-1] = (merged[-1][0], max(merged[-1][1], closing))
+            else:
+                merged.append((opening, closing))
+        return tuple(merged)
+
+    def is_open_at(self, when):
+        when = localize(when)
+        intervals = self.days[when.weekday()]
+        minute = to_minutes(when)
+        # The last interval opening at or before `minute` is the only one
+        # that can contain it
+        index = bisect.bisect_right(intervals, (minute, MINUTES_PER_DAY)) - 1
+        return index >= 0 and minute < intervals[index][1]
+
+    def next_opening(self, when):
+        """
+        Returns when the location next opens after `when`, as an aware
+        datetime in the site's time zone, or None if it never opens. If it's
+        open at `when`, that's the opening after it next closes.
+        """
+        when = localize(when)
+        minute = to_minutes(when)
+        # Look a full week ahead, back round to the rest of today
+        for offset in range(8):
+            day = (when.weekday() + offset) % 7
+            for opening, closing in self.days[day]:
+                if offset == 0 and opening <= minute:
+                    continue
+                # Hours from midnight continue the previous day's, unless it
+                # closed before midnight
+                previous = self.days[day - 1]
+                if opening == 0 and previous and previous[-1][1] == MINUTES_PER_DAY:
+                    continue
+                date = when.date() + timedelta(days=offset)
+                return datetime.combine(
+                    date, time(opening // 60, opening % 60), tzinfo=when.tzinfo
+                )
+        return None
+
+
+class ScheduleTable:
+    """
+    The opening hours of many locations as one minute-of-week table: the
+    sorted minutes of the week at which any of them opens or closes and, for
+    each, a bitmask of the locations open from then until the next.
+
+    Which of any number of locations are open at a given time is then a
+    single bisect, and whether one of them is a single bit test.
+    """
+
+    __slots__ = ("keys", "positions", "boundaries", "masks")
+
+    def __init__(self, schedules):
+        # `schedules` maps keys, usually page ids, to WeeklySchedules
+        self.keys = list(schedules)
+        self.positions = {key: position for position, key in enumerate(self.keys)}
+        # The locations opening or closing at each minute of the week
+        toggles = defaultdict(int)
+        for position, key in enumerate(self.keys):
+            bit = 1 << position
+            for day, intervals in enumerate(schedules[key].days):
+                for opening, closing in intervals:
+                    toggles[day * MINUTES_PER_DAY + opening] ^= bit
+                    toggles[day * MINUTES_PER_DAY + closing] ^= bit
+        # Hours continuing past midnight close and open at the same minute,
+        # which cancel out
+        self.boundaries = sorted(minute for minute, bits in toggles.items() if bits)
+        self.masks = list(
+            itertools.accumulate(
+                (toggles[minute] for minute in self.boundaries), operator.xor
+            )
+        )
+
+    def __len__(self):
+        return len(self.keys)
+
+    def get_open_mask(self, when):
+        when = localize(when)
+        minute = when.weekday() * MINUTES_PER_DAY + to_minutes(when)
+        index = bisect.bisect_right(self.boundaries, minute) - 1
+        return self.masks[index] if index >= 0 else 0
+
+    def is_open(self, key, mask):
+        """
+        Returns whether the location `key` is in the `mask` from
+        `get_open_mask`. Locations not in the table are closed.
+        """
+        position = self.positions.get(key)
+        return position is not None and bool(mask >> position & 1)
+
+    def get_open_keys(self, when):
+        # The mask's bits, lowest first, are the locations in order
+        bits = bin(self.get_open_mask(when))[:1:-1]
+        return [self.keys[position] for position, bit in enumerate(bits) if bit == "1"]
+
+
+def get_cache_key(location):
+    # Keyed on the live revision, so the schedule is rebuilt once the page is
+    # published again
+    return f"{CACHE_KEY_PREFIX}:{get_vary_part(location)}"
+
+
+def get_loaded_hours(location):
+    # Hours already in memory: prefetched, or the unsaved hours of a preview
+    if "hours_of_operation" in getattr(location, "_prefetched_objects_cache", {}):
+        return location.hours_of_operation.all()
+    if "hours_of_operation" in getattr(location, "_cluster_related_objects", {}):
+        return location.hours_of_operation.all()
+    return None
+
+
+def get_schedules(locations):
+    """
+    Returns the WeeklySchedule of each of `locations`, keyed by page id. At
+    most one cache lookup and one query are made for any number of
+    locations.
+    """
+    from bakerydemo.locations.models import LocationOperatingHours
+
+    schedules = {}
+    missing = {}
+    for location in locations:
+        hours = get_loaded_hours(location)
+        if hours is not None:
+            schedules[location.pk] = WeeklySchedule.from_hours(hours)
+        else:
+            missing[get_cache_key(location)] = location
+    if not missing:
+        return schedules
+
+    cached = cache.get_many(list(missing))
+    for key, schedule in cached.items():
+        schedules[missing.pop(key).pk] = schedule
+    if not missing:
+        return schedules
+
+    hours_by_location = {location.pk: [] for location in missing.values()}
+    for slot in LocationOperatingHours.objects.filter(
+        location__in=list(hours_by_location)
+    ):
+        hours_by_location[slot.location_id].append(slot)
+    built = {}
+    for key, location in missing.items():
+        schedule = WeeklySchedule.from_hours(hours_by_location[location.pk])
+        schedules[location.pk] = built[key] = schedule
+    cache.set_many(built, CACHE_TIMEOUT)
+    return schedules
+
+
+def get_schedule_table(index_page):
+    """
+    Returns the ScheduleTable of the live locations under `index_page`,
+    cached until a page is next published, unpublished or deleted.
+    """
+    from bakerydemo.locations.models import LocationPage
+
+    key = f"{TABLE_CACHE_KEY_PREFIX}:{index_page.pk}:{get_content_generation()}"
+    table = cache.get(key)
+    if table is None:
+        locations = LocationPage.objects.descendant_of(index_page).live()
+        table = ScheduleTable(
+            get_schedules(locations.only("live_revision_id", "latest_revision_id"))
+        )
+        cache.set(key, table, CACHE_TIMEOUT)
+    return table
+
+
+def mark_open_now(locations, table, when=None):
+    """
+    Sets `open_now` on each of `locations` from `table`, at `when` or now.
+    """
+    mask = table.get_open_mask(when or timezone.now())
+    for location in locations:
+        location.open_now = table.is_open(location.pk, mask)
+    return locations
@@ -0,0 +1,19 @@
+from django.db.models.signals import post_delete
+from wagtail.signals import page_published, page_unpublished
+
+from bakerydemo.locations.models import LocationPage
+from bakerydemo.locations.spatial import update_location_index
+
+
+def add_to_location_index(instance, **kwargs):
+    update_location_index(instance, live=True)
+
+
+def remove_from_location_index(instance, **kwargs):
+    update_location_index(instance, live=False)
+
+
+def register_signal_handlers():
+    page_published.connect(add_to_location_index, sender=LocationPage)
+    page_unpublished.connect(remove_from_location_index, sender=LocationPage)
+    post_delete.connect(remove_from_location_index, sender=LocationPage)
@@ -0,0 +1,225 @@
+import heapq
+import math
+import threading
+import time
+
+from django.core.cache import cache
+
+EARTH_RADIUS_KM = 6371.0088
+VERSION_KEY = "location-index-version"
+
+# Points per leaf of the k-d tree. A leaf that grows to twice this through
+# additions is split
+LEAF_SIZE = 16
+
+
+def parse_lat_long(value):
+    """
+    Parses a "lat, long" string into a (latitude, longitude) pair of floats,
+    raising ValueError if it isn't one.
+    """
+    lat, lng = (float(part) for part in value.split(","))
+    if not (-90 <= lat <= 90 and -180 <= lng <= 180):
+        raise ValueError(f"{value!r} is out of range")
+    return lat, lng
+
+
+def to_vector(lat, lng):
+    # Points on the unit sphere, where the straight line distance between two
+    # points orders them the same as the distance along the earth's surface
+    lat, lng = math.radians(lat), math.radians(lng)
+    return (
+        math.cos(lat) * math.cos(lng),
+        math.cos(lat) * math.sin(lng),
+        math.sin(lat),
+    )
+
+
+def chord_to_km(chord):
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, chord / 2))
+
+
+class Node:
+    """
+    A node of the k-d tree: a leaf holding `points`, a dict of key to vector,
+    or a split on `axis` at `value`, with every point of `left` at or below
+    it and every point of `right` at or above it.
+    """
+
+    __slots__ = ("points", "axis", "value", "left", "right")
+
+    def __init__(self, points):
+        self.points = points
+        self.axis = self.value = self.left = self.right = None
+
+
+class SpatialIndex:
+    """
+    An in-memory index of points on the earth answering k-nearest queries,
+    held as a k-d tree over the points' positions on the unit sphere.
+
+    Points can be added, moved and removed without rebuilding the tree.
+    """
+
+    def __init__(self, points=()):
+        # The leaf each key is in
+        self.leaves = {}
+        self.root = self.build({key: to_vector(lat, lng) for key, lat, lng in points})
+
+    def __len__(self):
+        return len(self.leaves)
+
+    def __contains__(self, key):
+        return key in self.leaves
+
+    def build(self, points):
+        node = Node(points)
+        self.split(node)
+        return node
+
+    def split(self, node):
+        points = node.points
+        if len(points) <= LEAF_SIZE:
+            for key in points:
+                self.leaves[key] = node
+            return
+        # Split on the axis the points are most spread along, at the median
+        axis = max(
+            range(3),
+            key=lambda axis: max(v[axis] for v in points.values())
+            - min(v[axis] for v in points.values()),
+        )
+        items = sorted(points.items(), key=lambda item: item[1][axis])
+        middle = len(items) // 2
+        node.points = None
+        node.axis = axis
+        node.value = items[middle][1][axis]
+        node.left = self.build(dict(items[:middle]))
+        node.right = self.build(dict(items[middle:]))
+
+    def add(self, key, lat, lng):
+        self.remove(key)
+        vector = to_vector(lat, lng)
+        node = self.root
+        while node.points is None:
+            node = node.left if vector[node.axis] < node.value else node.right
+        node.points[key] = vector
+        self.leaves[key] = node
+        if len(node.points) >= 2 * LEAF_SIZE:
+            self.split(node)
+
+    def remove(self, key):
+        node = self.leaves.pop(key, None)
+        if node is not None:
+            del node.points[key]
+
+    def nearest(self, lat, lng, k):
+        """
+        Returns the keys of the `k` points nearest to (`lat`, `lng`) with
+        their distance from it in kilometres, nearest first.
+        """
+        if k < 1:
+            return []
+        target = to_vector(lat, lng)
+        # The best points so far, as a max-heap of (-squared distance, key)
+        best = []
+
+        def search(node):
+            if node.points is not None:
+                for key, vector in node.points.items():
+                    distance = sum((a - b) ** 2 for a, b in zip(vector, target))
+                    if len(best) < k:
+                        heapq.heappush(best, (-distance, key))
+                    elif distance < -best[0][0]:
+                        heapq.heapreplace(best, (-distance, key))
+                return
+            offset = target[node.axis] - node.value
+            near, far = (
+                (node.left, node.right) if offset < 0 else (node.right, node.left)
+            )
+            search(near)
+            # The far side can only hold nearer points if the splitting plane
+            # is nearer than the furthest of the best points
+            if len(best) < k or offset * offset < -best[0][0]:
+                search(far)
+
+        search(self.root)
+        return [
+            (key, chord_to_km(math.sqrt(-distance)))
+            for distance, key in sorted(best, reverse=True)
+        ]
+
+
+_lock = threading.Lock()
+_index = None
+_index_version = None
+
+
+def get_index_version():
+    return cache.get_or_set(VERSION_KEY, time.time_ns, None)
+
+
+def build_location_index():
+    from bakerydemo.locations.models import LocationPage
+
+    return SpatialIndex(
+        LocationPage.objects.live()
+        .filter(latitude__isnull=False, longitude__isnull=False)
+        .values_list("pk", "latitude", "longitude")
+    )
+
+
+def get_location_index():
+    """
+    Returns this process's index of live locations. It's rebuilt from the
+    database only when another process has changed the locations since it was
+    built, which is checked with a single cache lookup.
+    """
+    global _index, _index_version
+    version = get_index_version()
+    with _lock:
+        if _index is None or _index_version != version:
+            _index = build_location_index()
+            _index_version = version
+        return _index
+
+
+def update_location_index(location, live):
+    """
+    Adds, moves or removes `location` in this process's index, and has every
+    other process rebuild theirs the next time they use it.
+    """
+    global _index_version
+    with _lock:
+        is_current = _index is not None and _index_version == cache.get(VERSION_KEY)
+        if is_current:
+            if (
+                live
+                and location.latitude is not None
+                and location.longitude is not None
+            ):
+                _index.add(location.pk, location.latitude, location.longitude)
+            else:
+                _index.remove(location.pk)
+        version = time.time_ns()
+        cache.set(VERSION_KEY, version, None)
+        if is_current:
+            _index_version = version
+
+
+def get_nearest_locations(lat, lng, k):
+    """
+    Returns the `k` live locations nearest to (`lat`, `lng`), nearest first,
+    each with its `distance` in kilometres. Only fetching the pages found
+    queries the database.
+    """
+    from bakerydemo.locations.models import LocationPage
+
+    nearest = get_location_index().nearest(lat, lng, k)
+    pages = LocationPage.objects.live().in_bulk([key for key, _ in nearest])
+    locations = []
+    for key, distance in nearest:
+        if key in pages:
+            pages[key].distance = distance
+            locations.append(pages[key])
+    return locations
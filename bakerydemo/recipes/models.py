@@ -11,6 +11,8 @@ from wagtail.models import Orderable, Page
 from wagtail.search import index
 
 from bakerydemo.base.blocks import BaseStreamBlock
+from bakerydemo.base.images import prefetch_images
+from bakerydemo.blog.models import BLOG_CARD_RENDITIONS
 
 from .blocks import RecipeStreamBlock
 
@@ -157,7 +159,8 @@ class RecipeIndexPage(Page):
     # https://docs.wagtail.org/en/stable/getting_started/tutorial.html#overriding-context
     def get_context(self, request):
         context = super(RecipeIndexPage, self).get_context(request)
-        context["recipes"] = (
+        context["recipes"] = list(
             RecipePage.objects.descendant_of(self).live().order_by("-date_published")
         )
+        prefetch_images(context["recipes"], filter_specs=BLOG_CARD_RENDITIONS)
         return context
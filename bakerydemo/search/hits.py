@@ -0,0 +1,242 @@
+import atexit
+import logging
+import os
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F
+from django.utils import timezone
+from wagtail.contrib.search_promotions.models import Query, QueryDailyHits
+from wagtail.search.utils import normalise_query_string
+
+from bakerydemo.base.models import SearchHitFlushRequest
+
+logger = logging.getLogger(__name__)
+
+# While hits are buffered, the background thread checks this often (in
+# seconds) whether the flush_search_hits command asked for them to be written
+FLUSH_REQUEST_POLL_INTERVAL = 2
+
+
+class QueryHitBuffer:
+    """
+    Collects search query hits in memory, aggregated per (query string, date),
+    and writes them to wagtailsearchpromotions in bulk. This keeps the
+    get-or-create and row-locking update of Query.add_hit off the request path.
+
+    The buffer is flushed by a background thread every `flush_interval`
+    seconds, or sooner when the flush_search_hits command asks for it, whenever
+    it holds `flush_size` distinct entries, and when the process exits.
+    """
+
+    def __init__(self, flush_interval, flush_size):
+        self.flush_interval = flush_interval
+        self.flush_size = flush_size
+        self._counts = Counter()
+        self._lock = threading.Lock()
+        self._worker = None
+        self._worker_pid = None
+        self._flushed_at = time.monotonic()
+        self._flush_requested_at = None
+
+    def add_hit(self, query_string, date=None):
+        if date is None:
+            date = timezone.now().date()
+        key = (normalise_query_string(query_string), date)
+        with self._lock:
+            self._counts[key] += 1
+            size = len(self._counts)
+
+        if size >= self.flush_size:
+            try:
+                self.flush()
+            except Exception:
+                # Searching mustn't fail because the hits can't be written,
+                # they're kept for the next flush
+                logger.exception("Could not flush search query hits")
+        else:
+            self._ensure_worker()
+
+    def __len__(self):
+        return len(self._counts)
+
+    def flush(self):
+        """
+        Writes the buffered hits to the database and returns how many
+        (query string, date) entries were written.
+        """
+        with self._lock:
+            counts, self._counts = self._counts, Counter()
+            self._flushed_at = time.monotonic()
+        if not counts:
+            return 0
+
+        try:
+            write_hits(counts)
+        except Exception:
+            # Put the hits back so the next flush can retry them
+            with self._lock:
+                self._counts.update(counts)
+            raise
+        return len(counts)
+
+    def flush_if_due(self):
+        """
+        Flushes the buffer if `flush_interval` seconds have passed since the
+        last flush, or a flush was requested since the last check, and returns
+        how many entries were written.
+        """
+        if not self._counts:
+            return 0
+        requested_at = get_flush_requested_at()
+        if (
+            requested_at == self._flush_requested_at
+            and time.monotonic() - self._flushed_at < self.flush_interval
+        ):
+            return 0
+        self._flush_requested_at = requested_at
+        return self.flush()
+
+    def _ensure_worker(self):
+        if not self.flush_interval:
+            return
+        # A thread started before a fork doesn't survive in the child process
+        if self._worker is not None and self._worker_pid == os.getpid():
+            return
+        with self._lock:
+            if self._worker is None or self._worker_pid != os.getpid():
+                self._worker_pid = os.getpid()
+                self._worker = threading.Thread(
+                    target=self._run, name="search-hits-flush", daemon=True
+                )
+                self._worker.start()
+
+    def _run(self):
+        while True:
+            time.sleep(min(self.flush_interval, FLUSH_REQUEST_POLL_INTERVAL))
+            try:
+                self.flush_if_due()
+            except Exception:
+                logger.exception("Could not flush search query hits")
+            finally:
+                # This thread has its own database connection, don't leave it open
+                connection.close()
+
+
+def request_flush():
+    """
+    Asks every process to write its buffered hits at its background thread's
+    next check, within FLUSH_REQUEST_POLL_INTERVAL seconds.
+    """
+    SearchHitFlushRequest.objects.update_or_create(
+        pk=1, defaults={"requested_at": timezone.now()}
+    )
+
+
+def get_flush_requested_at():
+    return (
+        SearchHitFlushRequest.objects.filter(pk=1)
+        .values_list("requested_at", flat=True)
+        .first()
+    )
+
+
+def write_hits(counts):
+    """
+    Writes `counts`, a mapping of (query string, date) to hits, creating any
+    missing Query rows and adding to existing QueryDailyHits rows.
+    """
+    query_strings = {query_string for query_string, _ in counts}
+    with transaction.atomic():
+        Query.objects.bulk_create(
+            [Query(query_string=query_string) for query_string in query_strings],
+            ignore_conflicts=True,
+        )
+        query_ids = dict(
+            Query.objects.filter(query_string__in=query_strings).values_list(
+                "query_string", "pk"
+            )
+        )
+        rows = [
+            (query_ids[query_string], date, hits)
+            for (query_string, date), hits in counts.items()
+        ]
+        if connection.vendor in ("postgresql", "sqlite"):
+            upsert_daily_hits(rows)
+        else:
+            for query_id, date, hits in rows:
+                daily_hits, _ = QueryDailyHits.objects.get_or_create(
+                    query_id=query_id, date=date
+                )
+                daily_hits.hits = F("hits") + hits
+                daily_hits.save(update_fields=["hits"])
+
+
+def upsert_daily_hits(rows):
+    qn = connection.ops.quote_name
+    table = qn(QueryDailyHits._meta.db_table)
+    query_column = qn(QueryDailyHits._meta.get_field("query").column)
+    date_column = qn(QueryDailyHits._meta.get_field("date").column)
+    hits_column = qn(QueryDailyHits._meta.get_field("hits").column)
+
+    placeholders = ", ".join(["(%s, %s, %s)"] * len(rows))
+    params = []
+    for query_id, date, hits in rows:
+        params += [query_id, connection.ops.adapt_datefield_value(date), hits]
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {table} ({query_column}, {date_column}, {hits_column}) "
+            f"VALUES {placeholders} "
+            f"ON CONFLICT ({query_column}, {date_column}) "
+            f"DO UPDATE SET {hits_column} = {table}.{hits_column} + EXCLUDED.{hits_column}",
+            params,
+        )
+
+
+_buffer = None
+_buffer_lock = threading.Lock()
+
+
+def get_hit_buffer():
+    global _buffer
+    if _buffer is None:
+        with _buffer_lock:
+            if _buffer is None:
+                _buffer = QueryHitBuffer(
+                    flush_interval=settings.SEARCH_HITS_FLUSH_INTERVAL,
+                    flush_size=settings.SEARCH_HITS_FLUSH_SIZE,
+                )
+                register_exit_hook()
+    return _buffer
+
+
+def register_exit_hook():
+    atexit.register(flush_on_exit)
+    # uWSGI workers don't run atexit handlers, but expose their own hook
+    try:
+        import uwsgi
+    except ImportError:
+        return
+    previous_hook = getattr(uwsgi, "atexit", None)
+
+    def uwsgi_atexit():
+        flush_on_exit()
+        if previous_hook:
+            previous_hook()
+
+    uwsgi.atexit = uwsgi_atexit
+
+
+def flush_on_exit():
+    try:
+        _buffer.flush()
+    except Exception:
+        logger.exception("Could not flush search query hits on exit")
+
+
+def record_hit(query_string):
+    get_hit_buffer().add_hit(query_string)
@@ -0,0 +1,36 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from bakerydemo.search.hits import (
+    FLUSH_REQUEST_POLL_INTERVAL,
+    get_hit_buffer,
+    request_flush,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Asks every web process to write the search query hits it has buffered "
+        "to the database, and waits for them to. Processes with "
+        "SEARCH_HITS_FLUSH_INTERVAL set to 0 have no background thread and "
+        "don't answer."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--wait",
+            type=float,
+            default=FLUSH_REQUEST_POLL_INTERVAL + 1,
+            help="How many seconds to give the web processes to flush",
+        )
+
+    def handle(self, **options):
+        request_flush()
+        # The hits of this process, when called with call_command
+        flushed = get_hit_buffer().flush()
+        time.sleep(options["wait"])
+        self.stdout.write(
+            f"Flushed hits for {flushed} search queries in this process, and "
+            "asked the web processes to flush theirs."
+        )
@@ -0,0 +1,135 @@
+import hashlib
+
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.core.cache import cache
+from wagtail.images.models import Filter
+from wagtail.models import Page
+from wagtail.search.utils import normalise_query_string
+
+from bakerydemo.base.cache import get_content_generation
+from bakerydemo.base.images import prefetch_images
+from bakerydemo.blog.models import BlogPage
+from bakerydemo.breads.models import BreadPage
+from bakerydemo.locations.models import LocationPage
+
+# The page types the demo's native database search is limited to
+SEARCHABLE_PAGE_TYPES = (BlogPage, BreadPage, LocationPage)
+
+# The renditions search_results.html renders for each result's image
+SEARCH_RESULT_RENDITIONS = Filter.expand_spec(
+    "format-{avif,webp,jpeg} fill-180x180-c100"
+)
+
+CACHE_KEY_PREFIX = "search-results"
+CACHE_TIMEOUT = 10 * 60
+
+# Only the IDs of the first results are cached; pages past them are
+# searched directly
+MAX_CACHED_RESULTS = 1000
+
+
+def get_searchable_pages():
+    if "elasticsearch" in settings.WAGTAILSEARCH_BACKENDS["default"]["BACKEND"]:
+        # In production, use ElasticSearch and a simplified search query, per
+        # https://docs.wagtail.org/en/stable/topics/search/backends.html
+        return Page.objects.live()
+
+    # The database backend indexes the search fields of each specific page
+    # type alongside the object, so a single Page query restricted to the
+    # searchable types also matches their specific fields (e.g. body).
+    return Page.objects.live().type(*SEARCHABLE_PAGE_TYPES)
+
+
+def search_pages(search_query):
+    """
+    Returns live pages matching search_query, ranked by relevance, as a lazy
+    SearchResults. Nothing is fetched until it's sliced, so the paginator's
+    count() and page slice are pushed down to the search backend instead of
+    loading every hit.
+    """
+    return get_searchable_pages().search(search_query)
+
+
+def search_page_ids(search_query, start, stop):
+    """
+    Returns the IDs of the results of search_pages between start and stop,
+    loading only the IDs of the pages rather than whole rows.
+    """
+    search_results = get_searchable_pages().only("pk").search(search_query)
+    return [page.pk for page in search_results[start:stop]]
+
+
+class CachedSearchResults:
+    """
+    Search results backed by the cached, relevance-ordered list of matching
+    page IDs. It can be passed to a Paginator like a queryset: slicing a page
+    of results fetches just those pages by ID, see load_result_pages.
+    """
+
+    def __init__(self, search_query, page_ids, total):
+        self.search_query = search_query
+        self.page_ids = page_ids
+        self.total = total
+
+    def count(self):
+        return self.total
+
+    def __len__(self):
+        return self.total
+
+    def __getitem__(self, key):
+        if not isinstance(key, slice):
+            return self[key : key + 1][0]
+
+        start, stop, _ = key.indices(self.total)
+        if stop > len(self.page_ids):
+            page_ids = search_page_ids(self.search_query, start, stop)
+        else:
+            page_ids = self.page_ids[start:stop]
+        return load_result_pages(page_ids)
+
+
+def load_result_pages(page_ids):
+    """
+    Returns the live pages in page_ids, in that order, ready for the search
+    results template: as specific instances (one query per page type), with
+    their content type from the ContentType cache and their images and
+    renditions prefetched.
+    """
+    pages = {
+        page.pk: page for page in Page.objects.live().filter(pk__in=page_ids).specific()
+    }
+    pages = [pages[pk] for pk in page_ids if pk in pages]
+    for page in pages:
+        page.content_type = ContentType.objects.get_for_id(page.content_type_id)
+    prefetch_images(pages, filter_specs=SEARCH_RESULT_RENDITIONS)
+    return pages
+
+
+def get_cache_key(search_query):
+    query_hash = hashlib.md5(
+        normalise_query_string(search_query).encode(), usedforsecurity=False
+    ).hexdigest()
+    backend = settings.WAGTAILSEARCH_BACKENDS["default"]["BACKEND"]
+    return f"{CACHE_KEY_PREFIX}:{backend}:{get_content_generation()}:{query_hash}"
+
+
+def search_pages_cached(search_query):
+    """
+    Like search_pages, but the ordered result IDs are cached per normalised
+    query and search backend until any page is published or unpublished.
+    """
+    key = get_cache_key(search_query)
+    cached = cache.get(key)
+    if cached is None:
+        page_ids = search_page_ids(search_query, 0, MAX_CACHED_RESULTS)
+        if len(page_ids) < MAX_CACHED_RESULTS:
+            total = len(page_ids)
+        else:
+            total = search_pages(search_query).count()
+        cached = (page_ids, total)
+        cache.set(key, cached, CACHE_TIMEOUT)
+
+    page_ids, total = cached
+    return CachedSearchResults(search_query, page_ids, total)
@@ -85,6 +85,7 @@ MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
+    "bakerydemo.base.middleware.SiteContextMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
@@ -99,7 +100,7 @@ TEMPLATES = [
     {
         "BACKEND": "django.template.backends.django.DjangoTemplates",
         "DIRS": [
-            "bakerydemo/templates",
+            os.path.join(PROJECT_DIR, "templates"),
         ],
         "APP_DIRS": True,
         "OPTIONS": {
@@ -109,6 +110,7 @@ TEMPLATES = [
                 "django.contrib.auth.context_processors.auth",
                 "django.contrib.messages.context_processors.messages",
                 "wagtail.contrib.settings.context_processors.settings",
+                "bakerydemo.base.context_processors.site_context",
             ],
         },
     },
@@ -193,6 +195,37 @@ WAGTAILSEARCH_BACKENDS = {
     },
 }
 
+# Search query hits are buffered in memory and written in bulk by a background
+# thread every SEARCH_HITS_FLUSH_INTERVAL seconds (set to 0 to disable the
+# thread), or as soon as SEARCH_HITS_FLUSH_SIZE distinct queries are buffered.
+# ./manage.py flush_search_hits makes every process flush within a few seconds.
+# See bakerydemo/search/hits.py
+SEARCH_HITS_FLUSH_INTERVAL = int(os.environ.get("SEARCH_HITS_FLUSH_INTERVAL", 10))
+SEARCH_HITS_FLUSH_SIZE = int(os.environ.get("SEARCH_HITS_FLUSH_SIZE", 500))
+
+# Whole responses to anonymous page views are cached for PAGE_CACHE_TIMEOUT
+# seconds (0, the default, disables the cache) and purged when the pages they
+# show are published. Requests with query parameters other than
+# PAGE_CACHE_QUERY_PARAMS aren't cached, and responses with a shorter
+# Cache-Control max-age are only cached for that long.
+# See bakerydemo/base/page_cache.py
+PAGE_CACHE_TIMEOUT = int(os.environ.get("PAGE_CACHE_TIMEOUT", 0))
+PAGE_CACHE_QUERY_PARAMS = ["page", "after"]
+
+# Compile the project and Wagtail admin templates when a worker starts, so the
+# first requests it serves don't pay for it. Only useful with the cached
+# template loader, see settings/production.py and base/template_warmup.py
+TEMPLATE_WARMUP = False
+
+# The renditions the templates use are generated in the background when an
+# image is saved, by a thread in each web process that checks the queue every
+# RENDITION_QUEUE_INTERVAL seconds (0 disables the thread, leaving the queue
+# to the process_rendition_queue command) with RENDITION_QUEUE_WORKERS
+# threads. Pages show the original image until then.
+# See bakerydemo/base/rendition_queue.py
+RENDITION_QUEUE_INTERVAL = int(os.environ.get("RENDITION_QUEUE_INTERVAL", 5))
+RENDITION_QUEUE_WORKERS = int(os.environ.get("RENDITION_QUEUE_WORKERS", 2))
+
 # Wagtail settings
 WAGTAIL_SITE_NAME = "bakerydemo"
 
@@ -164,6 +164,20 @@ if "GS_BUCKET_NAME" in os.environ:
     INSTALLED_APPS.append("storages")
     DEFAULT_FILE_STORAGE = "storages.backends.gcloud.GoogleCloudStorage"
 
+# Keep compiled templates in memory for the life of the worker, and compile
+# them all before the worker serves its first request
+TEMPLATES[0]["APP_DIRS"] = False
+TEMPLATES[0]["OPTIONS"]["loaders"] = [
+    (
+        "django.template.loaders.cached.Loader",
+        [
+            "django.template.loaders.filesystem.Loader",
+            "django.template.loaders.app_directories.Loader",
+        ],
+    ),
+]
+TEMPLATE_WARMUP = os.getenv("TEMPLATE_WARMUP", "on") == "on"
+
 LOGGING = {
     "version": 1,
     "disable_existing_loggers": False,
@@ -177,6 +191,10 @@ LOGGING = {
             "handlers": ["console"],
             "level": os.getenv("DJANGO_LOG_LEVEL", "INFO"),
         },
+        "bakerydemo": {
+            "handlers": ["console"],
+            "level": os.getenv("DJANGO_LOG_LEVEL", "INFO"),
+        },
     },
 }
 
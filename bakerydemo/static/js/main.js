@@ -22,3 +22,29 @@ document.addEventListener('DOMContentLoaded', () => {
     toggleMobileNavigation();
   });
 });
+
+// Replaces a gallery's "Load more" link with the next chunk of images, which
+// ends with the link to the chunk after it
+async function loadGalleryChunk(link) {
+  link.setAttribute('aria-busy', 'true');
+  try {
+    const response = await fetch(link.dataset.galleryChunk);
+    if (!response.ok) {
+      throw new Error(response.statusText);
+    }
+    const { html } = await response.json();
+    link.insertAdjacentHTML('beforebegin', html);
+    link.remove();
+  } catch {
+    // Fall back to following the link, which shows the next chunk on its own
+    window.location.href = link.href;
+  }
+}
+
+document.addEventListener('click', (event) => {
+  const link = event.target.closest('[data-gallery-chunk]');
+  if (link) {
+    event.preventDefault();
+    loadGalleryChunk(link);
+  }
+});
@@ -3,11 +3,13 @@ from django.conf import settings
 from django.contrib import admin
 from django.urls import include, path, re_path
 from wagtail import urls as wagtail_urls
+from wagtail import views as wagtail_views
 from wagtail.admin import urls as wagtailadmin_urls
 from wagtail.contrib.sitemaps.views import sitemap
 from wagtail.documents import urls as wagtaildocs_urls
 from wagtail.images.views.serve import ServeView
 
+from bakerydemo.base.page_cache import cache_page_response
 from bakerydemo.search import views as search_views
 
 from .api import api_router
@@ -51,5 +53,17 @@ if settings.DEBUG:
     ]
 
 urlpatterns += [
-    path("", include(wagtail_urls)),
+    # Wagtail's own routes, such as the login and password forms of
+    # restricted pages, which its page serving route would otherwise catch
+    pattern
+    for pattern in wagtail_urls.urlpatterns
+    if getattr(pattern, "name", None) != "wagtail_serve"
+] + [
+    # Wagtail's page serving route, wrapped to cache whole responses for
+    # anonymous visitors when PAGE_CACHE_TIMEOUT is set
+    re_path(
+        wagtail_urls.serve_pattern,
+        cache_page_response(wagtail_views.serve),
+        name="wagtail_serve",
+    ),
 ]
@@ -10,6 +10,7 @@ https://docs.djangoproject.com/en/3.2/howto/deployment/wsgi/
 import os
 
 import dotenv
+from django.conf import settings
 from django.core.wsgi import get_wsgi_application
 
 dotenv.read_dotenv(os.path.join(os.path.dirname(os.path.dirname(__file__)), ".env"))
@@ -17,3 +18,17 @@ dotenv.read_dotenv(os.path.join(os.path.dirname(os.path.dirname(__file__)), ".en
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "bakerydemo.settings.dev")
 
 application = get_wsgi_application()
+
+if settings.TEMPLATE_WARMUP:
+    # Runs in each worker before it accepts requests, see
+    # base/template_warmup.py
+    from bakerydemo.base.template_warmup import warm_templates
+
+    warm_templates()
+
+if settings.RENDITION_QUEUE_INTERVAL:
+    # Also picks up images saved by other processes, see
+    # base/rendition_queue.py
+    from bakerydemo.base.rendition_queue import get_rendition_worker
+
+    get_rendition_worker().start()
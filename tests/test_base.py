@@ -1,4 +1,6 @@
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.template import Context, Template
 from django.test import TestCase
 from wagtail.models import Page, Collection, Site
 
@@ -13,6 +15,11 @@ from bakerydemo.base.models import (
     SiteSettings,
     UserApprovalTask,
 )
+from bakerydemo.base.footer import get_footer_html
+from bakerydemo.base.home import build_featured_children, get_featured_children
+from bakerydemo.blog.models import BlogIndexPage, BlogPage
+from bakerydemo.breads.models import BreadPage, BreadsIndexPage, Country
+from bakerydemo.locations.models import LocationPage, LocationsIndexPage
 
 
 class PersonModelTests(TestCase):
@@ -54,6 +61,49 @@ class FooterTextModelTests(TestCase):
         self.assertEqual(context["footer_text"], "Test Footer Text")
 
 
+class FooterTextCacheTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+
+    def test_footer_html_is_cached(self):
+        FooterText.objects.create(body="<p>Baked fresh</p>")
+        self.assertIn("<p>Baked fresh</p>", get_footer_html())
+        with self.assertNumQueries(0):
+            self.assertIn("<p>Baked fresh</p>", get_footer_html())
+
+    def test_publish_and_unpublish_refresh_footer_html(self):
+        footer_text = FooterText.objects.create(body="<p>Old</p>")
+        get_footer_html()
+        footer_text.body = "<p>New</p>"
+        footer_text.save_revision().publish()
+        self.assertIn("<p>New</p>", get_footer_html())
+        footer_text.unpublish()
+        self.assertNotIn("<p>New</p>", get_footer_html())
+
+    def test_slug_change_refreshes_footer_links(self):
+        root = Site.objects.get(is_default_site=True).root_page
+        page = root.add_child(instance=StandardPage(title="About", slug="about"))
+        FooterText.objects.create(
+            body=f'<p><a linktype="page" id="{page.pk}">About</a></p>'
+        )
+        self.assertIn('href="/about/"', get_footer_html())
+
+        page.slug = "our-story"
+        # page_slug_changed is sent once the change is committed
+        with self.captureOnCommitCallbacks(execute=True):
+            page.save_revision().publish()
+        self.assertIn('href="/our-story/"', get_footer_html())
+
+    def test_preview_bypasses_cache(self):
+        FooterText.objects.create(body="<p>Live</p>")
+        get_footer_html()
+        html = Template("{% load navigation_tags %}{% get_footer_text %}").render(
+            Context({"footer_text": "<p>Preview</p>"})
+        )
+        self.assertIn("<p>Preview</p>", html)
+
+
 class StandardPageModelTests(TestCase):
 
     def test_create_standard_page(self):
@@ -81,6 +131,84 @@ class HomePageModelTests(TestCase):
         self.assertEqual(home_page.title, "Home")
 
 
+class HomePageFeaturedSectionsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        root = Page.objects.get(pk=1)
+        self.breads = root.add_child(
+            instance=BreadsIndexPage(title="Breads", slug="breads")
+        )
+        self.locations = root.add_child(
+            instance=LocationsIndexPage(title="Locations", slug="locations")
+        )
+        self.blog = root.add_child(instance=BlogIndexPage(title="Blog", slug="blog"))
+        for number in range(4):
+            self.breads.add_child(
+                instance=BreadPage(
+                    title=f"Bread {number}",
+                    slug=f"bread-{number}",
+                    origin=Country.objects.create(title=f"Country {number}"),
+                )
+            )
+            self.locations.add_child(
+                instance=LocationPage(
+                    title=f"Location {number}",
+                    slug=f"location-{number}",
+                    address="Main Street",
+                    lat_long="64.144367, -21.939182",
+                )
+            )
+        for number in range(8):
+            self.blog.add_child(
+                instance=BlogPage(title=f"Post {number}", slug=f"post-{number}")
+            )
+        self.home_page = root.add_child(
+            instance=HomePage(
+                title="Bakery",
+                slug="bakery",
+                hero_text="Welcome to our site",
+                hero_cta="Learn more",
+                featured_section_1=self.breads,
+                featured_section_2=self.locations,
+                featured_section_3=self.blog,
+            )
+        )
+        Site.objects.filter(is_default_site=True).update(root_page=self.home_page)
+
+    def test_sections_are_limited_and_specific(self):
+        featured_children = build_featured_children(self.home_page)
+        self.assertEqual(
+            {name: len(pages) for name, pages in featured_children.items()},
+            {"featured_section_1": 3, "featured_section_2": 3, "featured_section_3": 6},
+        )
+        breads = featured_children["featured_section_1"]
+        self.assertEqual(
+            [bread.title for bread in breads], ["Bread 0", "Bread 1", "Bread 2"]
+        )
+        self.assertIsInstance(featured_children["featured_section_2"][0], LocationPage)
+        with self.assertNumQueries(0):
+            self.assertEqual(breads[0].origin.title, "Country 0")
+            self.assertIsNone(breads[0].bread_type)
+
+    def test_featured_children_are_cached_until_a_page_is_published(self):
+        get_featured_children(self.home_page)
+        with self.assertNumQueries(0):
+            get_featured_children(self.home_page)
+        self.breads.get_children().first().specific.unpublish()
+        breads = get_featured_children(self.home_page)["featured_section_1"]
+        self.assertEqual(
+            [bread.title for bread in breads], ["Bread 1", "Bread 2", "Bread 3"]
+        )
+
+    def test_home_page_renders_featured_children(self):
+        response = self.client.get("/")
+        self.assertContains(response, "Bread 2")
+        self.assertNotContains(response, "Bread 3")
+        self.assertContains(response, "Location 0")
+        self.assertContains(response, "Post 5")
+        self.assertNotContains(response, "Post 6")
+
+
 class GalleryPageModelTests(TestCase):
 
     def setUp(self):
@@ -1,8 +1,16 @@
+from django.core.cache import cache
+from django.db import connection
 from django.test import TestCase
-from wagtail.images.models import Image
-from wagtail.models import Page
+from django.test.utils import CaptureQueriesContext
+from wagtail.images.models import Filter, Image
+from wagtail.models import Page, Site
 from wagtail.images.tests.utils import get_test_image_file
-from bakerydemo.blog.models import BlogPage, BlogIndexPage, BlogPersonRelationship
+from bakerydemo.blog.models import (
+    BLOG_CARD_RENDITIONS,
+    BlogIndexPage,
+    BlogPage,
+    BlogPersonRelationship,
+)
 from bakerydemo.base.models import Person
 from taggit.models import Tag
 from datetime import datetime
@@ -123,3 +131,176 @@ class BlogPersonRelationshipModelTests(TestCase):
 
         self.assertEqual(blog_person_relationship.page, self.blog_page)
         self.assertEqual(blog_person_relationship.person, self.person)
+
+
+class TagCloudTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        # A page of the default site, so the tag archives have URLs
+        root_page = Site.objects.get(is_default_site=True).root_page
+        self.index_page = root_page.add_child(
+            instance=BlogIndexPage(title="Blog", slug="blog")
+        )
+        self.posts = []
+        for number, tags in enumerate([["rye", "sourdough"], ["sourdough"], ["rye"]]):
+            post = BlogPage(title=f"Post {number}", slug=f"post-{number}")
+            post.tags.add(*tags)
+            self.index_page.add_child(instance=post)
+            post.save_revision().publish()
+            self.posts.append(post)
+        draft = BlogPage(title="Draft", slug="draft", live=False)
+        draft.tags.add("wholemeal")
+        self.index_page.add_child(instance=draft)
+
+    def get_counts(self):
+        return {tag.name: tag.post_count for tag in self.index_page.get_child_tags()}
+
+    def test_tags_are_counted_in_one_query(self):
+        # Resolve the index page URL up front
+        url = self.index_page.url
+        with self.assertNumQueries(1):
+            tags = self.index_page.get_child_tags()
+        self.assertEqual([tag.name for tag in tags], ["rye", "sourdough"])
+        self.assertEqual([tag.post_count for tag in tags], [2, 2])
+        self.assertEqual(tags[0].url, f"{url}tags/rye/")
+        with self.assertNumQueries(0):
+            self.index_page.get_child_tags()
+
+    def test_publishing_a_post_refreshes_the_counts(self):
+        self.get_counts()
+        post = self.posts[1]
+        post.tags.add("rye")
+        post.save_revision().publish()
+        self.assertEqual(self.get_counts(), {"rye": 3, "sourdough": 2})
+
+    def test_unpublishing_a_post_refreshes_the_counts(self):
+        self.get_counts()
+        self.posts[0].unpublish()
+        self.assertEqual(self.get_counts(), {"rye": 1, "sourdough": 1})
+
+    def test_deleting_a_post_refreshes_the_counts(self):
+        self.get_counts()
+        self.posts[2].delete()
+        self.assertEqual(self.get_counts(), {"rye": 1, "sourdough": 2})
+
+    def test_tag_urls_follow_the_index_page(self):
+        self.index_page.get_child_tags()
+        self.index_page.slug = "journal"
+        self.index_page.save_revision().publish()
+
+        index_page = BlogIndexPage.objects.get(pk=self.index_page.pk)
+        tags = index_page.get_child_tags()
+        self.assertEqual(tags[0].url, f"{index_page.url}tags/rye/")
+        self.assertIn("/journal/", tags[0].url)
+
+
+class BlogListingQueryTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.image = Image.objects.create(title="Loaf", file=get_test_image_file())
+        # Encoding AVIF isn't available everywhere, so create the renditions
+        # the cards need up front
+        for spec in BLOG_CARD_RENDITIONS:
+            self.image.renditions.create(
+                filter_spec=spec,
+                focal_point_key=Filter(spec).get_cache_key(self.image),
+                file=f"images/loaf.{spec.split('|')[0][7:]}",
+                width=322,
+                height=247,
+            )
+        self.author = Person.objects.create(first_name="Ada", last_name="Baker")
+        self.draft_author = Person.objects.create(
+            first_name="Draft", last_name="Baker", live=False
+        )
+        root = Site.objects.get(is_default_site=True).root_page
+        self.index_page = root.add_child(
+            instance=BlogIndexPage(title="Blog", slug="blog")
+        )
+
+    def add_posts(self, count):
+        for _ in range(count):
+            number = self.index_page.get_children().count()
+            post = BlogPage(
+                title=f"Post {number}",
+                slug=f"post-{number}",
+                image=self.image,
+                date_published="2024-07-05",
+            )
+            post.tags.add("rye")
+            post.blog_person_relationship.add(
+                BlogPersonRelationship(person=self.author),
+                BlogPersonRelationship(person=self.draft_author),
+            )
+            self.index_page.add_child(instance=post)
+
+    def count_queries(self, path):
+        # Warm the caches. The site settings are created on first use, which
+        # invalidates the cached footer once more
+        self.client.get(path)
+        self.client.get(path)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(path)
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def test_listing_authors_come_from_prefetched_data(self):
+        self.add_posts(2)
+        posts = list(self.index_page.get_posts().for_listing())
+        with self.assertNumQueries(0):
+            for post in posts:
+                self.assertEqual(post.authors(), [self.author])
+                self.assertEqual([tag.name for tag in post.tags.all()], ["rye"])
+                self.assertEqual(post.image.prefetched_renditions[0].width, 322)
+
+    def test_index_queries_do_not_grow_with_posts(self):
+        self.add_posts(2)
+        few_posts = self.count_queries("/blog/")
+        self.add_posts(5)
+        self.assertEqual(self.count_queries("/blog/"), few_posts)
+
+    def test_tag_archive_queries_do_not_grow_with_posts(self):
+        self.add_posts(2)
+        few_posts = self.count_queries("/blog/tags/rye/")
+        self.add_posts(5)
+        self.assertEqual(self.count_queries("/blog/tags/rye/"), few_posts)
+
+
+class BlogIndexPaginationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        root = Site.objects.get(is_default_site=True).root_page
+        self.index_page = root.add_child(
+            instance=BlogIndexPage(title="Blog", slug="blog")
+        )
+        for day in range(1, 16):
+            post = BlogPage(
+                title=f"Post {day}",
+                slug=f"post-{day}",
+                date_published=f"2024-07-{day:02}",
+            )
+            post.tags.add("rye")
+            self.index_page.add_child(instance=post)
+
+    def assertPaginates(self, path):
+        response = self.client.get(path)
+        first_page = response.context["posts"]
+        self.assertEqual(len(first_page), 12)
+        self.assertEqual(first_page[0].title, "Post 15")
+        self.assertContains(response, f"?after={first_page.next_cursor}")
+
+        response = self.client.get(path, {"after": first_page.next_cursor})
+        second_page = response.context["posts"]
+        self.assertEqual(
+            [post.title for post in second_page], ["Post 3", "Post 2", "Post 1"]
+        )
+        self.assertFalse(second_page.has_next())
+
+    def test_index_is_paginated(self):
+        self.assertPaginates("/blog/")
+
+    def test_tag_archive_is_paginated(self):
+        self.assertPaginates("/blog/tags/rye/")
+
+    def test_invalid_cursor_shows_the_first_page(self):
+        response = self.client.get("/blog/", {"after": "nonsense"})
+        self.assertEqual(response.context["posts"][0].title, "Post 15")
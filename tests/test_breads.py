@@ -1,7 +1,22 @@
 # -*- coding: utf-8 -*-
 
 import pytest
-from bakerydemo.breads.models import BreadType, BreadIngredient
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from wagtail.images.models import Filter, Image
+from wagtail.images.tests.utils import get_test_image_file
+from wagtail.models import Site
+
+from bakerydemo.base.models import GenericSettings, SiteSettings, StandardPage
+from bakerydemo.breads.models import (
+    BREAD_CARD_RENDITIONS,
+    BreadIngredient,
+    BreadPage,
+    BreadsIndexPage,
+    BreadType,
+    Country,
+)
 
 @pytest.mark.django_db
 def test_crud_bread_type():
@@ -66,3 +81,77 @@ def test_crud_bread_ingredient():
     
     # Vérification de la suppression
     assert BreadIngredient.objects.count() == initial_count
+
+
+def create_card_image():
+    image = Image.objects.create(title="Loaf", file=get_test_image_file())
+    # Encoding AVIF isn't available everywhere, so create the renditions the
+    # cards need up front
+    for spec in BREAD_CARD_RENDITIONS:
+        image.renditions.create(
+            filter_spec=spec,
+            focal_point_key=Filter(spec).get_cache_key(image),
+            file=f"images/loaf.{spec.split('|')[0][7:]}",
+            width=180,
+            height=180,
+        )
+    return image
+
+
+def add_breads(index_page, count, image):
+    for _ in range(count):
+        number = index_page.get_children().count()
+        bread = BreadPage(
+            title=f"Bread {number}",
+            slug=f"bread-{number}",
+            image=image,
+            origin=Country.objects.create(title=f"Country {number}"),
+            bread_type=BreadType.objects.create(title=f"Type {number}"),
+        )
+        index_page.add_child(instance=bread)
+        bread.save_revision().publish()
+
+
+def count_queries(client, path):
+    client.get(path)
+    with CaptureQueriesContext(connection) as queries:
+        response = client.get(path)
+    assert response.status_code == 200
+    return len(queries)
+
+
+@pytest.mark.django_db
+def test_breads_index_queries_do_not_grow_with_breads(client):
+    cache.clear()
+    site = Site.objects.get(is_default_site=True)
+    # Settings are created on first use, which purges the cached footer
+    SiteSettings.objects.create(site=site)
+    GenericSettings.objects.create()
+    root = site.root_page
+    index_page = root.add_child(instance=BreadsIndexPage(title="Breads", slug="breads"))
+    image = create_card_image()
+
+    add_breads(index_page, 2, image)
+    few_breads = count_queries(client, "/breads/")
+    add_breads(index_page, 10, image)
+    assert count_queries(client, "/breads/") == few_breads
+
+
+@pytest.mark.django_db
+def test_bread_listing_cards_are_loaded_in_bulk(django_assert_num_queries):
+    root = Site.objects.get(is_default_site=True).root_page
+    index_page = root.add_child(instance=BreadsIndexPage(title="Breads", slug="breads"))
+    add_breads(index_page, 3, create_card_image())
+    index_page.add_child(instance=StandardPage(title="About", slug="about"))
+
+    # The children, then the specific pages of each type, then the origins,
+    # types, images and renditions of the breads
+    with django_assert_num_queries(7):
+        children = index_page.children()
+        assert [type(child) for child in children] == [BreadPage] * 3 + [
+            StandardPage
+        ]
+        for bread in children[:3]:
+            assert bread.origin.title.startswith("Country")
+            assert bread.bread_type.title.startswith("Type")
+            assert len(bread.image.prefetched_renditions) == 3
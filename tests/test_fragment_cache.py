@@ -0,0 +1,109 @@
+from django.core.cache import cache
+from django.template import Context, Template
+from django.template.loader import render_to_string
+from django.test import RequestFactory, TestCase
+from wagtail.models import Site
+
+from bakerydemo.base.fragment_cache import (
+    bump_fragment_version,
+    get_fragment_stats,
+    reset_fragment_stats,
+)
+from bakerydemo.base.models import StandardPage
+from bakerydemo.breads.models import BreadPage
+
+TEMPLATE = Template(
+    "{% load fragment_cache_tags %}"
+    '{% fragment_cache "card" page %}{{ page.title }} {{ renders }}{% endfragment_cache %}'
+)
+
+
+class Counter:
+    def __init__(self):
+        self.count = 0
+
+    def __str__(self):
+        self.count += 1
+        return str(self.count)
+
+
+class FragmentCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        reset_fragment_stats()
+        self.request = RequestFactory().get("/")
+        self.root = Site.objects.get(is_default_site=True).root_page
+        self.page = self.root.add_child(
+            instance=StandardPage(title="About", slug="about")
+        )
+        self.page.save_revision().publish()
+
+    def render(self, page=None, request=None):
+        return TEMPLATE.render(
+            Context(
+                {
+                    "page": page or self.page,
+                    "renders": Counter(),
+                    "request": request or self.request,
+                }
+            )
+        )
+
+    def test_fragments_are_cached(self):
+        self.assertEqual(self.render(), "About 1")
+        self.assertEqual(self.render(), "About 1")
+        self.assertEqual(get_fragment_stats(), {"card": {"hits": 1, "misses": 1}})
+
+    def test_fragments_vary_on_objects(self):
+        other = self.root.add_child(instance=StandardPage(title="Team", slug="team"))
+        self.render()
+        self.assertEqual(self.render(other), "Team 1")
+
+    def test_publishing_changes_the_version(self):
+        self.render()
+        self.page.title = "About us"
+        self.page.save_revision().publish()
+        self.assertEqual(self.render(), "About us 1")
+
+    def test_bumping_the_version(self):
+        self.render()
+        self.page.title = "Renamed without a revision"
+        self.page.save()
+        self.assertEqual(self.render(), "About 1")
+        bump_fragment_version("card")
+        self.assertEqual(self.render(), "Renamed without a revision 1")
+
+    def test_previews_are_not_cached(self):
+        self.render()
+        self.request.is_preview = True
+        self.page.title = "Draft title"
+        self.assertEqual(self.render(), "Draft title 1")
+        self.assertEqual(get_fragment_stats(), {"card": {"hits": 0, "misses": 1}})
+
+    def test_header_is_refreshed_when_the_menu_changes(self):
+        self.page.show_in_menus = True
+        self.page.save_revision().publish()
+        self.assertContains(
+            self.client.get("/about/"), '<li class="presentation about active">'
+        )
+        self.page.title = "Our story"
+        self.page.save_revision().publish()
+        self.assertContains(
+            self.client.get("/about/"), '<li class="presentation ourstory active">'
+        )
+
+    def test_cards_follow_slug_changes_of_their_ancestors(self):
+        bread = self.page.add_child(instance=BreadPage(title="Rye", slug="rye"))
+
+        def render_card():
+            page = BreadPage.objects.get(pk=bread.pk)
+            return render_to_string(
+                "includes/card/listing-card.html",
+                {"page": page, "request": self.request},
+            )
+
+        self.assertIn('href="/about/rye/"', render_card())
+        self.page.slug = "about-us"
+        with self.captureOnCommitCallbacks(execute=True):
+            self.page.save_revision().publish()
+        self.assertIn('href="/about-us/rye/"', render_card())
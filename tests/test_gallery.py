@@ -0,0 +1,104 @@
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from wagtail.images.models import Image
+from wagtail.images.tests.utils import get_test_image_file
+from wagtail.models import Collection, Site
+
+from bakerydemo.base.gallery import GALLERY_CHUNK_SIZE
+from bakerydemo.base.models import GalleryPage, GenericSettings, SiteSettings
+
+
+class GalleryTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        site = Site.objects.get(is_default_site=True)
+        # Settings are created on first use, which purges the cache
+        SiteSettings.objects.create(site=site)
+        GenericSettings.objects.create()
+        self.collection = Collection.get_first_root_node().add_child(name="Gallery")
+        self.page = site.root_page.add_child(
+            instance=GalleryPage(
+                title="Gallery", slug="gallery", collection=self.collection
+            )
+        )
+        self.chunk_url = self.page.url + self.page.reverse_subpage("gallery_chunk")
+
+    def add_images(self, count):
+        # Just saved, so they show their originals while the rendition queue
+        # generates their renditions
+        return [
+            Image.objects.create(
+                title=f"Image {number}",
+                file=get_test_image_file(),
+                collection=self.collection,
+            )
+            for number in range(count)
+        ]
+
+    def count_queries(self, url):
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def test_shows_the_first_chunk(self):
+        self.add_images(GALLERY_CHUNK_SIZE + 1)
+
+        response = self.client.get(self.page.url)
+
+        self.assertContains(
+            response, 'class="picture-card__title"', count=GALLERY_CHUNK_SIZE
+        )
+        self.assertContains(response, "data-gallery-chunk=")
+
+    def test_load_more_chunks(self):
+        self.add_images(GALLERY_CHUNK_SIZE * 2 + 1)
+        counts = []
+        url = self.chunk_url
+        while url:
+            html = self.client.get(url).json()["html"]
+            counts.append(html.count('class="picture-card__title"'))
+            url = None
+            if "data-gallery-chunk=" in html:
+                url = html.split('data-gallery-chunk="')[1].split('"')[0]
+
+        self.assertEqual(counts, [GALLERY_CHUNK_SIZE, GALLERY_CHUNK_SIZE, 1])
+
+    def test_invalid_cursor(self):
+        response = self.client.get(self.chunk_url, {"after": "nonsense"})
+        self.assertEqual(response.status_code, 400)
+
+        response = self.client.get(self.page.url, {"after": "nonsense"})
+        self.assertEqual(response.status_code, 200)
+
+    def test_queries_dont_grow_with_images(self):
+        self.add_images(2)
+        queries = self.count_queries(self.chunk_url)
+        self.add_images(GALLERY_CHUNK_SIZE)
+        self.assertEqual(self.count_queries(self.chunk_url), queries)
+
+    def test_chunks_are_cached(self):
+        [image] = self.add_images(1)
+        self.client.get(self.chunk_url)
+
+        with CaptureQueriesContext(connection) as queries:
+            html = self.client.get(self.chunk_url).json()["html"]
+        self.assertIn("Image 0", html)
+        # Only routing to the page
+        self.assertFalse([q for q in queries if "wagtailimages" in q["sql"]])
+
+        image.title = "Renamed"
+        image.save()
+        self.assertIn("Renamed", self.client.get(self.chunk_url).json()["html"])
+
+    def test_moving_an_image_purges_its_previous_gallery(self):
+        [image] = self.add_images(1)
+        self.client.get(self.chunk_url)
+
+        image.collection = Collection.get_first_root_node()
+        image.save()
+
+        self.assertNotIn("Image 0", self.client.get(self.chunk_url).json()["html"])
@@ -0,0 +1,88 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+from wagtail.images.models import Image, Rendition
+from wagtail.images.tests.utils import get_test_image_file
+
+from bakerydemo.base.images import find_template_filter_specs, get_tag_filter_specs
+
+
+class TemplateFilterSpecTests(TestCase):
+    def test_get_tag_filter_specs(self):
+        self.assertEqual(
+            get_tag_filter_specs(
+                'page.image format-{webp,jpeg} fill-{20x20,40x30} sizes="100vw" alt=""'
+            ),
+            [
+                "format-webp|fill-20x20",
+                "format-webp|fill-40x30",
+                "format-jpeg|fill-20x20",
+                "format-jpeg|fill-40x30",
+            ],
+        )
+        self.assertEqual(
+            get_tag_filter_specs("page.image fill-180x180-c100 as thumbnail"),
+            ["fill-180x180-c100"],
+        )
+
+    def test_finds_the_template_filter_specs(self):
+        specs = find_template_filter_specs()
+
+        for spec in [
+            "format-avif|fill-180x180-c100",
+            "format-webp|fill-322x247-c100",
+            "format-jpeg|fill-430x320-c100",
+            "format-avif|fill-433x487-c100",
+            "format-webp|fill-1920x900",
+            "format-jpeg|fill-590x413-c100",
+            "format-avif|fill-50x50-c100",
+        ]:
+            self.assertIn(spec, specs)
+
+
+class GenerateRenditionsCommandTests(TestCase):
+    def setUp(self):
+        self.images = [
+            Image.objects.create(title=f"Image {number}", file=get_test_image_file())
+            for number in range(3)
+        ]
+
+    def call_command(self):
+        stdout = StringIO()
+        stderr = StringIO()
+        call_command(
+            "generate_renditions",
+            processes=1,
+            chunk_size=2,
+            specs=["format-{webp,jpeg} fill-20x20"],
+            stdout=stdout,
+            stderr=stderr,
+        )
+        return stdout.getvalue(), stderr.getvalue()
+
+    def test_generates_missing_renditions(self):
+        self.images[0].get_rendition("format-webp|fill-20x20")
+
+        stdout, _ = self.call_command()
+
+        self.assertEqual(Rendition.objects.count(), 6)
+        self.assertIn("Created 5 renditions for 3 of 3 images", stdout)
+        self.assertIn("images/s", stdout)
+
+    def test_carries_on_where_it_stopped(self):
+        self.call_command()
+
+        stdout, _ = self.call_command()
+
+        self.assertEqual(Rendition.objects.count(), 6)
+        self.assertIn("Created 0 renditions for 0 of 3 images", stdout)
+
+    def test_reports_renditions_that_cant_be_generated(self):
+        image = self.images[0]
+        image.file.storage.delete(image.file.name)
+
+        _, stderr = self.call_command()
+
+        self.assertEqual(Rendition.objects.count(), 4)
+        self.assertIn("Couldn't generate format-webp|fill-20x20 for 1 images", stderr)
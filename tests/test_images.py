@@ -0,0 +1,158 @@
+from django.core.cache import cache
+from django.db import connection
+from django.template import Context, Template
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from wagtail.images.models import Filter, Image
+from wagtail.images.tests.utils import get_test_image_file
+from wagtail.models import Site
+
+from bakerydemo.base.images import RenditionPlan, prefetch_images
+from bakerydemo.base.models import GenericSettings, RenditionJob, SiteSettings
+from bakerydemo.locations.models import (
+    LOCATION_CARD_RENDITIONS,
+    LocationPage,
+    LocationsIndexPage,
+)
+
+SPECS = Filter.expand_spec("format-{webp,jpeg} fill-{20x20,40x30}")
+
+
+def create_images(count):
+    return [
+        Image.objects.create(title=f"Image {number}", file=get_test_image_file())
+        for number in range(count)
+    ]
+
+
+def render_pictures(images):
+    template = Template(
+        "{% load wagtailimages_tags %}{% for image in images %}"
+        "{% picture image format-{webp,jpeg} fill-{20x20,40x30} %}{% endfor %}"
+    )
+    return template.render(Context({"images": images}))
+
+
+class RenditionPlanTests(TestCase):
+    def setUp(self):
+        self.images = create_images(5)
+        # As if the rendition queue had given up on them
+        RenditionJob.objects.all().delete()
+
+    def plan(self, images):
+        plan = RenditionPlan()
+        for image in images:
+            plan.add(image, SPECS)
+        return plan
+
+    def test_creates_missing_renditions_in_one_insert(self):
+        images = list(
+            Image.objects.filter(pk__in=[image.pk for image in self.images]).order_by(
+                "pk"
+            )
+        )
+
+        with CaptureQueriesContext(connection) as queries:
+            self.plan(images).resolve()
+        inserts = [q for q in queries if q["sql"].startswith("INSERT")]
+        self.assertEqual(len(inserts), 1)
+        self.assertEqual(
+            Image.get_rendition_model().objects.count(), len(self.images) * len(SPECS)
+        )
+
+        with self.assertNumQueries(0):
+            html = render_pictures(images)
+        self.assertEqual(html.count("<picture>"), 5)
+
+    def test_finds_existing_renditions_in_one_query(self):
+        self.plan(self.images).resolve()
+        images = list(
+            Image.objects.filter(pk__in=[image.pk for image in self.images]).order_by(
+                "pk"
+            )
+        )
+
+        with self.assertNumQueries(1):
+            self.plan(images).resolve()
+        with self.assertNumQueries(0):
+            render_pictures(images)
+
+    def test_prefetched_renditions_are_not_looked_up_again(self):
+        self.plan(self.images).resolve()
+        images = list(
+            Image.objects.filter(
+                pk__in=[image.pk for image in self.images]
+            ).prefetch_renditions(*SPECS)
+        )
+
+        with self.assertNumQueries(0):
+            self.plan(images).resolve()
+
+    def test_missing_files_are_left_for_the_template(self):
+        self.images[0].file.storage.delete(self.images[0].file.name)
+        images = list(
+            Image.objects.filter(pk__in=[image.pk for image in self.images]).order_by(
+                "pk"
+            )
+        )
+
+        self.plan(images).resolve()
+        self.assertFalse(images[0].renditions.exists())
+        self.assertTrue(images[1].renditions.exists())
+
+    def test_prefetch_images(self):
+        pages = [LocationPage(image_id=image.pk) for image in self.images]
+
+        # The images, their renditions, the rendition queue and the insert
+        with self.assertNumQueries(4):
+            prefetch_images(pages, filter_specs=SPECS)
+        with self.assertNumQueries(0):
+            render_pictures([page.image for page in pages])
+
+
+class LocationsIndexRenditionTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        site = Site.objects.get(is_default_site=True)
+        # Settings are created on first use, which purges the cache
+        SiteSettings.objects.create(site=site)
+        GenericSettings.objects.create()
+        self.index = site.root_page.add_child(
+            instance=LocationsIndexPage(title="Locations", slug="locations")
+        )
+
+    def add_locations(self, count):
+        for image in create_images(count):
+            # Encoding AVIF isn't available everywhere, so create the
+            # renditions the cards need up front
+            for spec in LOCATION_CARD_RENDITIONS:
+                image.renditions.create(
+                    filter_spec=spec,
+                    focal_point_key=Filter(spec).get_cache_key(image),
+                    file=f"images/location.{spec.split('|')[0][7:]}",
+                    width=300,
+                    height=200,
+                )
+            location = self.index.add_child(
+                instance=LocationPage(
+                    title=f"Location {image.pk}",
+                    slug=f"location-{image.pk}",
+                    address="1 Street",
+                    lat_long="64.144367, -21.939182",
+                    image=image,
+                )
+            )
+            location.save_revision().publish()
+
+    def count_queries(self):
+        self.client.get(self.index.url)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.index.url)
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def test_queries_dont_grow_with_locations(self):
+        self.add_locations(2)
+        queries = self.count_queries()
+        self.add_locations(10)
+        self.assertEqual(self.count_queries(), queries)
@@ -0,0 +1,71 @@
+import os
+import tempfile
+from io import StringIO
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+from django.test import SimpleTestCase
+
+from bakerydemo.base.management.commands.load_initial_data import Command
+
+
+class CopyFilesTests(SimpleTestCase):
+    def setUp(self):
+        source_dir = tempfile.TemporaryDirectory()
+        destination_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(source_dir.cleanup)
+        self.addCleanup(destination_dir.cleanup)
+        self.source = FileSystemStorage(source_dir.name)
+        # Stands in for the cloud storage of production
+        self.destination = FileSystemStorage(destination_dir.name)
+
+        self.names = ["original_images/a.jpg", "original_images/b.jpg"]
+        self.names += ["c.txt", "empty.txt"]
+        self.names += [f"images/{number}.jpg" for number in range(20)]
+        for name in self.names:
+            contents = b"" if name == "empty.txt" else f"Contents of {name}".encode()
+            self.source.save(name, ContentFile(contents))
+
+    def copy_files(self):
+        stdout = StringIO()
+        command = Command(stdout=stdout)
+        result = command.copy_files(self.source, self.destination, workers=4)
+        return result, stdout.getvalue()
+
+    def listdir(self, storage):
+        return sorted(
+            os.path.relpath(os.path.join(root, name), storage.location)
+            for root, _, names in os.walk(storage.location)
+            for name in names
+        )
+
+    def test_copies_every_file(self):
+        (copied, skipped), output = self.copy_files()
+
+        self.assertEqual((copied, skipped), (len(self.names), 0))
+        self.assertEqual(self.listdir(self.destination), sorted(self.names))
+        with self.destination.open("c.txt") as f:
+            self.assertEqual(f.read(), b"Contents of c.txt")
+        self.assertIn(f"{len(self.names)}/{len(self.names)} files", output)
+        self.assertIn("MB/s", output)
+
+    def test_skips_files_already_copied(self):
+        self.copy_files()
+
+        (copied, skipped), _ = self.copy_files()
+
+        self.assertEqual((copied, skipped), (0, len(self.names)))
+        self.assertEqual(self.listdir(self.destination), sorted(self.names))
+
+    def test_replaces_changed_files_under_the_same_name(self):
+        self.copy_files()
+        self.destination.delete("c.txt")
+        self.destination.save("c.txt", ContentFile(b"Contents of c.tx!"))
+        self.destination.delete("original_images/a.jpg")
+
+        (copied, skipped), _ = self.copy_files()
+
+        self.assertEqual((copied, skipped), (2, len(self.names) - 2))
+        self.assertEqual(self.listdir(self.destination), sorted(self.names))
+        with self.destination.open("c.txt") as f:
+            self.assertEqual(f.read(), b"Contents of c.txt")
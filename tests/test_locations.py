@@ -0,0 +1,437 @@
+import importlib
+import math
+import random
+from datetime import datetime, time, timedelta
+from datetime import timezone as dt_timezone
+from unittest import mock
+
+from django.apps import apps
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from wagtail.models import Site
+from zoneinfo import ZoneInfo
+
+from bakerydemo.locations.models import (
+    LocationOperatingHours,
+    LocationPage,
+    LocationsIndexPage,
+)
+from bakerydemo.locations.schedule import (
+    ScheduleTable,
+    WeeklySchedule,
+    get_schedule_table,
+    get_schedules,
+)
+from bakerydemo.locations.spatial import (
+    SpatialIndex,
+    get_location_index,
+    get_nearest_locations,
+    parse_lat_long,
+)
+
+UTC = dt_timezone.utc
+
+
+def hours(day, opening, closing, closed=False):
+    return LocationOperatingHours(
+        day=day, opening_time=opening, closing_time=closing, closed=closed
+    )
+
+
+class WeeklyScheduleTests(TestCase):
+    def setUp(self):
+        self.schedule = WeeklySchedule.from_hours(
+            [
+                hours("MON", time(9), time(17)),
+                hours("MON", time(16), time(18)),
+                hours("FRI", time(18), time(2)),
+                hours("SAT", time(10), time(12)),
+                hours("SUN", time(10), time(12), closed=True),
+                hours("TUE", None, time(12)),
+            ]
+        )
+
+    def test_intervals(self):
+        self.assertEqual(
+            self.schedule.days,
+            (
+                ((540, 1080),),
+                (),
+                (),
+                (),
+                ((1080, 1440),),
+                ((0, 120), (600, 720)),
+                (),
+            ),
+        )
+
+    def test_is_open_at(self):
+        # 2024-01-01 is a Monday
+        self.assertTrue(self.schedule.is_open_at(datetime(2024, 1, 1, 9, tzinfo=UTC)))
+        self.assertTrue(
+            self.schedule.is_open_at(datetime(2024, 1, 1, 17, 30, tzinfo=UTC))
+        )
+        self.assertFalse(self.schedule.is_open_at(datetime(2024, 1, 1, 18, tzinfo=UTC)))
+        self.assertFalse(self.schedule.is_open_at(datetime(2024, 1, 2, 11, tzinfo=UTC)))
+        # Friday night runs into Saturday
+        self.assertTrue(self.schedule.is_open_at(datetime(2024, 1, 6, 1, tzinfo=UTC)))
+        self.assertFalse(self.schedule.is_open_at(datetime(2024, 1, 7, 11, tzinfo=UTC)))
+
+    @override_settings(TIME_ZONE="America/New_York")
+    def test_hours_are_in_site_time_zone(self):
+        # 14:30 UTC is 09:30 in New York
+        self.assertTrue(
+            self.schedule.is_open_at(datetime(2024, 1, 1, 14, 30, tzinfo=UTC))
+        )
+        self.assertFalse(
+            self.schedule.is_open_at(datetime(2024, 1, 1, 9, 30, tzinfo=UTC))
+        )
+
+    def test_next_opening(self):
+        tz = ZoneInfo("UTC")
+        self.assertEqual(
+            self.schedule.next_opening(datetime(2024, 1, 1, 8, tzinfo=UTC)),
+            datetime(2024, 1, 1, 9, tzinfo=tz),
+        )
+        self.assertEqual(
+            self.schedule.next_opening(datetime(2024, 1, 1, 20, tzinfo=UTC)),
+            datetime(2024, 1, 5, 18, tzinfo=tz),
+        )
+        # Saturday from midnight continues Friday's hours, so isn't an opening
+        self.assertEqual(
+            self.schedule.next_opening(datetime(2024, 1, 5, 20, tzinfo=UTC)),
+            datetime(2024, 1, 6, 10, tzinfo=tz),
+        )
+        # Round to next week
+        self.assertEqual(
+            self.schedule.next_opening(datetime(2024, 1, 6, 13, tzinfo=UTC)),
+            datetime(2024, 1, 8, 9, tzinfo=tz),
+        )
+
+    def test_never_open(self):
+        schedule = WeeklySchedule.from_hours([])
+        self.assertFalse(schedule.is_open_at(datetime(2024, 1, 1, tzinfo=UTC)))
+        self.assertIsNone(schedule.next_opening(datetime(2024, 1, 1, tzinfo=UTC)))
+
+
+class LocationScheduleTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        root = Site.objects.get(is_default_site=True).root_page
+        self.index = root.add_child(
+            instance=LocationsIndexPage(title="Locations", slug="locations")
+        )
+        self.locations = []
+        for number in range(3):
+            location = LocationPage(
+                title=f"Location {number}",
+                slug=f"location-{number}",
+                address="1 Street",
+                lat_long="64.144367, -21.939182",
+            )
+            location.hours_of_operation = [hours("MON", time(9), time(17))]
+            self.index.add_child(instance=location)
+            location.save_revision().publish()
+            self.locations.append(location)
+
+    def test_bulk_schedules_use_one_query_then_the_cache(self):
+        locations = list(LocationPage.objects.all())
+        with self.assertNumQueries(1):
+            schedules = get_schedules(locations)
+        self.assertEqual(schedules[locations[0].pk].days[0], ((540, 1020),))
+
+        locations = list(LocationPage.objects.all())
+        with self.assertNumQueries(0):
+            self.assertEqual(get_schedules(locations), schedules)
+
+    def test_schedule_is_rebuilt_when_republished(self):
+        location = LocationPage.objects.get(pk=self.locations[0].pk)
+        self.assertFalse(location.schedule.days[1])
+
+        location.hours_of_operation = [hours("TUE", time(8), time(12))]
+        location.save_revision().publish()
+
+        location = LocationPage.objects.get(pk=location.pk)
+        self.assertEqual(
+            location.schedule.days, ((), ((480, 720),), (), (), (), (), ())
+        )
+
+    def test_preview_uses_unsaved_hours(self):
+        location = LocationPage.objects.get(pk=self.locations[0].pk)
+        location.hours_of_operation = [hours("WED", time(8), time(12))]
+
+        with self.assertNumQueries(0):
+            self.assertEqual(location.schedule.days[2], ((480, 720),))
+
+    def test_location_page_shows_when_it_opens_next(self):
+        # A Tuesday evening
+        now = datetime(2024, 1, 2, 20, tzinfo=UTC)
+        with mock.patch("django.utils.timezone.now", return_value=now):
+            response = self.client.get(self.locations[0].url)
+
+        self.assertContains(response, "Sorry, this location is currently closed.")
+        self.assertContains(response, "It opens again on")
+        self.assertContains(response, "Monday at 09:00")
+
+
+class ScheduleTableTests(TestCase):
+    def setUp(self):
+        generator = random.Random(1)
+        self.schedules = {}
+        for key in range(50):
+            slots = []
+            for day in ["MON", "TUE", "WED", "THU", "FRI", "SAT", "SUN"]:
+                opening = time(generator.randrange(24), generator.choice([0, 30]))
+                closing = time(generator.randrange(24), generator.choice([0, 30]))
+                slots.append(hours(day, opening, closing, generator.random() < 0.2))
+            self.schedules[key] = WeeklySchedule.from_hours(slots)
+        self.table = ScheduleTable(self.schedules)
+
+    def test_matches_each_schedule(self):
+        # Every half hour of a week, from Monday
+        start = datetime(2024, 1, 1, 0, 15, tzinfo=UTC)
+        for step in range(7 * 48):
+            when = start + timedelta(minutes=30 * step)
+            expected = [
+                key
+                for key, schedule in self.schedules.items()
+                if schedule.is_open_at(when)
+            ]
+            with self.subTest(when=when):
+                self.assertEqual(sorted(self.table.get_open_keys(when)), expected)
+
+    def test_is_open(self):
+        schedules = {
+            "day": WeeklySchedule.from_hours([hours("MON", time(9), time(17))]),
+            "night": WeeklySchedule.from_hours([hours("SUN", time(22), time(2))]),
+        }
+        table = ScheduleTable(schedules)
+
+        mask = table.get_open_mask(datetime(2024, 1, 1, 1, tzinfo=UTC))
+        self.assertFalse(table.is_open("day", mask))
+        self.assertTrue(table.is_open("night", mask))
+        self.assertFalse(table.is_open("unknown", mask))
+        mask = table.get_open_mask(datetime(2024, 1, 1, 9, tzinfo=UTC))
+        self.assertTrue(table.is_open("day", mask))
+        self.assertFalse(table.is_open("night", mask))
+
+
+class OpenNowTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        root = Site.objects.get(is_default_site=True).root_page
+        self.index = root.add_child(
+            instance=LocationsIndexPage(title="Locations", slug="locations")
+        )
+        for title, opening, closing in [
+            ("Early", time(6), time(12)),
+            ("Late", time(12), time(23)),
+        ]:
+            location = LocationPage(
+                title=title,
+                slug=title.lower(),
+                address="1 Street",
+                lat_long="64.144367, -21.939182",
+            )
+            location.hours_of_operation = [
+                hours(day, opening, closing)
+                for day in ["MON", "TUE", "WED", "THU", "FRI", "SAT", "SUN"]
+            ]
+            self.index.add_child(instance=location)
+            location.save_revision().publish()
+
+    def get(self, **params):
+        # A Monday morning
+        now = datetime(2024, 1, 1, 8, tzinfo=UTC)
+        with mock.patch("django.utils.timezone.now", return_value=now):
+            return self.client.get(self.index.url, params)
+
+    def test_badges(self):
+        response = self.get()
+
+        self.assertEqual(
+            [
+                (location.title, location.open_now)
+                for location in response.context["locations"]
+            ],
+            [("Early", True), ("Late", False)],
+        )
+        self.assertContains(response, "Open now")
+        self.assertContains(response, "Closed")
+        self.assertIn("max-age=60", response["Cache-Control"])
+
+    def test_open_now_filter(self):
+        response = self.get(open_now="1")
+
+        self.assertEqual(
+            [location.title for location in response.context["locations"]], ["Early"]
+        )
+        self.assertContains(response, "Showing the locations open now")
+
+    def test_table_is_cached_until_publish(self):
+        table = get_schedule_table(self.index)
+        with self.assertNumQueries(0):
+            self.assertEqual(len(get_schedule_table(self.index)), 2)
+
+        late = LocationPage.objects.get(slug="late")
+        late.hours_of_operation = [hours("MON", time(7), time(9))]
+        late.save_revision().publish()
+
+        table = get_schedule_table(self.index)
+        self.assertEqual(
+            len(table.get_open_keys(datetime(2024, 1, 1, 8, tzinfo=UTC))), 2
+        )
+
+
+class SpatialIndexTests(TestCase):
+    def setUp(self):
+        generator = random.Random(1)
+        self.points = [
+            (key, generator.uniform(-90, 90), generator.uniform(-180, 180))
+            for key in range(500)
+        ]
+        self.index = SpatialIndex(self.points)
+
+    def brute_force(self, lat, lng, k):
+        def haversine(point):
+            _, point_lat, point_lng = point
+            lat1, lng1, lat2, lng2 = map(math.radians, (lat, lng, point_lat, point_lng))
+            a = (
+                math.sin((lat2 - lat1) / 2) ** 2
+                + math.cos(lat1) * math.cos(lat2) * math.sin((lng2 - lng1) / 2) ** 2
+            )
+            return math.asin(math.sqrt(a))
+
+        return sorted(self.points, key=haversine)[:k]
+
+    def test_parse_lat_long(self):
+        self.assertEqual(
+            parse_lat_long("64.144367, -21.939182"), (64.144367, -21.939182)
+        )
+        for value in ["", "64.1", "64.1, x", "91, 0", "0, 181", "nan, 0"]:
+            with self.subTest(value=value), self.assertRaises(ValueError):
+                parse_lat_long(value)
+
+    def test_nearest_matches_brute_force(self):
+        for lat, lng in [(0, 0), (89, 179), (-45.5, -179.9), (51.5, -0.1)]:
+            with self.subTest(lat=lat, lng=lng):
+                expected = [key for key, *_ in self.brute_force(lat, lng, 7)]
+                nearest = self.index.nearest(lat, lng, 7)
+                self.assertEqual([key for key, _ in nearest], expected)
+
+    def test_distance_in_kilometres(self):
+        index = SpatialIndex([("reykjavik", 64.1466, -21.9426)])
+        [(key, distance)] = index.nearest(51.5072, -0.1276, 1)
+        self.assertEqual(key, "reykjavik")
+        self.assertAlmostEqual(distance, 1890, delta=5)
+
+    def test_add_move_and_remove(self):
+        self.index.add("new", 10, 10)
+        self.assertEqual(self.index.nearest(10, 10, 1)[0][0], "new")
+        self.index.add("new", -10, -10)
+        self.assertEqual(self.index.nearest(-10, -10, 1)[0][0], "new")
+        self.assertNotEqual(self.index.nearest(10, 10, 1)[0][0], "new")
+        self.index.remove("new")
+        self.assertNotIn("new", self.index)
+        self.assertEqual(len(self.index), 500)
+
+    def test_leaves_split_as_points_are_added(self):
+        index = SpatialIndex()
+        for key in range(200):
+            index.add(key, key / 100, 0)
+        self.assertIsNone(index.root.points)
+        self.assertEqual([key for key, _ in index.nearest(1.003, 0, 2)], [100, 101])
+
+
+class NearestLocationsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        root = Site.objects.get(is_default_site=True).root_page
+        self.index = root.add_child(
+            instance=LocationsIndexPage(title="Locations", slug="locations")
+        )
+        self.reykjavik = self.add_location("Reykjavik", "64.1466, -21.9426")
+        self.london = self.add_location("London", "51.5072, -0.1276")
+        self.paris = self.add_location("Paris", "48.8566, 2.3522")
+
+    def add_location(self, title, lat_long):
+        location = self.index.add_child(
+            instance=LocationPage(
+                title=title, slug=title.lower(), address="1 Street", lat_long=lat_long
+            )
+        )
+        location.save_revision().publish()
+        return location
+
+    def get_nearest(self, **params):
+        url = self.index.url + self.index.reverse_subpage("nearest_locations")
+        return self.client.get(url, {"format": "json", **params})
+
+    def test_coordinates_are_parsed_on_save(self):
+        self.assertEqual(self.london.latitude, 51.5072)
+        self.assertEqual(self.london.longitude, -0.1276)
+
+    def test_migration_only_backfills_valid_coordinates(self):
+        migration = importlib.import_module(
+            "bakerydemo.locations.migrations.0007_locationpage_coordinates"
+        )
+        LocationPage.objects.filter(pk=self.london.pk).update(
+            lat_long="151.5072, -0.1276", latitude=None, longitude=None
+        )
+        LocationPage.objects.filter(pk=self.paris.pk).update(
+            latitude=None, longitude=None
+        )
+
+        migration.forwards_func(apps, mock.Mock(connection=connection))
+
+        london = LocationPage.objects.get(pk=self.london.pk)
+        paris = LocationPage.objects.get(pk=self.paris.pk)
+        self.assertEqual((london.latitude, london.longitude), (None, None))
+        self.assertEqual((paris.latitude, paris.longitude), (48.8566, 2.3522))
+
+    def test_nearest_locations(self):
+        response = self.get_nearest(lat="50.0", lng="1.0", k="2")
+
+        results = response.json()["results"]
+        self.assertEqual([result["title"] for result in results], ["Paris", "London"])
+        self.assertEqual(results[0]["url"], self.paris.url)
+        self.assertLess(results[0]["distance_km"], results[1]["distance_km"])
+
+    def test_nearest_locations_page(self):
+        url = self.index.url + self.index.reverse_subpage("nearest_locations")
+        response = self.client.get(url, {"lat": "64", "lng": "-22"})
+
+        self.assertContains(response, "The locations nearest to you")
+        self.assertContains(response, "Reykjavik")
+
+    def test_nearest_locations_page_doesnt_list_every_location(self):
+        url = self.index.url + self.index.reverse_subpage("nearest_locations")
+        with mock.patch(
+            "bakerydemo.locations.models.get_schedule_table"
+        ) as get_schedule_table:
+            response = self.client.get(url, {"lat": "64", "lng": "-22", "k": "1"})
+
+        get_schedule_table.assert_not_called()
+        self.assertEqual(list(response.context["locations"]), [self.reykjavik])
+
+    def test_invalid_coordinates(self):
+        self.assertEqual(self.get_nearest(lat="north", lng="1").status_code, 400)
+        self.assertEqual(self.get_nearest(lat="50").status_code, 400)
+
+    def test_index_follows_publishing(self):
+        get_location_index()
+        self.london.lat_long = "64.0, -22.0"
+        self.london.save_revision().publish()
+        self.paris.unpublish()
+
+        # Only the pages found are fetched
+        with self.assertNumQueries(1):
+            locations = get_nearest_locations(64, -22, 5)
+        self.assertEqual(locations, [self.london, self.reykjavik])
+
+    def test_index_is_rebuilt_after_changes_elsewhere(self):
+        index = get_location_index()
+        # Another process publishing a change
+        cache.set("location-index-version", 0, None)
+        self.assertIsNot(get_location_index(), index)
@@ -0,0 +1,124 @@
+from django.core.cache import cache
+from django.template import Context, Template
+from django.test import RequestFactory, TestCase
+from wagtail.models import Page, Site
+
+from bakerydemo.base.models import StandardPage
+from bakerydemo.base.navigation import Breadcrumb, get_breadcrumbs, get_navigation_tree
+
+MENU_TEMPLATE = Template(
+    "{% load navigation_tags %}"
+    "{% get_site_root as site_root %}"
+    "{% top_menu parent=site_root calling_page=self %}"
+)
+
+
+class NavigationTreeTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.site = Site.objects.get(is_default_site=True)
+        self.root = self.site.root_page
+        self.about = self.root.add_child(
+            instance=StandardPage(title="About", slug="about", show_in_menus=True)
+        )
+        self.team = self.about.add_child(
+            instance=StandardPage(title="Team", slug="team", show_in_menus=True)
+        )
+        self.hidden = self.root.add_child(
+            instance=StandardPage(title="Hidden", slug="hidden", show_in_menus=False)
+        )
+        self.hidden.add_child(
+            instance=StandardPage(title="Orphan", slug="orphan", show_in_menus=True)
+        )
+        self.request = RequestFactory().get("/")
+
+    def render_menu(self, calling_page=None):
+        context = Context({"request": self.request, "self": calling_page})
+        return MENU_TEMPLATE.render(context)
+
+    def test_tree_contains_only_reachable_menu_pages(self):
+        tree = get_navigation_tree(self.site)
+        self.assertEqual([item.title for item in tree.items], ["About"])
+        self.assertEqual(
+            [item.title for item in tree.children_of(self.about.id)], ["Team"]
+        )
+        self.assertTrue(tree.items[0].has_children)
+        self.assertEqual(tree.items[0].url, "/about/")
+
+    def test_menu_renders_without_queries_once_cached(self):
+        self.render_menu()
+        self.request = RequestFactory().get("/")
+        # Site resolution isn't part of the menu tags
+        Site.find_for_request(self.request)
+        with self.assertNumQueries(0):
+            html = self.render_menu(calling_page=self.team)
+        self.assertIn('href="/about/team/"', html)
+        self.assertIn("active", html)
+
+    def test_publish_invalidates_tree(self):
+        get_navigation_tree(self.site)
+        contact = StandardPage(title="Contact", slug="contact", show_in_menus=True)
+        self.root.add_child(instance=contact)
+        contact.save_revision().publish()
+        tree = get_navigation_tree(self.site)
+        self.assertEqual([item.title for item in tree.items], ["About", "Contact"])
+
+    def test_delete_invalidates_tree(self):
+        get_navigation_tree(self.site)
+        Page.objects.get(pk=self.team.pk).delete()
+        tree = get_navigation_tree(self.site)
+        self.assertEqual(tree.children_of(self.about.id), ())
+
+    def test_page_renders_menu(self):
+        response = self.client.get("/about/team/")
+        self.assertContains(response, 'class="presentation about active has-submenu"')
+        self.assertContains(response, '<a href="/about/team/">Team</a>', count=2)
+
+
+class BreadcrumbTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.site = Site.objects.get(is_default_site=True)
+        self.about = self.site.root_page.add_child(
+            instance=StandardPage(title="About", slug="about")
+        )
+        self.team = self.about.add_child(
+            instance=StandardPage(title="Team", slug="team")
+        )
+        self.chef = self.team.add_child(
+            instance=StandardPage(title="Chef", slug="chef")
+        )
+
+    def test_breadcrumbs_from_cached_paths(self):
+        self.assertEqual(
+            get_breadcrumbs(self.chef, self.site),
+            [
+                Breadcrumb(self.site.root_page.title, "/"),
+                Breadcrumb("About", "/about/"),
+                Breadcrumb("Team", "/about/team/"),
+                Breadcrumb("Chef", None),
+            ],
+        )
+        with self.assertNumQueries(0):
+            breadcrumbs = get_breadcrumbs(self.chef, self.site)
+        self.assertEqual(len(breadcrumbs), 4)
+
+    def test_publish_refreshes_title(self):
+        get_breadcrumbs(self.chef, self.site)
+        self.team.title = "Our team"
+        self.team.save_revision().publish()
+        self.assertEqual(get_breadcrumbs(self.chef, self.site)[2].title, "Our team")
+
+    def test_move_refreshes_urls(self):
+        get_breadcrumbs(self.chef, self.site)
+        self.team.move(self.site.root_page, pos="last-child")
+        chef = Page.objects.get(pk=self.chef.pk)
+        self.assertEqual(
+            [breadcrumb.url for breadcrumb in get_breadcrumbs(chef, self.site)],
+            ["/", "/team/", None],
+        )
+
+    def test_page_renders_breadcrumbs(self):
+        response = self.client.get("/about/team/chef/")
+        self.assertContains(response, '<a href="/about/team/">Team</a>')
+        self.assertContains(response, '<li aria-current="page">Chef</li>')
@@ -0,0 +1,136 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.http import HttpResponse
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from wagtail.models import PageViewRestriction, Site
+
+from bakerydemo.base.models import GenericSettings, SiteSettings, StandardPage
+from bakerydemo.base.page_cache import get_cache_timeout
+from bakerydemo.blog.models import BlogIndexPage, BlogPage
+from bakerydemo.locations.models import LocationsIndexPage
+
+
+@override_settings(PAGE_CACHE_TIMEOUT=60)
+class PageCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        site = Site.objects.get(is_default_site=True)
+        # Settings are created on first use, which purges the cache
+        SiteSettings.objects.create(site=site)
+        self.settings = GenericSettings.objects.create()
+        root = site.root_page
+        self.about = root.add_child(instance=StandardPage(title="About", slug="about"))
+        self.team = self.about.add_child(
+            instance=StandardPage(title="Team", slug="team")
+        )
+        self.contact = root.add_child(
+            instance=StandardPage(title="Contact", slug="contact")
+        )
+
+    def assertCached(self, path, **params):
+        self.client.get(path, params)
+        with self.assertNumQueries(0):
+            response = self.client.get(path, params)
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def assertNotCached(self, path, **params):
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(path, params)
+        self.assertTrue(len(queries), f"{path} was served from the cache")
+
+    def test_anonymous_responses_are_cached(self):
+        response = self.assertCached("/about/team/")
+        self.assertContains(response, "Team")
+
+    @override_settings(PAGE_CACHE_TIMEOUT=0)
+    def test_cache_is_opt_in(self):
+        self.client.get("/about/team/")
+        self.assertNotCached("/about/team/")
+
+    def test_responses_with_a_max_age_are_cached_for_that_long(self):
+        locations = Site.objects.get(is_default_site=True).root_page.add_child(
+            instance=LocationsIndexPage(title="Locations", slug="locations")
+        )
+        response = self.assertCached(locations.url)
+        self.assertIn("max-age=60", response["Cache-Control"])
+
+        with override_settings(PAGE_CACHE_TIMEOUT=600):
+            self.assertEqual(get_cache_timeout(response), 60)
+            response = HttpResponse()
+            self.assertEqual(get_cache_timeout(response), 600)
+            response["Cache-Control"] = "max-age=6000"
+            self.assertEqual(get_cache_timeout(response), 600)
+            for cache_control in ["private, max-age=60", "no-cache", "max-age=0"]:
+                response["Cache-Control"] = cache_control
+                self.assertEqual(get_cache_timeout(response), 0)
+
+    def test_authenticated_requests_bypass_the_cache(self):
+        self.client.get("/about/team/")
+        user = get_user_model().objects.create_user("baker", password="password")
+        self.client.force_login(user)
+        self.assertNotCached("/about/team/")
+
+    def test_query_params(self):
+        self.assertCached("/about/team/", page=2)
+        self.client.get("/about/team/", {"utm_source": "newsletter"})
+        self.assertNotCached("/about/team/", utm_source="newsletter")
+
+    def test_publishing_purges_the_page_its_ancestors_and_descendants(self):
+        for path in ["/about/", "/about/team/", "/contact/"]:
+            self.client.get(path)
+        self.about.title = "About us"
+        self.about.save_revision().publish()
+        self.assertContains(self.client.get("/about/"), "About us")
+        self.assertNotCached("/about/team/")
+        self.assertCached("/contact/")
+
+    def test_publishing_a_menu_page_purges_everything(self):
+        self.client.get("/contact/")
+        self.about.show_in_menus = True
+        self.about.save_revision().publish()
+        self.assertNotCached("/contact/")
+
+    def test_unpublishing_purges_the_page(self):
+        self.client.get("/about/team/")
+        self.team.unpublish()
+        self.assertEqual(self.client.get("/about/team/").status_code, 404)
+
+    def test_settings_changes_purge_everything(self):
+        self.client.get("/contact/")
+        self.settings.twitter_url = "https://twitter.com/bakery"
+        self.settings.save()
+        self.assertNotCached("/contact/")
+
+    def test_publishing_a_post_purges_its_tag_archives(self):
+        blog = self.about.add_child(instance=BlogIndexPage(title="Blog", slug="blog"))
+        post = BlogPage(title="Rye", slug="rye", date_published="2024-07-05")
+        post.tags.add("rye")
+        blog.add_child(instance=post)
+        post.save_revision().publish()
+        self.assertCached("/about/blog/tags/rye/")
+
+        post.title = "Rye revisited"
+        post.save_revision().publish()
+        self.assertContains(self.client.get("/about/blog/tags/rye/"), "Rye revisited")
+
+    def test_wagtail_util_routes_arent_served_as_pages(self):
+        response = self.client.get(reverse("wagtailcore_login"))
+        self.assertEqual(response.status_code, 200)
+
+        restriction = PageViewRestriction.objects.create(
+            page=self.about,
+            restriction_type=PageViewRestriction.PASSWORD,
+            password="password",
+        )
+        response = self.client.post(
+            reverse(
+                "wagtailcore_authenticate_with_password",
+                args=[restriction.pk, self.about.pk],
+            ),
+            {"password": "password", "return_url": "/about/"},
+        )
+        self.assertRedirects(response, "/about/", fetch_redirect_response=False)
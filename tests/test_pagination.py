@@ -0,0 +1,178 @@
+import datetime
+
+from django.core.cache import cache
+from django.core.paginator import Paginator
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from wagtail.models import Site
+
+from bakerydemo.base.pagination import (
+    CachedKeysetPaginator,
+    InvalidCursor,
+    KeysetPaginator,
+)
+from bakerydemo.blog.models import BlogIndexPage, BlogPage
+from bakerydemo.breads.models import BreadPage, BreadsIndexPage
+
+
+class KeysetPaginatorTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        root = Site.objects.get(is_default_site=True).root_page
+        cls.index_page = root.add_child(
+            instance=BlogIndexPage(title="Blog", slug="blog")
+        )
+        dates = ["2024-07-05", "2024-07-05", None, "2024-07-06", "2024-07-04", None]
+        for number, date in enumerate(dates):
+            cls.index_page.add_child(
+                instance=BlogPage(
+                    title=f"Post {number}", slug=f"post-{number}", date_published=date
+                )
+            )
+
+    def setUp(self):
+        self.paginator = KeysetPaginator(
+            BlogPage.objects.all(), 2, ordering=("-date_published", "id")
+        )
+
+    def walk(self):
+        pages = [self.paginator.page()]
+        while pages[-1].has_next():
+            pages.append(self.paginator.page(pages[-1].next_cursor))
+        return pages
+
+    def test_pages_follow_the_ordering_with_nulls_last(self):
+        pages = self.walk()
+        self.assertEqual(
+            [[post.title for post in page] for page in pages],
+            [["Post 3", "Post 0"], ["Post 1", "Post 4"], ["Post 2", "Post 5"]],
+        )
+        self.assertFalse(pages[0].has_previous())
+        self.assertTrue(pages[1].has_previous())
+        self.assertIsNone(pages[-1].next_cursor)
+
+    def test_cursors_are_stable_as_posts_are_added(self):
+        cursor = self.paginator.page().next_cursor
+        self.index_page.add_child(
+            instance=BlogPage(
+                title="Newest", slug="newest", date_published="2024-08-01"
+            )
+        )
+        self.assertEqual(
+            [post.title for post in self.paginator.page(cursor)], ["Post 1", "Post 4"]
+        )
+
+    def test_deep_pages_seek_rather_than_offset(self):
+        cursor = self.walk()[1].next_cursor
+        with self.assertNumQueries(1):
+            page = self.paginator.page(cursor)
+        self.assertEqual(len(page), 2)
+        sql = str(self.paginator.queryset.query)
+        self.assertNotIn("OFFSET", sql)
+
+    def test_invalid_cursors_are_rejected(self):
+        for cursor in ["nonsense!", "W10", "WyJub3QgYSBkYXRlIiwxXQ"]:
+            with self.subTest(cursor=cursor):
+                with self.assertRaises(InvalidCursor):
+                    self.paginator.page(cursor)
+
+
+class CachedKeysetPaginatorTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        root = Site.objects.get(is_default_site=True).root_page
+        cls.index_page = root.add_child(
+            instance=BreadsIndexPage(title="Breads", slug="breads")
+        )
+        start = datetime.datetime(2024, 7, 1, tzinfo=datetime.timezone.utc)
+        for number in range(30):
+            cls.index_page.add_child(
+                instance=BreadPage(
+                    title=f"Bread {number}",
+                    slug=f"bread-{number}",
+                    # Pairs of breads share a timestamp, leaving it to the
+                    # id to order them
+                    first_published_at=start + datetime.timedelta(hours=number // 2),
+                )
+            )
+
+    def setUp(self):
+        cache.clear()
+
+    def get_paginator(self):
+        return CachedKeysetPaginator(
+            self.index_page.get_breads(),
+            12,
+            ordering=("-first_published_at", "id"),
+            cache_key="test-breads",
+            version_name="breads",
+        )
+
+    def test_pages_match_offset_pagination(self):
+        paginator = self.get_paginator()
+        expected = Paginator(
+            self.index_page.get_breads().order_by("-first_published_at", "id"), 12
+        )
+        self.assertEqual(paginator.count, 30)
+        self.assertEqual(list(paginator.page_range), [1, 2, 3])
+        for number in paginator.page_range:
+            with self.subTest(number=number):
+                self.assertEqual(
+                    list(paginator.page(number)), list(expected.page(number))
+                )
+
+    def test_count_and_bookmarks_are_cached(self):
+        self.get_paginator().page(3)
+        paginator = self.get_paginator()
+        with self.assertNumQueries(1):
+            # The page itself, without a COUNT
+            page = paginator.page(3)
+            self.assertEqual(len(page), 6)
+            self.assertEqual(page.start_index(), 25)
+        self.assertNotIn("OFFSET", str(paginator.object_list.query))
+
+    def test_bookmarks_are_recorded_up_to_the_page_asked_for(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.get_paginator().page(2)
+        # The COUNT, the first page's ordering columns and the page itself
+        self.assertEqual(len(queries), 3)
+        self.assertIn("LIMIT 12", queries[1]["sql"])
+
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(len(self.get_paginator().page(3)), 6)
+        # Only the second page's ordering columns are read, past the first
+        self.assertEqual(len(queries), 2)
+        self.assertIn("LIMIT 12", queries[0]["sql"])
+
+    def test_publishing_a_bread_refreshes_the_count(self):
+        self.assertEqual(self.get_paginator().count, 30)
+        bread = BreadPage(title="Fresh bread", slug="fresh-bread")
+        self.index_page.add_child(instance=bread)
+        bread.save_revision().publish()
+        self.assertEqual(self.get_paginator().count, 31)
+
+    def test_publishing_other_pages_keeps_the_count(self):
+        self.assertEqual(self.get_paginator().count, 30)
+        self.index_page.title = "All breads"
+        self.index_page.save_revision().publish()
+        with self.assertNumQueries(0):
+            self.assertEqual(self.get_paginator().count, 30)
+
+    def test_pages_removed_since_the_count_show_the_last_page(self):
+        paginator = self.get_paginator()
+        self.assertEqual(paginator.num_pages, 3)
+        BreadPage.objects.filter(slug__in=["bread-0", "bread-1"]).update(live=False)
+        with self.assertNumQueries(2):
+            page = paginator.page(3)
+        self.assertEqual(len(page), 4)
+
+    def test_breads_index_page(self):
+        response = self.client.get("/breads/", {"page": 3})
+        self.assertEqual(response.status_code, 200)
+        breads = response.context["breads"]
+        self.assertEqual(breads.number, 3)
+        self.assertEqual(breads[0].title, "Bread 4")
+        self.assertContains(response, "page=2")
+        response = self.client.get("/breads/", {"page": 99})
+        self.assertEqual(response.context["breads"].number, 3)
@@ -0,0 +1,178 @@
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+from wagtail.images.models import Filter, Image, Rendition
+from wagtail.images.tests.utils import get_test_image_file
+
+from bakerydemo.base.cache import get_content_generation
+from bakerydemo.base.images import RenditionPlan
+from bakerydemo.base.models import RenditionJob
+from bakerydemo.base.rendition_queue import (
+    CLAIM_TIMEOUT,
+    MAX_ATTEMPTS,
+    PENDING_TIMEOUT,
+    claim_jobs,
+    get_pending_image_ids,
+    process_batch,
+    process_job,
+)
+
+SPECS = Filter.expand_spec("format-{webp,jpeg} fill-{20x20,40x30}")
+
+
+def create_image(title="Image"):
+    return Image.objects.create(title=title, file=get_test_image_file())
+
+
+@mock.patch(
+    "bakerydemo.base.rendition_queue.get_standard_filter_specs",
+    return_value=SPECS,
+)
+class RenditionQueueTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_saving_an_image_enqueues_it(self, _):
+        image = create_image()
+        job = RenditionJob.objects.get(image=image)
+        job.attempts = 2
+        job.save()
+
+        image.save()
+
+        job.refresh_from_db()
+        self.assertEqual(job.attempts, 0)
+        self.assertEqual(RenditionJob.objects.count(), 1)
+
+    def test_fixtures_dont_enqueue(self, _):
+        image = Image(
+            title="Image", file=get_test_image_file(), created_at=timezone.now()
+        )
+        image.save_base(raw=True)
+
+        self.assertFalse(RenditionJob.objects.exists())
+
+    def test_process_batch_generates_the_renditions(self, _):
+        image = create_image()
+
+        self.assertEqual(process_batch(), 1)
+
+        self.assertEqual(
+            sorted(image.renditions.values_list("filter_spec", flat=True)),
+            sorted(SPECS),
+        )
+        self.assertFalse(RenditionJob.objects.exists())
+        self.assertEqual(process_batch(), 0)
+
+    def test_only_missing_renditions_are_generated(self, _):
+        image = create_image()
+        image.get_rendition(SPECS[0])
+
+        process_batch()
+
+        self.assertEqual(image.renditions.count(), len(SPECS))
+
+    def test_generating_renditions_purges_the_content_generation(self, _):
+        create_image()
+        generation = get_content_generation()
+
+        process_batch()
+
+        self.assertNotEqual(get_content_generation(), generation)
+
+    def test_claimed_jobs_arent_claimed_again(self, _):
+        image = create_image()
+
+        self.assertEqual([job[1] for job in claim_jobs()], [image.pk])
+        self.assertEqual(claim_jobs(), [])
+
+        RenditionJob.objects.update(claimed_at=timezone.now() - CLAIM_TIMEOUT * 2)
+        self.assertEqual([job[1] for job in claim_jobs()], [image.pk])
+        self.assertEqual(RenditionJob.objects.get().attempts, 2)
+
+    def test_image_saved_while_processing_is_processed_again(self, _):
+        image = create_image()
+        [job] = claim_jobs()
+        image.save()
+
+        process_job(*job)
+
+        self.assertTrue(RenditionJob.objects.filter(image=image).exists())
+        self.assertEqual(process_batch(), 1)
+        self.assertFalse(RenditionJob.objects.exists())
+
+    def test_failed_jobs_are_retried(self, _):
+        image = create_image()
+
+        with mock.patch(
+            "bakerydemo.base.rendition_queue.generate_missing_renditions",
+            side_effect=OSError("Disk full"),
+        ):
+            for _ in range(MAX_ATTEMPTS):
+                self.assertEqual(process_batch(), 1)
+
+        job = RenditionJob.objects.get(image=image)
+        self.assertIsNone(job.claimed_at)
+        self.assertIn("Disk full", job.last_error)
+        # Given up on, so requests don't wait for it any more
+        self.assertEqual(process_batch(), 0)
+        self.assertEqual(get_pending_image_ids([image.pk]), set())
+
+    def test_process_rendition_queue_command(self, _):
+        images = [create_image(f"Image {number}") for number in range(3)]
+        stdout = StringIO()
+
+        call_command("process_rendition_queue", once=True, workers=1, stdout=stdout)
+
+        self.assertIn("Processed 3 images", stdout.getvalue())
+        self.assertEqual(
+            Rendition.objects.filter(image__in=images).count(), 3 * len(SPECS)
+        )
+
+
+class PendingRenditionTests(TestCase):
+    def setUp(self):
+        self.image = create_image()
+
+    def resolve(self, image):
+        plan = RenditionPlan()
+        plan.add(image, SPECS)
+        plan.resolve()
+
+    def test_pending_images_show_their_original(self):
+        image = Image.objects.get(pk=self.image.pk)
+
+        self.resolve(image)
+
+        self.assertFalse(image.renditions.exists())
+        with self.assertNumQueries(0):
+            renditions = image.get_renditions(*SPECS)
+        for rendition in renditions.values():
+            self.assertEqual(rendition.url, image.file.url)
+            self.assertEqual(
+                (rendition.width, rendition.height), (image.width, image.height)
+            )
+
+    def test_stale_jobs_arent_waited_for(self):
+        RenditionJob.objects.update(enqueued_at=timezone.now() - PENDING_TIMEOUT * 2)
+        image = Image.objects.get(pk=self.image.pk)
+
+        self.resolve(image)
+
+        self.assertEqual(image.renditions.count(), len(SPECS))
+
+    def test_jobs_being_processed_are_pending(self):
+        claim_jobs()
+        RenditionJob.objects.update(attempts=MAX_ATTEMPTS)
+
+        self.assertEqual(get_pending_image_ids([self.image.pk]), {self.image.pk})
+
+    def test_jobs_older_than_the_timeout_arent_pending(self):
+        RenditionJob.objects.update(enqueued_at=timezone.now() - timedelta(days=1))
+
+        self.assertEqual(get_pending_image_ids([self.image.pk]), set())
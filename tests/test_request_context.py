@@ -0,0 +1,43 @@
+from django.test import RequestFactory, TestCase
+from wagtail.models import Site
+
+from bakerydemo.base.models import GenericSettings, SiteSettings, StandardPage
+from bakerydemo.base.request_context import get_site_context
+
+
+class SiteContextTests(TestCase):
+    def setUp(self):
+        self.site = Site.objects.get(is_default_site=True)
+        self.request = RequestFactory().get("/")
+
+    def test_lookups_are_memoized_per_request(self):
+        site_context = get_site_context(self.request)
+        self.assertEqual(site_context.site, self.site)
+        self.assertEqual(site_context.root_page, self.site.root_page)
+        with self.assertNumQueries(0):
+            self.assertEqual(site_context.site, self.site)
+            self.assertEqual(site_context.root_page.pk, self.site.root_page_id)
+        self.assertEqual(site_context.misses, 2)
+        self.assertEqual(site_context.hits, 3)
+        self.assertIs(get_site_context(self.request), site_context)
+
+    def test_settings_are_shared_with_wagtail_settings(self):
+        site_context = get_site_context(self.request)
+        self.assertIsInstance(site_context.site_settings, SiteSettings)
+        self.assertIsInstance(site_context.generic_settings, GenericSettings)
+        with self.assertNumQueries(0):
+            self.assertIs(
+                SiteSettings.for_request(self.request), site_context.site_settings
+            )
+            self.assertIs(
+                GenericSettings.load(self.request), site_context.generic_settings
+            )
+
+    def test_middleware_attaches_context(self):
+        self.site.root_page.add_child(
+            instance=StandardPage(title="About", slug="about")
+        )
+        response = self.client.get("/about/")
+        site_context = response.wsgi_request.site_context
+        self.assertGreater(site_context.hits, 0)
+        self.assertContains(response, "| The Wagtail Bakery")
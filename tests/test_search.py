@@ -0,0 +1,223 @@
+import datetime
+from io import StringIO
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import DatabaseError, connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from wagtail.contrib.search_promotions.models import Query
+from wagtail.images.models import Filter, Image
+from wagtail.images.tests.utils import get_test_image_file
+from wagtail.models import Page, Site
+
+from bakerydemo.base.models import StandardPage
+from bakerydemo.blog.models import BlogIndexPage, BlogPage
+from bakerydemo.breads.models import BreadPage, BreadsIndexPage
+from bakerydemo.locations.models import LocationPage, LocationsIndexPage
+from bakerydemo.search.hits import QueryHitBuffer, get_hit_buffer, request_flush
+from bakerydemo.search.utils import (
+    SEARCH_RESULT_RENDITIONS,
+    SEARCHABLE_PAGE_TYPES,
+    load_result_pages,
+    search_pages,
+    search_pages_cached,
+)
+
+
+class SearchDataTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        root = Site.objects.get(is_default_site=True).root_page
+        breads_index = root.add_child(
+            instance=BreadsIndexPage(title="Breads", slug="breads")
+        )
+        blog_index = root.add_child(instance=BlogIndexPage(title="Blog", slug="blog"))
+        locations_index = root.add_child(
+            instance=LocationsIndexPage(title="Locations", slug="locations")
+        )
+        for i in range(12):
+            breads_index.add_child(
+                instance=BreadPage(
+                    title=f"Bread {i}",
+                    slug=f"bread-{i}",
+                    body=[("paragraph_block", "<p>Made with sourdough</p>")],
+                )
+            )
+        blog_index.add_child(
+            instance=BlogPage(
+                title="Sourdough starters",
+                slug="sourdough-starters",
+                date_published="2024-07-05",
+            )
+        )
+        locations_index.add_child(
+            instance=LocationPage(
+                title="Reykjavik",
+                slug="reykjavik",
+                address="Sourdough Street 1",
+                lat_long="64.144367, -21.939182",
+            )
+        )
+        root.add_child(instance=StandardPage(title="Sourdough FAQ", slug="faq"))
+
+
+class SearchTestCase(SearchDataTestCase):
+    def tearDown(self):
+        # Don't leave hits behind for the background flush thread
+        get_hit_buffer().flush()
+
+
+class SearchPagesTests(SearchTestCase):
+    def test_searches_specific_fields_of_searchable_types_only(self):
+        results = search_pages("sourdough")
+        self.assertEqual(results.count(), 14)
+        titles = {page.title for page in results}
+        self.assertIn("Bread 0", titles)
+        self.assertIn("Sourdough starters", titles)
+        self.assertIn("Reykjavik", titles)
+        self.assertNotIn("Sourdough FAQ", titles)
+
+    def test_search_view_paginates(self):
+        response = self.client.get("/search/", {"q": "sourdough", "page": 2})
+        self.assertEqual(response.status_code, 200)
+        search_results = response.context["search_results"]
+        self.assertEqual(search_results.paginator.count, 14)
+        self.assertEqual(len(search_results), 4)
+
+
+class QueryHitBufferTests(SearchTestCase):
+    def test_hits_are_aggregated_and_upserted(self):
+        buffer = QueryHitBuffer(flush_interval=0, flush_size=100)
+        today = datetime.date(2024, 7, 5)
+        buffer.add_hit("Sourdough", date=today)
+        buffer.add_hit("sourdough ", date=today)
+        buffer.add_hit("rye", date=today)
+        self.assertEqual(len(buffer), 2)
+        self.assertFalse(Query.objects.exists())
+
+        with self.assertNumQueries(5):
+            self.assertEqual(buffer.flush(), 2)
+        buffer.add_hit("sourdough", date=today)
+        buffer.flush()
+
+        self.assertEqual(Query.objects.get(query_string="sourdough").hits, 3)
+        self.assertEqual(Query.objects.get(query_string="rye").hits, 1)
+
+    def test_size_threshold_triggers_flush(self):
+        buffer = QueryHitBuffer(flush_interval=0, flush_size=2)
+        buffer.add_hit("sourdough")
+        buffer.add_hit("rye")
+        self.assertEqual(len(buffer), 0)
+        self.assertEqual(Query.objects.count(), 2)
+
+    def test_failed_threshold_flush_keeps_the_hits(self):
+        buffer = QueryHitBuffer(flush_interval=0, flush_size=1)
+        with mock.patch(
+            "bakerydemo.search.hits.write_hits", side_effect=DatabaseError
+        ), self.assertLogs("bakerydemo.search.hits", level="ERROR"):
+            buffer.add_hit("sourdough")
+        self.assertEqual(len(buffer), 1)
+
+        buffer.add_hit("rye")
+        self.assertEqual(Query.objects.count(), 2)
+
+    def test_flush_requests_are_honoured_before_the_interval(self):
+        buffer = QueryHitBuffer(flush_interval=3600, flush_size=100)
+        buffer.add_hit("sourdough")
+        buffer.add_hit("rye")
+        self.assertEqual(buffer.flush_if_due(), 0)
+
+        request_flush()
+
+        self.assertEqual(buffer.flush_if_due(), 2)
+        self.assertEqual(Query.objects.count(), 2)
+        buffer.add_hit("spelt")
+        self.assertEqual(buffer.flush_if_due(), 0)
+
+    def test_search_view_buffers_hits(self):
+        self.client.get("/search/", {"q": "sourdough"})
+        self.assertFalse(Query.objects.exists())
+        stdout = StringIO()
+        call_command("flush_search_hits", wait=0, stdout=stdout)
+        self.assertIn("Flushed hits for 1 search queries", stdout.getvalue())
+        self.assertEqual(Query.objects.get(query_string="sourdough").hits, 1)
+
+
+class SearchResultsCacheTests(SearchTestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_cached_results_fetch_only_the_requested_page(self):
+        first = search_pages_cached("sourdough")
+        self.assertEqual(first.count(), 14)
+        with self.assertNumQueries(4):
+            # Page rows, then one query per page type
+            results = search_pages_cached("Sourdough ")
+            pages = results[10:20]
+        self.assertEqual(len(pages), 4)
+        self.assertEqual(
+            [page.pk for page in pages], [page.pk for page in first[10:20]]
+        )
+
+    def test_cache_misses_load_only_page_ids(self):
+        with CaptureQueriesContext(connection) as queries:
+            search_pages_cached("sourdough")
+        page_queries = [
+            query["sql"]
+            for query in queries
+            if 'FROM "wagtailcore_page"' in query["sql"]
+        ]
+        self.assertEqual(len(page_queries), 1)
+        self.assertTrue(
+            page_queries[0].startswith('SELECT "wagtailcore_page"."id" FROM')
+        )
+
+    def test_publish_invalidates_cached_results(self):
+        self.assertEqual(search_pages_cached("sourdough").count(), 14)
+        bread = BreadPage.objects.get(slug="bread-0")
+        bread.unpublish()
+        self.assertEqual(search_pages_cached("sourdough").count(), 13)
+
+
+class SearchResultsPrefetchTests(SearchTestCase):
+    def setUp(self):
+        cache.clear()
+        image = Image.objects.create(title="Loaf", file=get_test_image_file())
+        # Encoding AVIF isn't available everywhere, so create the renditions
+        # the template needs up front
+        for spec in SEARCH_RESULT_RENDITIONS:
+            image.renditions.create(
+                filter_spec=spec,
+                focal_point_key=Filter(spec).get_cache_key(image),
+                file=f"images/loaf.{spec.split('|')[0][7:]}",
+                width=180,
+                height=180,
+            )
+        for page in Page.objects.type(*SEARCHABLE_PAGE_TYPES).specific():
+            page.image = image
+            page.save_revision().publish()
+
+    def test_results_are_specific_with_prefetched_images(self):
+        page_ids = search_pages_cached("sourdough").page_ids
+        with self.assertNumQueries(6):
+            # Page rows, one query per page type, images and their renditions
+            pages = load_result_pages(page_ids)
+        self.assertEqual({type(page) for page in pages}, set(SEARCHABLE_PAGE_TYPES))
+        with self.assertNumQueries(0):
+            for page in pages:
+                page.specific.image.title
+                page.specific.content_type.model
+
+    def test_render_queries_do_not_grow_with_results(self):
+        # Generate the renditions and warm the caches
+        self.client.get("/search/", {"q": "sourdough"})
+        self.client.get("/search/", {"q": "sourdough", "page": 2})
+        with CaptureQueriesContext(connection) as first_page:
+            self.client.get("/search/", {"q": "sourdough"})
+        with CaptureQueriesContext(connection) as second_page:
+            self.client.get("/search/", {"q": "sourdough", "page": 2})
+        # Ten bread pages on the first page against four results of three
+        # page types on the second: only the per-type queries differ
+        self.assertEqual(len(second_page) - len(first_page), 2)
@@ -0,0 +1,40 @@
+import os
+
+from django.conf import settings
+from django.template import engines
+from django.test import TestCase, override_settings
+
+from bakerydemo.base.template_warmup import find_template_names, warm_templates
+
+CACHED_LOADERS = [
+    (
+        "django.template.loaders.cached.Loader",
+        [
+            "django.template.loaders.filesystem.Loader",
+            "django.template.loaders.app_directories.Loader",
+        ],
+    ),
+]
+
+
+class TemplateWarmupTests(TestCase):
+    def test_finds_project_templates_by_name(self):
+        names = set(
+            find_template_names(os.path.join(settings.PROJECT_DIR, "templates"))
+        )
+
+        self.assertIn("base.html", names)
+        self.assertIn("includes/header.html", names)
+
+    def test_compiles_templates_into_cached_loader(self):
+        templates = [dict(settings.TEMPLATES[0], APP_DIRS=False)]
+        templates[0]["OPTIONS"] = dict(templates[0]["OPTIONS"], loaders=CACHED_LOADERS)
+        with override_settings(TEMPLATES=templates):
+            with self.assertLogs("bakerydemo.base.template_warmup", "INFO") as logs:
+                compiled = warm_templates()
+            loader = engines["django"].engine.template_loaders[0]
+
+            self.assertGreater(compiled, 0)
+            self.assertIn("base.html", loader.get_template_cache)
+            self.assertIn("wagtailadmin/base.html", loader.get_template_cache)
+        self.assertRegex(logs.output[0], r"Compiled \d+ templates in [\d.]+s")